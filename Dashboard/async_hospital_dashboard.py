@@ -0,0 +1,260 @@
+from quart import Quart, render_template_string, jsonify, request
+import asyncio
+from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.connections import get_async_mongo_client, get_async_redis, get_mongo_db, MONGO_DB
+from common.dashboard_snapshot import read_live_dashboard_async
+from common.condition_index import ConditionIndex
+from common.encounter_events import DEFAULT_WINDOW_HOURS, parse_event_payload, publish_events_async, read_live_counters_async
+from common.live_aggregates import top_conditions_async, unique_patients_async, apply_unique_patients
+from common.rollups import (
+    get_rollup, ROLLUP_COLLECTION, KPIS_ROLLUP, DEMOGRAPHICS_ROLLUP, TOP_CONDITIONS_ROLLUP,
+    DEPARTMENTS_ROLLUP, COST_DISTRIBUTION_ROLLUP, COMORBIDITY_ROLLUP
+)
+from dashboard_page import HTML_TEMPLATE, HIGH_COST_PATIENT_FIELDS, code_list, condition_cohort
+
+# Async serving mode for the ultimate dashboard: same page and JSON shapes, but
+# every handler awaits its Redis and MongoDB calls together with
+# asyncio.gather, one event loop serves all of the page's parallel fetches,
+# and /api/dashboard returns every section in a single round trip.
+#
+# Run with:  pip install quart motor  &&  python async_hospital_dashboard.py
+
+app = Quart(__name__)
+
+# Clients are created on the serving loop so their connections belong to it
+mongo_client = None
+mongo_db = None
+redis_client = None
+# Only used to compute a missing rollup live and load the condition index, off the event loop
+sync_mongo_db = None
+
+# Same cohort index as the Flask app; loading and refreshing it run in a thread
+condition_index = ConditionIndex()
+
+@app.before_serving
+async def connect():
+    global mongo_client, mongo_db, redis_client, sync_mongo_db
+    mongo_client = get_async_mongo_client()
+    mongo_db = mongo_client[MONGO_DB]
+    redis_client = get_async_redis()
+    sync_mongo_db = get_mongo_db()
+
+@app.after_serving
+async def disconnect():
+    mongo_client.close()
+    await redis_client.aclose()
+
+async def load_rollup(rollup_id):
+    rollup = await mongo_db[ROLLUP_COLLECTION].find_one({"_id": rollup_id})
+    if rollup is None:
+        # Rollups not built yet: compute this one from patient_summaries in a thread
+        rollup = await asyncio.to_thread(get_rollup, sync_mongo_db, rollup_id)
+    return rollup
+
+# Dashboard sections; each one issues all of its independent queries at once
+
+async def executive_summary():
+    live, kpis = await asyncio.gather(
+        read_live_dashboard_async(
+            redis_client, strings=('total_patients', 'high_cost_patients'), hashes=('departments',)
+        ),
+        load_rollup(KPIS_ROLLUP)
+    )
+    total_patients = int(live['total_patients'] or kpis['total_patients'])
+    high_cost_patients = int(live['high_cost_patients'] or kpis['high_cost_patients'])
+
+    return {
+        'total_patients': total_patients,
+        'high_cost_percentage': round((high_cost_patients / total_patients) * 100, 1) if total_patients else 0,
+        'total_encounters': kpis['total_encounters'],
+        'avg_cost_per_patient': kpis['avg_cost_per_patient'],
+        'departments_count': len(live['departments']),
+        'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+async def alerts():
+    kpis, live = await asyncio.gather(
+        load_rollup(KPIS_ROLLUP),
+        read_live_dashboard_async(redis_client, hashes=('departments',))
+    )
+    high_cost_percentage = kpis['high_cost_percentage']
+    dept_encounters = live['departments']
+
+    alerts = []
+    if high_cost_percentage > 80:
+        alerts.append({
+            'severity': 'critical',
+            'message': f'🚨 CRITICAL: {high_cost_percentage:.1f}% of patients are high-cost (>$50K) - Review cost management strategies'
+        })
+
+    for dept, encounters in dept_encounters.items():
+        if int(encounters) > 250:
+            alerts.append({
+                'severity': 'warning',
+                'message': f'⚠️ WARNING: {dept} has extreme utilization ({encounters} encounters) - Consider resource allocation'
+            })
+
+    return {'alerts': alerts}
+
+async def patient_analytics():
+    demographics, leaders = await asyncio.gather(
+        load_rollup(DEMOGRAPHICS_ROLLUP),
+        top_conditions_async(redis_client, 10)
+    )
+    total_patients = sum(demographics['gender_distribution'].values())
+    if leaders:
+        for condition in leaders:
+            condition['percentage'] = round((condition['count'] / total_patients) * 100, 1) if total_patients else 0
+    else:
+        # Live aggregates not built yet
+        leaders = (await load_rollup(TOP_CONDITIONS_ROLLUP))['conditions'][:10]
+
+    return {
+        'demographics': {
+            'avg_age': demographics['avg_age'],
+            'gender_distribution': demographics['gender_distribution']
+        },
+        'top_conditions': [
+            {
+                'name': condition['name'],
+                'count': condition['count'],
+                'percentage': condition['percentage']
+            } for condition in leaders
+        ]
+    }
+
+async def department_stats():
+    departments = (await load_rollup(DEPARTMENTS_ROLLUP))['departments'][:10]
+    counts = await unique_patients_async(redis_client, [dept['name'] for dept in departments])
+    apply_unique_patients(departments, counts)
+
+    return {
+        'departments': [
+            {
+                'name': dept['name'],
+                'encounters': dept['encounters'],
+                'unique_patients': dept['unique_patients'],
+                'encounters_per_patient': round(dept['encounters_per_patient'], 1),
+                'revenue': round(dept['revenue'], 2)
+            } for dept in departments
+        ]
+    }
+
+async def financial_analysis():
+    high_cost_cursor = mongo_db['patient_summaries'].find({
+        "clinical_summary.healthcare_metrics.total_expenses": {"$gt": 1000000}
+    }, HIGH_COST_PATIENT_FIELDS).sort("clinical_summary.healthcare_metrics.total_expenses", -1).limit(5)
+
+    cost_distribution, high_cost_patients = await asyncio.gather(
+        load_rollup(COST_DISTRIBUTION_ROLLUP),
+        high_cost_cursor.to_list(length=5)
+    )
+
+    formatted_patients = []
+    for patient in high_cost_patients:
+        formatted_patients.append({
+            'name': f"{patient['demographics']['name']['first']} {patient['demographics']['name']['last']}",
+            'costs': patient['clinical_summary']['healthcare_metrics']['total_expenses'],
+            'encounters': patient['clinical_summary']['total_encounters'],
+            'chronic_conditions': patient['clinical_summary'].get('chronic_count', 0)
+        })
+
+    return {
+        'cost_distribution': [
+            {
+                'range': bracket['range'],
+                'count': bracket['count'],
+                'percentage': bracket['percentage']
+            } for bracket in cost_distribution['brackets']
+        ],
+        'top_high_cost_patients': formatted_patients
+    }
+
+async def clinical_insights():
+    return {'condition_patterns': (await load_rollup(COMORBIDITY_ROLLUP))['patterns']}
+
+async def realtime_operations():
+    live = await read_live_dashboard_async(redis_client, strings=('total_patients',), hashes=('departments',))
+    top_departments = sorted(live['departments'], key=lambda dept: int(live['departments'][dept]), reverse=True)[:5]
+    window_hours = request.args.get('window_hours', DEFAULT_WINDOW_HOURS, type=int)
+    counters = await read_live_counters_async(redis_client, top_departments, window_hours=window_hours)
+    # Until the Redis dashboard is populated the patient count comes from the KPIs rollup
+    active_patients = int(live['total_patients'] or (await load_rollup(KPIS_ROLLUP))['total_patients'])
+
+    # Department activity from ingested encounter events
+    department_activity = []
+    for dept in top_departments:
+        activity = counters['departments'][dept]
+        status = "High" if activity['per_hour'] > 10 else "Normal" if activity['per_hour'] > 5 else "Low"
+
+        department_activity.append({
+            'name': dept,
+            'today_encounters': activity['today_encounters'],
+            'window_encounters': activity['window_encounters'],
+            'per_hour': activity['per_hour'],
+            'status': status
+        })
+
+    return {
+        'today_encounters': counters['today_encounters'],
+        'window_encounters': counters['window_encounters'],
+        'window_hours': counters['window_hours'],
+        'active_patients': active_patients,
+        'department_activity': department_activity
+    }
+
+SECTIONS = {
+    'executive-summary': executive_summary,
+    'alerts': alerts,
+    'patient-analytics': patient_analytics,
+    'department-stats': department_stats,
+    'financial-analysis': financial_analysis,
+    'clinical-insights': clinical_insights,
+    'realtime-operations': realtime_operations,
+}
+
+@app.route('/')
+async def dashboard():
+    return await render_template_string(HTML_TEMPLATE)
+
+@app.route('/api/dashboard')
+async def api_dashboard():
+    """Every section in one response, all fetched concurrently"""
+    results = await asyncio.gather(*(section() for section in SECTIONS.values()))
+    return jsonify(dict(zip(SECTIONS, results)))
+
+@app.route('/api/condition-cohort')
+async def api_condition_cohort():
+    """Patients with all of ?all=, any of ?any= (or conditions matching ?q=) and none of ?none= codes"""
+    await asyncio.to_thread(condition_index.refresh_if_stale, sync_mongo_db['patient_summaries'])
+    return jsonify(condition_cohort(
+        condition_index, code_list(request.args.get('all')), code_list(request.args.get('any')),
+        code_list(request.args.get('none')), request.args.get('q')
+    ))
+
+@app.route('/api/encounter-events', methods=['POST'])
+async def api_encounter_events():
+    """Ingest one encounter event or a list of them (applied by python -m common.encounter_events)"""
+    try:
+        events = parse_event_payload(await request.get_json(force=True))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'error': f'Invalid encounter event: {e}'}), 400
+    accepted = await publish_events_async(redis_client, events)
+    return jsonify({'accepted': accepted}), 202
+
+@app.route('/api/<section>')
+async def api_section(section):
+    """The per-section endpoints the dashboard page already calls"""
+    if section not in SECTIONS:
+        return jsonify({'error': f'Unknown section: {section}'}), 404
+    return jsonify(await SECTIONS[section]())
+
+if __name__ == '__main__':
+    print("🚀 Starting Async Hospital Dashboard...")
+    print("📊 Open: http://localhost:5002")
+    print("⚡ All sections in one request: http://localhost:5002/api/dashboard")
+    app.run(port=5002)
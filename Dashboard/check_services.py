@@ -1,7 +1,10 @@
-import pymongo
-import redis
-import mysql.connector
 from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.connections import get_mongo_client, get_redis, mysql_connect, MONGO_DB, MYSQL_CONFIG
+from common.dashboard_snapshot import current_version, read_live_dashboard, versioned_key
 
 def check_all_services():
     print("🔍 CHECKING ALL DATABASE SERVICES")
@@ -9,44 +12,37 @@ def check_all_services():
     
     # 1. Check MongoDB
     try:
-        mongo_client = pymongo.MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=3000)
+        mongo_client = get_mongo_client(serverSelectionTimeoutMS=3000)
         mongo_client.admin.command('ismaster')
-        mongo_db = mongo_client['hospital_platform']
+        mongo_db = mongo_client[MONGO_DB]
         patient_count = mongo_db['patient_summaries'].count_documents({})
-        print(f"✅ MongoDB: RUNNING - {patient_count} patients in hospital_platform")
-        mongo_client.close()
+        print(f"✅ MongoDB: RUNNING - {patient_count} patients in {MONGO_DB}")
     except Exception as e:
         print(f"❌ MongoDB: NOT RUNNING - {e}")
     
     # 2. Check Redis
     try:
-        r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True, socket_connect_timeout=3)
+        r = get_redis(socket_connect_timeout=3)
         r.ping()
         
         # Check if dashboard data exists
-        keys = r.keys("dashboard:*")
-        if keys:
-            total_patients = r.get("dashboard:total_patients")
-            print(f"✅ Redis: RUNNING - {len(keys)} dashboard keys, {total_patients} patients")
+        version = current_version(r)
+        if version is not None:
+            keys = list(r.scan_iter(match=versioned_key(version, "*")))
+            total_patients = read_live_dashboard(r, strings=('total_patients',))['total_patients']
+            print(f"✅ Redis: RUNNING - {len(keys)} dashboard keys (version {version}), {total_patients} patients")
         else:
             print(f"✅ Redis: RUNNING - But no dashboard data (need to run setup)")
-        r.close()
     except Exception as e:
         print(f"❌ Redis: NOT RUNNING - {e}")
     
     # 3. Check MySQL (optional)
     try:
-        mysql_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='',  # Your MySQL password
-            database='hospital_operations',
-            connect_timeout=3
-        )
+        mysql_conn = mysql_connect(connect_timeout=3)
         cursor = mysql_conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM patients")
         mysql_count = cursor.fetchone()[0]
-        print(f"✅ MySQL: RUNNING - {mysql_count} patients in hospital_operations")
+        print(f"✅ MySQL: RUNNING - {mysql_count} patients in {MYSQL_CONFIG['database']}")
         cursor.close()
         mysql_conn.close()
     except Exception as e:
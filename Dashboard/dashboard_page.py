@@ -0,0 +1,439 @@
+# The dashboard page and the query shapes shared by the Flask and Quart apps.
+#
+# Kept free of connections and app setup so either app can import it without
+# starting the other one's clients, caches or event bus.
+
+# Only what the high-cost patient table shows, not the embedded histories
+HIGH_COST_PATIENT_FIELDS = {
+    "demographics.name": 1,
+    "clinical_summary.total_encounters": 1,
+    "clinical_summary.chronic_count": 1,
+    "clinical_summary.healthcare_metrics.total_expenses": 1
+}
+
+def code_list(value):
+    """Condition codes from a comma-separated query parameter"""
+    return [code for code in (value or '').split(',') if code]
+
+def describe_codes(condition_index, codes):
+    return [
+        {'code': code, 'description': condition_index.descriptions.get(code), 'patients': condition_index.count(code)}
+        for code in codes
+    ]
+
+def condition_cohort(condition_index, all_of, any_of, none_of, text=None):
+    """Cohort size, criteria and sample ids; text adds the codes whose description matches it to any_of"""
+    if text:
+        any_of = any_of + condition_index.codes_matching(text)
+        if not any_of:
+            return {'patients': 0, 'criteria': {}, 'sample_patient_ids': []}
+
+    cohort = condition_index.cohort(all_of, any_of, none_of)
+
+    return {
+        'patients': len(cohort),
+        'criteria': {
+            'all': describe_codes(condition_index, all_of),
+            'any': describe_codes(condition_index, any_of),
+            'none': describe_codes(condition_index, none_of)
+        },
+        'sample_patient_ids': cohort[:10].tolist()
+    }
+
+# HTML Template with separate sections
+HTML_TEMPLATE = '''
+<!DOCTYPE html>
+<html>
+<head>
+    <title>🏥 Comprehensive Hospital Operations Dashboard</title>
+    <style>
+        body { 
+            font-family: 'Segoe UI', Arial, sans-serif; 
+            margin: 0; 
+            padding: 20px; 
+            background: #f0f2f5;
+            color: #333;
+        }
+        .dashboard-header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 20px;
+            border-radius: 10px;
+            margin-bottom: 20px;
+            text-align: center;
+        }
+        .section {
+            background: white;
+            padding: 20px;
+            margin: 15px 0;
+            border-radius: 10px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        .section-title {
+            color: #2c3e50;
+            border-bottom: 2px solid #3498db;
+            padding-bottom: 10px;
+            margin-bottom: 15px;
+        }
+        .metrics-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 15px;
+            margin: 15px 0;
+        }
+        .metric-card {
+            background: #f8f9fa;
+            padding: 15px;
+            border-radius: 8px;
+            border-left: 4px solid #3498db;
+            text-align: center;
+        }
+        .metric-value {
+            font-size: 24px;
+            font-weight: bold;
+            color: #2c3e50;
+        }
+        .metric-label {
+            font-size: 14px;
+            color: #7f8c8d;
+            margin-top: 5px;
+        }
+        .data-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 15px 0;
+        }
+        .data-table th, .data-table td {
+            padding: 12px;
+            text-align: left;
+            border-bottom: 1px solid #ecf0f1;
+        }
+        .data-table th {
+            background: #34495e;
+            color: white;
+        }
+        .data-table tr:hover {
+            background: #f8f9fa;
+        }
+        .alert {
+            background: #fff3cd;
+            border: 1px solid #ffeaa7;
+            padding: 12px;
+            border-radius: 5px;
+            margin: 10px 0;
+        }
+        .critical {
+            background: #f8d7da;
+            border-color: #f5c6cb;
+            color: #721c24;
+        }
+        .warning {
+            background: #fff3cd;
+            border-color: #ffeaa7;
+            color: #856404;
+        }
+        .btn {
+            background: #3498db;
+            color: white;
+            border: none;
+            padding: 10px 15px;
+            border-radius: 5px;
+            cursor: pointer;
+            margin: 5px;
+        }
+        .btn:hover {
+            background: #2980b9;
+        }
+        .source-badge {
+            background: #95a5a6;
+            color: white;
+            padding: 2px 8px;
+            border-radius: 10px;
+            font-size: 12px;
+            margin-left: 10px;
+        }
+        .mongodb-badge { background: #13aa52; }
+        .redis-badge { background: #d82c20; }
+        .mysql-badge { background: #4479a1; }
+    </style>
+</head>
+<body>
+    <div class="dashboard-header">
+        <h1>🏥 Comprehensive Hospital Operations Platform</h1>
+        <p>Real-time analytics powered by SQL + MongoDB + Redis</p>
+        <div id="last-updated">Loading...</div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">📊 Executive Summary <span class="source-badge redis-badge">Redis</span></h2>
+        <div class="metrics-grid" id="executive-metrics">
+            <!-- Filled by JavaScript -->
+        </div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">🚨 Critical Alerts & Notifications</h2>
+        <div id="alerts-container">
+            <!-- Filled by JavaScript -->
+        </div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">👥 Patient Analytics <span class="source-badge mongodb-badge">MongoDB</span></h2>
+        <button class="btn" onclick="loadPatientAnalytics()">Refresh Patient Analytics</button>
+        <div id="patient-analytics">
+            <!-- Filled by JavaScript -->
+        </div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">🏥 Department Performance <span class="source-badge mongodb-badge">MongoDB</span></h2>
+        <button class="btn" onclick="loadDepartmentStats()">Refresh Department Stats</button>
+        <div id="department-stats">
+            <!-- Filled by JavaScript -->
+        </div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">💰 Financial Analysis <span class="source-badge mongodb-badge">MongoDB</span></h2>
+        <button class="btn" onclick="loadFinancialAnalysis()">Refresh Financial Data</button>
+        <div id="financial-analysis">
+            <!-- Filled by JavaScript -->
+        </div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">🩺 Clinical Insights <span class="source-badge mongodb-badge">MongoDB</span></h2>
+        <button class="btn" onclick="loadClinicalInsights()">Refresh Clinical Data</button>
+        <div id="clinical-insights">
+            <!-- Filled by JavaScript -->
+        </div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">⚡ Real-time Operations <span class="source-badge redis-badge">Redis</span></h2>
+        <button class="btn" onclick="loadRealtimeOperations()">Refresh Real-time Data</button>
+        <div id="realtime-operations">
+            <!-- Filled by JavaScript -->
+        </div>
+    </div>
+
+    <script>
+        // Load all data when page loads
+        document.addEventListener('DOMContentLoaded', function() {
+            loadExecutiveSummary();
+            loadAlerts();
+            setInterval(loadExecutiveSummary, 10000); // Refresh every 10 seconds
+            setInterval(loadAlerts, 15000); // Refresh alerts every 15 seconds
+        });
+
+        function loadExecutiveSummary() {
+            fetch('/api/executive-summary')
+                .then(response => response.json())
+                .then(data => {
+                    document.getElementById('last-updated').textContent = 'Last Updated: ' + data.last_updated;
+                    
+                    let html = `
+                        <div class="metric-card">
+                            <div class="metric-value">${data.total_patients}</div>
+                            <div class="metric-label">Total Patients</div>
+                        </div>
+                        <div class="metric-card">
+                            <div class="metric-value">${data.high_cost_percentage}%</div>
+                            <div class="metric-label">High-Cost Patients</div>
+                        </div>
+                        <div class="metric-card">
+                            <div class="metric-value">${data.total_encounters}</div>
+                            <div class="metric-label">Total Encounters</div>
+                        </div>
+                        <div class="metric-card">
+                            <div class="metric-value">$${data.avg_cost_per_patient}</div>
+                            <div class="metric-label">Avg Cost/Patient</div>
+                        </div>
+                        <div class="metric-card">
+                            <div class="metric-value">${data.departments_count}</div>
+                            <div class="metric-label">Active Departments</div>
+                        </div>
+                    `;
+                    document.getElementById('executive-metrics').innerHTML = html;
+                });
+        }
+
+        function loadAlerts() {
+            fetch('/api/alerts')
+                .then(response => response.json())
+                .then(data => {
+                    let html = '';
+                    data.alerts.forEach(alert => {
+                        const alertClass = alert.severity === 'critical' ? 'critical' : 'warning';
+                        html += `<div class="alert ${alertClass}">${alert.message}</div>`;
+                    });
+                    document.getElementById('alerts-container').innerHTML = html;
+                });
+        }
+
+        function loadPatientAnalytics() {
+            fetch('/api/patient-analytics')
+                .then(response => response.json())
+                .then(data => {
+                    let html = `
+                        <h3>Patient Demographics</h3>
+                        <div class="metrics-grid">
+                            <div class="metric-card">
+                                <div class="metric-value">${data.demographics.avg_age}</div>
+                                <div class="metric-label">Average Age</div>
+                            </div>
+                            <div class="metric-card">
+                                <div class="metric-value">${data.demographics.gender_distribution.M || 0}</div>
+                                <div class="metric-label">Male Patients</div>
+                            </div>
+                            <div class="metric-card">
+                                <div class="metric-value">${data.demographics.gender_distribution.F || 0}</div>
+                                <div class="metric-label">Female Patients</div>
+                            </div>
+                        </div>
+                        
+                        <h3>Chronic Conditions Analysis</h3>
+                        <table class="data-table">
+                            <tr><th>Condition</th><th>Patient Count</th><th>Prevalence</th></tr>
+                    `;
+                    
+                    data.top_conditions.forEach(condition => {
+                        html += `<tr>
+                            <td>${condition.name}</td>
+                            <td>${condition.count}</td>
+                            <td>${condition.percentage}%</td>
+                        </tr>`;
+                    });
+                    
+                    html += `</table>`;
+                    document.getElementById('patient-analytics').innerHTML = html;
+                });
+        }
+
+        function loadDepartmentStats() {
+            fetch('/api/department-stats')
+                .then(response => response.json())
+                .then(data => {
+                    let html = `<table class="data-table">
+                        <tr><th>Department</th><th>Encounters</th><th>Unique Patients</th><th>Avg Encounters/Patient</th><th>Total Revenue</th></tr>`;
+                    
+                    data.departments.forEach(dept => {
+                        html += `<tr>
+                            <td>${dept.name}</td>
+                            <td>${dept.encounters}</td>
+                            <td>${dept.unique_patients}</td>
+                            <td>${dept.encounters_per_patient}</td>
+                            <td>$${dept.revenue.toLocaleString()}</td>
+                        </tr>`;
+                    });
+                    
+                    html += `</table>`;
+                    document.getElementById('department-stats').innerHTML = html;
+                });
+        }
+
+        function loadFinancialAnalysis() {
+            fetch('/api/financial-analysis')
+                .then(response => response.json())
+                .then(data => {
+                    let html = `
+                        <h3>Cost Distribution</h3>
+                        <div class="metrics-grid">
+                    `;
+                    
+                    data.cost_distribution.forEach(bracket => {
+                        html += `
+                            <div class="metric-card">
+                                <div class="metric-value">${bracket.percentage}%</div>
+                                <div class="metric-label">${bracket.range}</div>
+                                <div style="font-size: 12px;">${bracket.count} patients</div>
+                            </div>
+                        `;
+                    });
+                    
+                    html += `</div>
+                        <h3>Top 5 High-Cost Patients</h3>
+                        <table class="data-table">
+                            <tr><th>Patient Name</th><th>Total Costs</th><th>Encounters</th><th>Chronic Conditions</th></tr>`;
+                    
+                    data.top_high_cost_patients.forEach(patient => {
+                        html += `<tr>
+                            <td>${patient.name}</td>
+                            <td>$${patient.costs.toLocaleString()}</td>
+                            <td>${patient.encounters}</td>
+                            <td>${patient.chronic_conditions}</td>
+                        </tr>`;
+                    });
+                    
+                    html += `</table>`;
+                    document.getElementById('financial-analysis').innerHTML = html;
+                });
+        }
+
+        function loadClinicalInsights() {
+            fetch('/api/clinical-insights')
+                .then(response => response.json())
+                .then(data => {
+                    let html = `
+                        <h3>Condition Co-occurrence Analysis</h3>
+                        <table class="data-table">
+                            <tr><th>Primary Condition</th><th>Common Co-conditions (lift, % of primary)</th><th>Patient Count</th></tr>`;
+                    
+                    data.condition_patterns.forEach(pattern => {
+                        const coConditions = pattern.co_conditions.map(co =>
+                            `${co.name} (${co.lift}×, ${(co.confidence * 100).toFixed(0)}%)`);
+                        html += `<tr>
+                            <td>${pattern.primary}</td>
+                            <td>${coConditions.join(', ')}</td>
+                            <td>${pattern.patient_count}</td>
+                        </tr>`;
+                    });
+                    
+                    html += `</table>`;
+                    document.getElementById('clinical-insights').innerHTML = html;
+                });
+        }
+
+        function loadRealtimeOperations() {
+            fetch('/api/realtime-operations')
+                .then(response => response.json())
+                .then(data => {
+                    let html = `
+                        <h3>Live Hospital Metrics</h3>
+                        <div class="metrics-grid">
+                            <div class="metric-card">
+                                <div class="metric-value">${data.today_encounters}</div>
+                                <div class="metric-label">Today's Encounters</div>
+                            </div>
+                            <div class="metric-card">
+                                <div class="metric-value">${data.window_encounters}</div>
+                                <div class="metric-label">Encounters (last ${data.window_hours}h)</div>
+                            </div>
+                            <div class="metric-card">
+                                <div class="metric-value">${data.active_patients}</div>
+                                <div class="metric-label">Active Patients</div>
+                            </div>
+                        </div>
+                        
+                        <h3>Department Live Status</h3>
+                        <table class="data-table">
+                            <tr><th>Department</th><th>Today's Activity</th><th>Throughput</th><th>Status</th></tr>`;
+                    
+                    data.department_activity.forEach(dept => {
+                        html += `<tr>
+                            <td>${dept.name}</td>
+                            <td>${dept.today_encounters} encounters</td>
+                            <td>${dept.per_hour}/hour</td>
+                            <td>${dept.status}</td>
+                        </tr>`;
+                    });
+                    
+                    html += `</table>`;
+                    document.getElementById('realtime-operations').innerHTML = html;
+                });
+        }
+    </script>
+</body>
+</html>
+'''
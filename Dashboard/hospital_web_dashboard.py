@@ -1,13 +1,30 @@
 from flask import Flask, render_template, jsonify, request
-import pymongo
 from datetime import datetime
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.connections import get_mongo_client, get_mongo_db, get_redis
+from common.condition_search import count_patients_with_condition, search_conditions
+from common.cost_distribution import get_cost_distribution
+from common.response_cache import ResponseCache, LRUCacheBackend, cached_response
+from common.conditional_get import install_conditional_get
+from common.rollups import rollups_generated_at
 
 app = Flask(__name__)
 
 # Connect to MongoDB
-client = pymongo.MongoClient('mongodb://localhost:27017/')
-db = client['hospital_platform']
+client = get_mongo_client()
+db = get_mongo_db()
+
+# Responses are cached in this process; Redis only supplies the generation
+# counter the migrator bumps to invalidate them
+redis_client = get_redis()
+response_cache = ResponseCache(LRUCacheBackend(), redis_client)
+
+# Polling clients revalidate /api/* with If-None-Match and get 304 until the data changes
+install_conditional_get(app, redis_client, mongo_stamp=lambda: rollups_generated_at(db))
 
 @app.route('/')
 def home():
@@ -145,6 +162,7 @@ def home():
     """
 
 @app.route('/api/metrics')
+@cached_response(response_cache)
 def api_metrics():
     patients = db['patient_summaries']
     
@@ -152,9 +170,7 @@ def api_metrics():
     high_cost_count = patients.count_documents({
         "clinical_summary.healthcare_metrics.total_expenses": {"$gt": 50000}
     })
-    hypertension_count = patients.count_documents({
-        "conditions.description": {"$regex": "Hypertension", "$options": "i"}
-    })
+    hypertension_count = count_patients_with_condition(patients, "Hypertension")
     
     # Check for VA Boston extreme utilization
     va_boston_patients = list(patients.aggregate([
@@ -173,19 +189,18 @@ def api_metrics():
     })
 
 @app.route('/api/search')
+@cached_response(response_cache)
 def api_search():
     condition = request.args.get('condition', '')
     patients = db['patient_summaries']
     
-    count = patients.count_documents({
-        "conditions.description": {"$regex": condition, "$options": "i"}
+    # Count and sample patients from one indexed query
+    count, sample_patients = search_conditions(patients, condition, {
+        "demographics.name": 1,
+        "clinical_summary.total_encounters": 1,
+        "clinical_summary.healthcare_metrics.total_expenses": 1
     })
     
-    # Get sample patients
-    sample_patients = list(patients.find({
-        "conditions.description": {"$regex": condition, "$options": "i"}
-    }).limit(5))
-    
     formatted_patients = []
     for patient in sample_patients:
         formatted_patients.append({
@@ -200,6 +215,7 @@ def api_search():
     })
 
 @app.route('/api/departments')
+@cached_response(response_cache)
 def api_departments():
     patients = db['patient_summaries']
     
@@ -225,30 +241,17 @@ def api_departments():
     return jsonify({'departments': formatted_depts})
 
 @app.route('/api/cost-analysis')
+@cached_response(response_cache)
 def api_cost_analysis():
     patients = db['patient_summaries']
-    total_patients = patients.count_documents({})
-    
-    cost_brackets = [
-        (0, 10000, "Under $10K"),
-        (10000, 50000, "$10K-$50K"),
-        (50000, 100000, "$50K-$100K"), 
-        (100000, 1000000, "$100K-$1M"),
-        (1000000, 5000000, "Over $1M")
-    ]
+    cost_distribution = get_cost_distribution(patients)
     
     brackets_data = []
-    for min_cost, max_cost, label in cost_brackets:
-        count = patients.count_documents({
-            "clinical_summary.healthcare_metrics.total_expenses": {
-                "$gte": min_cost, "$lt": max_cost
-            }
-        })
-        percentage = round((count / total_patients) * 100, 1)
+    for bracket in cost_distribution['brackets']:
         brackets_data.append({
-            'range': label,
-            'count': count,
-            'percentage': percentage
+            'range': bracket['range'],
+            'count': bracket['count'],
+            'percentage': bracket['percentage']
         })
     
     return jsonify({'cost_brackets': brackets_data})
@@ -1,408 +1,49 @@
-from flask import Flask, render_template_string, jsonify
-import pymongo
-import redis
+from flask import Flask, render_template_string, jsonify, request
 from datetime import datetime
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.connections import get_mongo_client, get_mongo_db, get_redis
+from common.rollups import (
+    get_rollup, rollups_generated_at, KPIS_ROLLUP, DEMOGRAPHICS_ROLLUP, TOP_CONDITIONS_ROLLUP, DEPARTMENTS_ROLLUP, COST_DISTRIBUTION_ROLLUP,
+    COMORBIDITY_ROLLUP
+)
+from common.dashboard_snapshot import read_live_dashboard
+from common.encounter_events import get_event_bus, parse_event_payload, read_live_counters
+from common.live_aggregates import top_conditions, unique_patients, apply_unique_patients
+from common.condition_index import ConditionIndex
+from common.response_cache import ResponseCache, RedisCacheBackend, cached_response
+from common.conditional_get import install_conditional_get
+from dashboard_page import HTML_TEMPLATE, HIGH_COST_PATIENT_FIELDS, code_list, condition_cohort
 
 app = Flask(__name__)
 
 # Database connections
-mongo_client = pymongo.MongoClient('mongodb://localhost:27017/')
-mongo_db = mongo_client['hospital_platform']
+mongo_client = get_mongo_client()
+mongo_db = get_mongo_db()
 patients_collection = mongo_db['patient_summaries']
 
-redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+redis_client = get_redis()
 
-# HTML Template with separate sections
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>🏥 Comprehensive Hospital Operations Dashboard</title>
-    <style>
-        body { 
-            font-family: 'Segoe UI', Arial, sans-serif; 
-            margin: 0; 
-            padding: 20px; 
-            background: #f0f2f5;
-            color: #333;
-        }
-        .dashboard-header {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-            text-align: center;
-        }
-        .section {
-            background: white;
-            padding: 20px;
-            margin: 15px 0;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        .section-title {
-            color: #2c3e50;
-            border-bottom: 2px solid #3498db;
-            padding-bottom: 10px;
-            margin-bottom: 15px;
-        }
-        .metrics-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin: 15px 0;
-        }
-        .metric-card {
-            background: #f8f9fa;
-            padding: 15px;
-            border-radius: 8px;
-            border-left: 4px solid #3498db;
-            text-align: center;
-        }
-        .metric-value {
-            font-size: 24px;
-            font-weight: bold;
-            color: #2c3e50;
-        }
-        .metric-label {
-            font-size: 14px;
-            color: #7f8c8d;
-            margin-top: 5px;
-        }
-        .data-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 15px 0;
-        }
-        .data-table th, .data-table td {
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #ecf0f1;
-        }
-        .data-table th {
-            background: #34495e;
-            color: white;
-        }
-        .data-table tr:hover {
-            background: #f8f9fa;
-        }
-        .alert {
-            background: #fff3cd;
-            border: 1px solid #ffeaa7;
-            padding: 12px;
-            border-radius: 5px;
-            margin: 10px 0;
-        }
-        .critical {
-            background: #f8d7da;
-            border-color: #f5c6cb;
-            color: #721c24;
-        }
-        .warning {
-            background: #fff3cd;
-            border-color: #ffeaa7;
-            color: #856404;
-        }
-        .btn {
-            background: #3498db;
-            color: white;
-            border: none;
-            padding: 10px 15px;
-            border-radius: 5px;
-            cursor: pointer;
-            margin: 5px;
-        }
-        .btn:hover {
-            background: #2980b9;
-        }
-        .source-badge {
-            background: #95a5a6;
-            color: white;
-            padding: 2px 8px;
-            border-radius: 10px;
-            font-size: 12px;
-            margin-left: 10px;
-        }
-        .mongodb-badge { background: #13aa52; }
-        .redis-badge { background: #d82c20; }
-        .mysql-badge { background: #4479a1; }
-    </style>
-</head>
-<body>
-    <div class="dashboard-header">
-        <h1>🏥 Comprehensive Hospital Operations Platform</h1>
-        <p>Real-time analytics powered by SQL + MongoDB + Redis</p>
-        <div id="last-updated">Loading...</div>
-    </div>
+# MongoDB-backed responses are shared through Redis by every dashboard process
+# and dropped when the migrator publishes new data
+response_cache = ResponseCache(RedisCacheBackend(redis_client), redis_client)
 
-    <div class="section">
-        <h2 class="section-title">📊 Executive Summary <span class="source-badge redis-badge">Redis</span></h2>
-        <div class="metrics-grid" id="executive-metrics">
-            <!-- Filled by JavaScript -->
-        </div>
-    </div>
+# Polling clients revalidate /api/* with If-None-Match and get 304 until the data changes
+# (live counters change with every ingested event, so they are always sent in full)
+install_conditional_get(
+    app, redis_client, exempt=('/api/realtime-operations',),
+    mongo_stamp=lambda: rollups_generated_at(mongo_db)
+)
 
-    <div class="section">
-        <h2 class="section-title">🚨 Critical Alerts & Notifications</h2>
-        <div id="alerts-container">
-            <!-- Filled by JavaScript -->
-        </div>
-    </div>
+# Encounter events posted to /api/encounter-events feed the live counters
+event_bus = get_event_bus(redis_client)
 
-    <div class="section">
-        <h2 class="section-title">👥 Patient Analytics <span class="source-badge mongodb-badge">MongoDB</span></h2>
-        <button class="btn" onclick="loadPatientAnalytics()">Refresh Patient Analytics</button>
-        <div id="patient-analytics">
-            <!-- Filled by JavaScript -->
-        </div>
-    </div>
-
-    <div class="section">
-        <h2 class="section-title">🏥 Department Performance <span class="source-badge mongodb-badge">MongoDB</span></h2>
-        <button class="btn" onclick="loadDepartmentStats()">Refresh Department Stats</button>
-        <div id="department-stats">
-            <!-- Filled by JavaScript -->
-        </div>
-    </div>
-
-    <div class="section">
-        <h2 class="section-title">💰 Financial Analysis <span class="source-badge mongodb-badge">MongoDB</span></h2>
-        <button class="btn" onclick="loadFinancialAnalysis()">Refresh Financial Data</button>
-        <div id="financial-analysis">
-            <!-- Filled by JavaScript -->
-        </div>
-    </div>
-
-    <div class="section">
-        <h2 class="section-title">🩺 Clinical Insights <span class="source-badge mongodb-badge">MongoDB</span></h2>
-        <button class="btn" onclick="loadClinicalInsights()">Refresh Clinical Data</button>
-        <div id="clinical-insights">
-            <!-- Filled by JavaScript -->
-        </div>
-    </div>
-
-    <div class="section">
-        <h2 class="section-title">⚡ Real-time Operations <span class="source-badge redis-badge">Redis</span></h2>
-        <button class="btn" onclick="loadRealtimeOperations()">Refresh Real-time Data</button>
-        <div id="realtime-operations">
-            <!-- Filled by JavaScript -->
-        </div>
-    </div>
-
-    <script>
-        // Load all data when page loads
-        document.addEventListener('DOMContentLoaded', function() {
-            loadExecutiveSummary();
-            loadAlerts();
-            setInterval(loadExecutiveSummary, 10000); // Refresh every 10 seconds
-            setInterval(loadAlerts, 15000); // Refresh alerts every 15 seconds
-        });
-
-        function loadExecutiveSummary() {
-            fetch('/api/executive-summary')
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('last-updated').textContent = 'Last Updated: ' + data.last_updated;
-                    
-                    let html = `
-                        <div class="metric-card">
-                            <div class="metric-value">${data.total_patients}</div>
-                            <div class="metric-label">Total Patients</div>
-                        </div>
-                        <div class="metric-card">
-                            <div class="metric-value">${data.high_cost_percentage}%</div>
-                            <div class="metric-label">High-Cost Patients</div>
-                        </div>
-                        <div class="metric-card">
-                            <div class="metric-value">${data.total_encounters}</div>
-                            <div class="metric-label">Total Encounters</div>
-                        </div>
-                        <div class="metric-card">
-                            <div class="metric-value">$${data.avg_cost_per_patient}</div>
-                            <div class="metric-label">Avg Cost/Patient</div>
-                        </div>
-                        <div class="metric-card">
-                            <div class="metric-value">${data.departments_count}</div>
-                            <div class="metric-label">Active Departments</div>
-                        </div>
-                    `;
-                    document.getElementById('executive-metrics').innerHTML = html;
-                });
-        }
-
-        function loadAlerts() {
-            fetch('/api/alerts')
-                .then(response => response.json())
-                .then(data => {
-                    let html = '';
-                    data.alerts.forEach(alert => {
-                        const alertClass = alert.severity === 'critical' ? 'critical' : 'warning';
-                        html += `<div class="alert ${alertClass}">${alert.message}</div>`;
-                    });
-                    document.getElementById('alerts-container').innerHTML = html;
-                });
-        }
-
-        function loadPatientAnalytics() {
-            fetch('/api/patient-analytics')
-                .then(response => response.json())
-                .then(data => {
-                    let html = `
-                        <h3>Patient Demographics</h3>
-                        <div class="metrics-grid">
-                            <div class="metric-card">
-                                <div class="metric-value">${data.demographics.avg_age}</div>
-                                <div class="metric-label">Average Age</div>
-                            </div>
-                            <div class="metric-card">
-                                <div class="metric-value">${data.demographics.gender_distribution.M || 0}</div>
-                                <div class="metric-label">Male Patients</div>
-                            </div>
-                            <div class="metric-card">
-                                <div class="metric-value">${data.demographics.gender_distribution.F || 0}</div>
-                                <div class="metric-label">Female Patients</div>
-                            </div>
-                        </div>
-                        
-                        <h3>Chronic Conditions Analysis</h3>
-                        <table class="data-table">
-                            <tr><th>Condition</th><th>Patient Count</th><th>Prevalence</th></tr>
-                    `;
-                    
-                    data.top_conditions.forEach(condition => {
-                        html += `<tr>
-                            <td>${condition.name}</td>
-                            <td>${condition.count}</td>
-                            <td>${condition.percentage}%</td>
-                        </tr>`;
-                    });
-                    
-                    html += `</table>`;
-                    document.getElementById('patient-analytics').innerHTML = html;
-                });
-        }
-
-        function loadDepartmentStats() {
-            fetch('/api/department-stats')
-                .then(response => response.json())
-                .then(data => {
-                    let html = `<table class="data-table">
-                        <tr><th>Department</th><th>Encounters</th><th>Unique Patients</th><th>Avg Encounters/Patient</th><th>Total Revenue</th></tr>`;
-                    
-                    data.departments.forEach(dept => {
-                        html += `<tr>
-                            <td>${dept.name}</td>
-                            <td>${dept.encounters}</td>
-                            <td>${dept.unique_patients}</td>
-                            <td>${dept.encounters_per_patient}</td>
-                            <td>$${dept.revenue.toLocaleString()}</td>
-                        </tr>`;
-                    });
-                    
-                    html += `</table>`;
-                    document.getElementById('department-stats').innerHTML = html;
-                });
-        }
-
-        function loadFinancialAnalysis() {
-            fetch('/api/financial-analysis')
-                .then(response => response.json())
-                .then(data => {
-                    let html = `
-                        <h3>Cost Distribution</h3>
-                        <div class="metrics-grid">
-                    `;
-                    
-                    data.cost_distribution.forEach(bracket => {
-                        html += `
-                            <div class="metric-card">
-                                <div class="metric-value">${bracket.percentage}%</div>
-                                <div class="metric-label">${bracket.range}</div>
-                                <div style="font-size: 12px;">${bracket.count} patients</div>
-                            </div>
-                        `;
-                    });
-                    
-                    html += `</div>
-                        <h3>Top 5 High-Cost Patients</h3>
-                        <table class="data-table">
-                            <tr><th>Patient Name</th><th>Total Costs</th><th>Encounters</th><th>Chronic Conditions</th></tr>`;
-                    
-                    data.top_high_cost_patients.forEach(patient => {
-                        html += `<tr>
-                            <td>${patient.name}</td>
-                            <td>$${patient.costs.toLocaleString()}</td>
-                            <td>${patient.encounters}</td>
-                            <td>${patient.chronic_conditions}</td>
-                        </tr>`;
-                    });
-                    
-                    html += `</table>`;
-                    document.getElementById('financial-analysis').innerHTML = html;
-                });
-        }
-
-        function loadClinicalInsights() {
-            fetch('/api/clinical-insights')
-                .then(response => response.json())
-                .then(data => {
-                    let html = `
-                        <h3>Condition Co-occurrence Analysis</h3>
-                        <table class="data-table">
-                            <tr><th>Primary Condition</th><th>Common Co-conditions</th><th>Patient Count</th></tr>`;
-                    
-                    data.condition_patterns.forEach(pattern => {
-                        html += `<tr>
-                            <td>${pattern.primary}</td>
-                            <td>${pattern.co_conditions.join(', ')}</td>
-                            <td>${pattern.patient_count}</td>
-                        </tr>`;
-                    });
-                    
-                    html += `</table>`;
-                    document.getElementById('clinical-insights').innerHTML = html;
-                });
-        }
-
-        function loadRealtimeOperations() {
-            fetch('/api/realtime-operations')
-                .then(response => response.json())
-                .then(data => {
-                    let html = `
-                        <h3>Live Hospital Metrics</h3>
-                        <div class="metrics-grid">
-                            <div class="metric-card">
-                                <div class="metric-value">${data.today_encounters}</div>
-                                <div class="metric-label">Today's Encounters</div>
-                            </div>
-                            <div class="metric-card">
-                                <div class="metric-value">${data.active_patients}</div>
-                                <div class="metric-label">Active Patients</div>
-                            </div>
-                        </div>
-                        
-                        <h3>Department Live Status</h3>
-                        <table class="data-table">
-                            <tr><th>Department</th><th>Today's Activity</th><th>Status</th></tr>`;
-                    
-                    data.department_activity.forEach(dept => {
-                        html += `<tr>
-                            <td>${dept.name}</td>
-                            <td>${dept.today_encounters} encounters</td>
-                            <td>${dept.status}</td>
-                        </tr>`;
-                    });
-                    
-                    html += `</table>`;
-                    document.getElementById('realtime-operations').innerHTML = html;
-                });
-        }
-    </script>
-</body>
-</html>
-'''
+# Condition code -> patient posting lists for cohort queries; loaded on first
+# use, then topped up with re-migrated patients at most once a minute
+condition_index = ConditionIndex()
 
 @app.route('/')
 def dashboard():
@@ -410,29 +51,31 @@ def dashboard():
 
 # API Endpoints for each section
 @app.route('/api/executive-summary')
+@cached_response(response_cache)
 def api_executive_summary():
     """Combined data from Redis and MongoDB"""
     # Redis data (fast)
-    total_patients = redis_client.get('dashboard:total_patients') or 990
-    high_cost_patients = redis_client.get('dashboard:high_cost_patients') or 912
+    live = read_live_dashboard(redis_client, strings=('total_patients', 'high_cost_patients'), hashes=('departments',))
     
-    # MongoDB data (complex)
-    total_encounters = sum(p['clinical_summary']['total_encounters'] for p in patients_collection.find())
-    total_costs = sum(p['clinical_summary']['healthcare_metrics']['total_expenses'] for p in patients_collection.find())
+    # MongoDB KPIs, precomputed by the last migration; they stand in for the
+    # Redis counters until the Redis dashboard has been populated
+    kpis = get_rollup(mongo_db, KPIS_ROLLUP)
+    total_patients = int(live['total_patients'] or kpis['total_patients'])
+    high_cost_patients = int(live['high_cost_patients'] or kpis['high_cost_patients'])
     
     return jsonify({
         'total_patients': total_patients,
-        'high_cost_percentage': round((int(high_cost_patients) / int(total_patients)) * 100, 1),
-        'total_encounters': total_encounters,
-        'avg_cost_per_patient': round(total_costs / int(total_patients), 2),
-        'departments_count': redis_client.hlen('dashboard:departments'),
+        'high_cost_percentage': round((high_cost_patients / total_patients) * 100, 1) if total_patients else 0,
+        'total_encounters': kpis['total_encounters'],
+        'avg_cost_per_patient': kpis['avg_cost_per_patient'],
+        'departments_count': len(live['departments']),
         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     })
 
 @app.route('/api/alerts')
 def api_alerts():
     """Critical alerts from system analysis"""
-    high_cost_percentage = (912 / 990) * 100  # From your analysis
+    high_cost_percentage = get_rollup(mongo_db, KPIS_ROLLUP)['high_cost_percentage']
     
     alerts = []
     if high_cost_percentage > 80:
@@ -442,7 +85,7 @@ def api_alerts():
         })
     
     # Check for extreme utilization
-    dept_encounters = redis_client.hgetall('dashboard:departments')
+    dept_encounters = read_live_dashboard(redis_client, hashes=('departments',))['departments']
     for dept, encounters in dept_encounters.items():
         if int(encounters) > 250:
             alerts.append({
@@ -454,85 +97,42 @@ def api_alerts():
 
 @app.route('/api/patient-analytics')
 def api_patient_analytics():
-    """Deep patient analytics from MongoDB"""
-    pipeline = [
-        {"$group": {
-            "_id": "$demographics.gender",
-            "count": {"$sum": 1},
-            "avg_age": {"$avg": "$demographics.age"}
-        }}
-    ]
-    gender_stats = list(patients_collection.aggregate(pipeline))
-    
-    gender_distribution = {}
-    total_age = 0
-    total_count = 0
-    
-    for stat in gender_stats:
-        gender_distribution[stat['_id']] = stat['count']
-        total_age += stat['avg_age'] * stat['count']
-        total_count += stat['count']
-    
-    avg_age = total_age / total_count if total_count > 0 else 0
-    
-    # Top conditions
-    condition_pipeline = [
-        {"$unwind": "$conditions"},
-        {"$group": {
-            "_id": "$conditions.description",
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    top_conditions = list(patients_collection.aggregate(condition_pipeline))
+    """Demographics from the rollups, condition leaderboard from the live sorted set"""
+    demographics = get_rollup(mongo_db, DEMOGRAPHICS_ROLLUP)
+    total_patients = sum(demographics['gender_distribution'].values())
+    leaders = top_conditions(redis_client, 10, total_patients)
+    if not leaders:
+        # Live aggregates not built yet
+        leaders = get_rollup(mongo_db, TOP_CONDITIONS_ROLLUP)['conditions'][:10]
     
     formatted_conditions = []
-    for condition in top_conditions:
+    for condition in leaders:
         formatted_conditions.append({
-            'name': condition['_id'],
+            'name': condition['name'],
             'count': condition['count'],
-            'percentage': round((condition['count'] / 990) * 100, 1)
+            'percentage': condition['percentage']
         })
     
     return jsonify({
         'demographics': {
-            'avg_age': round(avg_age, 1),
-            'gender_distribution': gender_distribution
+            'avg_age': demographics['avg_age'],
+            'gender_distribution': demographics['gender_distribution']
         },
         'top_conditions': formatted_conditions
     })
 
 @app.route('/api/department-stats')
 def api_department_stats():
-    """Department performance from MongoDB"""
-    pipeline = [
-        {"$unwind": "$encounters"},
-        {"$group": {
-            "_id": "$encounters.providers.organization",
-            "encounters": {"$sum": 1},
-            "revenue": {"$sum": "$encounters.financial.total_claim_cost"},
-            "unique_patients": {"$addToSet": "$_id"}
-        }},
-        {"$project": {
-            "name": "$_id",
-            "encounters": 1,
-            "revenue": 1,
-            "unique_patients_count": {"$size": "$unique_patients"},
-            "encounters_per_patient": {"$divide": ["$encounters", {"$size": "$unique_patients"}]}
-        }},
-        {"$sort": {"encounters": -1}},
-        {"$limit": 10}
-    ]
-    
-    departments = list(patients_collection.aggregate(pipeline))
+    """Department performance from the rollups, unique patients from the live HyperLogLogs"""
+    departments = get_rollup(mongo_db, DEPARTMENTS_ROLLUP)['departments'][:10]
+    apply_unique_patients(departments, unique_patients(redis_client, [dept['name'] for dept in departments]))
     
     formatted_depts = []
     for dept in departments:
         formatted_depts.append({
             'name': dept['name'],
             'encounters': dept['encounters'],
-            'unique_patients': dept['unique_patients_count'],
+            'unique_patients': dept['unique_patients'],
             'encounters_per_patient': round(dept['encounters_per_patient'], 1),
             'revenue': round(dept['revenue'], 2)
         })
@@ -540,45 +140,30 @@ def api_department_stats():
     return jsonify({'departments': formatted_depts})
 
 @app.route('/api/financial-analysis')
+@cached_response(response_cache)
 def api_financial_analysis():
     """Financial insights from MongoDB"""
-    cost_brackets = [
-        (0, 10000, "Under $10K"),
-        (10000, 50000, "$10K-$50K"),
-        (50000, 100000, "$50K-$100K"),
-        (100000, 1000000, "$100K-$1M"),
-        (1000000, 5000000, "Over $1M")
-    ]
-    
     cost_distribution = []
-    for min_cost, max_cost, label in cost_brackets:
-        count = patients_collection.count_documents({
-            "clinical_summary.healthcare_metrics.total_expenses": {
-                "$gte": min_cost, "$lt": max_cost
-            }
-        })
+    for bracket in get_rollup(mongo_db, COST_DISTRIBUTION_ROLLUP)['brackets']:
         cost_distribution.append({
-            'range': label,
-            'count': count,
-            'percentage': round((count / 990) * 100, 1)
+            'range': bracket['range'],
+            'count': bracket['count'],
+            'percentage': bracket['percentage']
         })
     
     # High-cost patients
     high_cost_patients = list(patients_collection.find({
         "clinical_summary.healthcare_metrics.total_expenses": {"$gt": 1000000}
-    }).sort("clinical_summary.healthcare_metrics.total_expenses", -1).limit(5))
+    }, HIGH_COST_PATIENT_FIELDS).sort("clinical_summary.healthcare_metrics.total_expenses", -1).limit(5))
     
     formatted_patients = []
     for patient in high_cost_patients:
-        chronic_conditions = len([c for c in patient.get('conditions', []) 
-                                if any(keyword in c.get('description', '') 
-                                      for keyword in ['Hypertension', 'Diabetes', 'Heart', 'Chronic'])])
-        
         formatted_patients.append({
             'name': f"{patient['demographics']['name']['first']} {patient['demographics']['name']['last']}",
             'costs': patient['clinical_summary']['healthcare_metrics']['total_expenses'],
             'encounters': patient['clinical_summary']['total_encounters'],
-            'chronic_conditions': chronic_conditions
+            # Classified by condition code at migration time
+            'chronic_conditions': patient['clinical_summary'].get('chronic_count', 0)
         })
     
     return jsonify({
@@ -588,52 +173,60 @@ def api_financial_analysis():
 
 @app.route('/api/clinical-insights')
 def api_clinical_insights():
-    """Clinical patterns from MongoDB"""
-    # This is a simplified version - in real scenario, you'd use more complex aggregation
-    condition_patterns = [
-        {
-            'primary': 'Hypertension',
-            'co_conditions': ['Diabetes', 'Obesity', 'High Cholesterol'],
-            'patient_count': 85
-        },
-        {
-            'primary': 'Diabetes', 
-            'co_conditions': ['Hypertension', 'Neuropathy', 'Kidney Disease'],
-            'patient_count': 62
-        },
-        {
-            'primary': 'COPD',
-            'co_conditions': ['Hypertension', 'Heart Disease', 'Obesity'],
-            'patient_count': 28
-        }
-    ]
-    
-    return jsonify({'condition_patterns': condition_patterns})
+    """Top co-conditions by lift for the most prevalent conditions, from the comorbidity rollup"""
+    return jsonify({'condition_patterns': get_rollup(mongo_db, COMORBIDITY_ROLLUP)['patterns']})
+
+@app.route('/api/condition-cohort')
+def api_condition_cohort():
+    """Patients with all of ?all=, any of ?any= (or conditions matching ?q=) and none of ?none= codes"""
+    condition_index.refresh_if_stale(patients_collection)
+    return jsonify(condition_cohort(
+        condition_index, code_list(request.args.get('all')), code_list(request.args.get('any')),
+        code_list(request.args.get('none')), request.args.get('q')
+    ))
 
 @app.route('/api/realtime-operations')
 def api_realtime_operations():
     """Real-time data from Redis"""
-    today_encounters = redis_client.get('dashboard:today_encounters') or 0
-    
-    # Simulate department activity
+    live = read_live_dashboard(redis_client, strings=('total_patients',), hashes=('departments',))
+    top_departments = sorted(live['departments'], key=lambda dept: int(live['departments'][dept]), reverse=True)[:5]
+    window_hours = request.args.get('window_hours', 1, type=int)
+    counters = read_live_counters(redis_client, top_departments, window_hours=window_hours)
+    # Until the Redis dashboard is populated the patient count comes from the KPIs rollup
+    active_patients = int(live['total_patients'] or get_rollup(mongo_db, KPIS_ROLLUP)['total_patients'])
+    
+    # Department activity from ingested encounter events
     department_activity = []
-    departments = redis_client.hgetall('dashboard:departments')
-    for dept, total_encounters in list(departments.items())[:5]:
-        today_count = int(total_encounters) // 100  # Simulate today's activity
-        status = "High" if today_count > 10 else "Normal" if today_count > 5 else "Low"
+    for dept in top_departments:
+        activity = counters['departments'][dept]
+        status = "High" if activity['per_hour'] > 10 else "Normal" if activity['per_hour'] > 5 else "Low"
         
         department_activity.append({
             'name': dept,
-            'today_encounters': today_count,
+            'today_encounters': activity['today_encounters'],
+            'window_encounters': activity['window_encounters'],
+            'per_hour': activity['per_hour'],
             'status': status
         })
     
     return jsonify({
-        'today_encounters': today_encounters,
-        'active_patients': redis_client.get('dashboard:total_patients') or 990,
+        'today_encounters': counters['today_encounters'],
+        'window_encounters': counters['window_encounters'],
+        'window_hours': counters['window_hours'],
+        'active_patients': active_patients,
         'department_activity': department_activity
     })
 
+@app.route('/api/encounter-events', methods=['POST'])
+def api_encounter_events():
+    """Ingest one encounter event or a list of them"""
+    try:
+        events = parse_event_payload(request.get_json(force=True))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'error': f'Invalid encounter event: {e}'}), 400
+    accepted = event_bus.publish(events)
+    return jsonify({'accepted': accepted}), 202
+
 if __name__ == '__main__':
     print("🚀 Starting Ultimate Hospital Dashboard...")
     print("📊 Open: http://localhost:5001")
@@ -0,0 +1,227 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.chronic_conditions import chronic_flags
+from common.condition_search import condition_tokens
+from row_mappers import (
+    PATIENT_COLUMNS, ENCOUNTER_COLUMNS, CONDITION_COLUMNS, PROCEDURE_COLUMNS, MEDICATION_COLUMNS,
+    build_patient_document
+)
+
+# Micro-benchmark: documents/second for the original dict-row document builder
+# versus the precompiled positional row_mappers. Uses synthetic rows shaped like
+# the migration queries, so no database is needed.
+
+def legacy_build_patient_document(patient, encounters, conditions, procedures, medications):
+    """Original dictionary=True document builder, kept as the benchmark baseline"""
+    # Calculate financial metrics
+    total_healthcare_cost = sum(
+        enc['total_claim_cost'] or 0 
+        for enc in encounters
+    )
+    encounter_count = len(encounters)
+    active_conditions = [
+        cond['description'] for cond in conditions 
+        if cond['stop'] is None
+    ]
+    chronic = chronic_flags(cond['code'] for cond in conditions)
+
+    # Build comprehensive MongoDB document
+    return {
+        "_id": patient['patient_source_id'],
+        "metadata": {
+            "mysql_patient_id": patient['patient_id'],
+            "migration_timestamp": datetime.now(),
+            "data_version": "1.0"
+        },
+        "demographics": {
+            "name": {
+                "first": patient['first'],
+                "last": patient['last'],
+                "prefix": patient['prefix'],
+                "suffix": patient['suffix']
+            },
+            "birthdate": patient['birthdate'].isoformat() if patient['birthdate'] else None,
+            "age": patient['age'],
+            "gender": patient['gender'],
+            "race": patient['race'],
+            "ethnicity": patient['ethnicity'],
+            "marital_status": patient['marital'],
+            "location": {
+                "address": patient['address'],
+                "city": patient['city'],
+                "state": patient['state'],
+                "zip": patient['zip'],
+                "coordinates": {
+                    "lat": float(patient['lat']) if patient['lat'] else None,
+                    "lon": float(patient['lon']) if patient['lon'] else None
+                }
+            }
+        },
+        "clinical_summary": {
+            "total_encounters": encounter_count,
+            "active_conditions": active_conditions,
+            "total_conditions": len(conditions),
+            "total_procedures": len(procedures),
+            "total_medications": len(medications),
+            "chronic_flags": chronic,
+            "chronic_count": len(chronic),
+            "healthcare_metrics": {
+                "total_expenses": float(patient['healthcare_expenses']) if patient['healthcare_expenses'] else 0,
+                "total_coverage": float(patient['healthcare_coverage']) if patient['healthcare_coverage'] else 0,
+                "calculated_costs": float(total_healthcare_cost)
+            }
+        },
+        "encounters": [
+            {
+                "encounter_id": enc['encounter_source_id'],
+                "date": {
+                    "start": enc['start'].isoformat() if enc['start'] else None,
+                    "end": enc['stop'].isoformat() if enc['stop'] else None
+                },
+                "type": enc['description'],
+                "class": enc['class'],
+                "clinical": {
+                    "reason_code": enc['reason_code'],
+                    "reason_description": enc['reason_description']
+                },
+                "providers": {
+                    "organization": enc['organization_name'],
+                    "provider": enc['provider_name'],
+                    "specialty": enc['provider_specialty']
+                },
+                "financial": {
+                    "base_cost": float(enc['base_encounter_cost']) if enc['base_encounter_cost'] else 0,
+                    "total_claim_cost": float(enc['total_claim_cost']) if enc['total_claim_cost'] else 0,
+                    "payer_coverage": float(enc['payer_coverage']) if enc['payer_coverage'] else 0,
+                    "payer": enc['payer_name']
+                }
+            } for enc in encounters
+        ],
+        "conditions": [
+            {
+                "description": cond['description'],
+                "code": cond['code'],
+                "timeline": {
+                    "start": cond['start'].isoformat() if cond['start'] else None,
+                    "end": cond['stop'].isoformat() if cond['stop'] else None,
+                    "is_active": cond['stop'] is None
+                },
+                "tokens": condition_tokens(cond['description'])
+            } for cond in conditions
+        ],
+        "procedures": [
+            {
+                "description": proc['description'],
+                "code": proc['code'],
+                "date": proc['procedure_date'].isoformat() if proc['procedure_date'] else None,
+                "cost": float(proc['base_cost']) if proc['base_cost'] else 0
+            } for proc in procedures
+        ],
+        "medications": [
+            {
+                "description": med['description'],
+                "timeline": {
+                    "start": med['start'].isoformat() if med['start'] else None,
+                    "end": med['stop'].isoformat() if med['stop'] else None
+                },
+                "cost": {
+                    "base": float(med['base_cost']) if med['base_cost'] else 0,
+                    "total": float(med['total_cost']) if med['total_cost'] else 0
+                }
+            } for med in medications
+        ]
+    }
+
+def money(rng):
+    return Decimal(f"{rng.uniform(0, 5000):.2f}") if rng.random() > 0.1 else None
+
+def when(rng):
+    return datetime(2017, 1, 1) + timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+
+def synthetic_patient(rng, patient_id, children_per_table):
+    """One patient's rows as tuples in the column order of row_mappers"""
+    patient = (
+        patient_id, f"patient-{patient_id}", "Jane", "Doe", "Mrs.", None,
+        date(1950, 1, 1) + timedelta(days=rng.randint(0, 20000)), rng.randint(1, 90),
+        rng.choice("MF"), "white", "nonhispanic", "M", "1 Main St", "Boston", "Massachusetts", "02110",
+        Decimal("42.360100"), Decimal("-71.058900"), money(rng), money(rng)
+    )
+    encounters = [
+        (patient_id, f"enc-{patient_id}-{i}", when(rng), when(rng), "General examination", "ambulatory",
+         None, None, "Mount Auburn Hospital", "Dr. Smith", "GENERAL PRACTICE",
+         money(rng), money(rng), money(rng), "Medicare")
+        for i in range(children_per_table)
+    ]
+    conditions = [
+        (patient_id, "Hypertension", "59621000", when(rng), when(rng) if rng.random() > 0.5 else None)
+        for _ in range(children_per_table)
+    ]
+    procedures = [
+        (patient_id, "Medication Reconciliation", "430193006", when(rng), money(rng))
+        for _ in range(children_per_table)
+    ]
+    medications = [
+        (patient_id, "Lisinopril 10 MG", when(rng), when(rng) if rng.random() > 0.5 else None,
+         money(rng), money(rng))
+        for _ in range(children_per_table)
+    ]
+    return patient, encounters, conditions, procedures, medications
+
+def as_dicts(rows, columns):
+    names = [name for name, _ in columns]
+    return [dict(zip(names, row)) for row in rows]
+
+def dict_cursor_rows(patient, encounters, conditions, procedures, medications):
+    return (
+        as_dicts([patient], PATIENT_COLUMNS)[0],
+        as_dicts(encounters, ENCOUNTER_COLUMNS),
+        as_dicts(conditions, CONDITION_COLUMNS),
+        as_dicts(procedures, PROCEDURE_COLUMNS),
+        as_dicts(medications, MEDICATION_COLUMNS)
+    )
+
+def run_benchmark(patients=2000, children_per_table=10, seed=7):
+    rng = random.Random(seed)
+    tuple_rows = [synthetic_patient(rng, i + 1, children_per_table) for i in range(patients)]
+
+    print("⏱️ ROW -> DOCUMENT CONVERSION BENCHMARK")
+    print("=" * 60)
+    print(f"   {patients} patients, {children_per_table} rows per child table")
+
+    # Both builders must produce identical documents
+    migrated_at = datetime.now()
+    for tuple_args in tuple_rows[:50]:
+        legacy_doc = legacy_build_patient_document(*dict_cursor_rows(*tuple_args))
+        legacy_doc['metadata']['migration_timestamp'] = migrated_at
+        assert legacy_doc == build_patient_document(*tuple_args, migrated_at), "documents differ"
+    print("✅ Outputs identical")
+
+    # The baseline pays for the per-row dicts a dictionary=True cursor builds
+    start_time = time.perf_counter()
+    for args in tuple_rows:
+        legacy_build_patient_document(*dict_cursor_rows(*args))
+    legacy_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for args in tuple_rows:
+        build_patient_document(*args, migrated_at)
+    mapper_time = time.perf_counter() - start_time
+
+    print(f"   Dict cursor rows + inline conversion: {patients / legacy_time:,.0f} docs/sec")
+    print(f"   Tuple cursor rows + compiled mappers: {patients / mapper_time:,.0f} docs/sec")
+    print(f"🚀 Speedup: {legacy_time / mapper_time:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark patient document construction")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--children", type=int, default=10, help="rows per child table per patient")
+    args = parser.parse_args()
+
+    run_benchmark(args.patients, args.children)
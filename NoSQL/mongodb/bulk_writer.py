@@ -0,0 +1,85 @@
+import bson
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_BYTES = 8 * 1024 * 1024  # stay well below MongoDB's 48MB message limit
+
+class BulkDocumentWriter:
+    """Buffer documents and flush them to MongoDB with unordered insert_many
+
+    With upsert=True each document replaces (or creates) the one with the same
+    _id through an unordered bulk_write instead. on_flush(written) is called
+    after every flush with the documents that were actually written, e.g. to
+    checkpoint progress. If the whole write fails (network error, server gone)
+    the exception is raised and on_flush is not called.
+    """
+
+    def __init__(self, collection, batch_size=DEFAULT_BATCH_SIZE, max_batch_bytes=DEFAULT_BATCH_BYTES,
+                 upsert=False, on_flush=None):
+        self.collection = collection
+        self.upsert = upsert
+        self.on_flush = on_flush
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.migrated_count = 0
+        self.error_count = 0
+        self.batches_flushed = 0
+
+    def add(self, doc):
+        doc_bytes = len(bson.encode(doc))
+        if self.buffer and self.buffer_bytes + doc_bytes > self.max_batch_bytes:
+            self.flush()
+        self.buffer.append(doc)
+        self.buffer_bytes += doc_bytes
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch = self.buffer
+        self.buffer = []
+        self.buffer_bytes = 0
+
+        written = batch
+        try:
+            if self.upsert:
+                result = self.collection.bulk_write(
+                    [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in batch],
+                    ordered=False
+                )
+                self.migrated_count += result.matched_count + result.upserted_count
+            else:
+                result = self.collection.insert_many(batch, ordered=False)
+                self.migrated_count += len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Unordered writes keep going past failures; count each failed document
+            details = e.details
+            self.migrated_count += details.get('nInserted', 0) + details.get('nMatched', 0) + details.get('nUpserted', 0)
+            failed = set()
+            for write_error in details.get('writeErrors', []):
+                failed.add(write_error['index'])
+                failed_id = batch[write_error['index']].get('_id')
+                print(f"❌ Error migrating patient {failed_id}: {write_error.get('errmsg')}")
+                self.error_count += 1
+            written = [doc for i, doc in enumerate(batch) if i not in failed]
+        except Exception as e:
+            print(f"❌ Error writing batch of {len(batch)} patients: {e}")
+            self.error_count += len(batch)
+            raise
+
+        self.batches_flushed += 1
+        if self.on_flush is not None and written:
+            self.on_flush(written)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
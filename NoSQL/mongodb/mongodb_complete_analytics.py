@@ -1,10 +1,18 @@
-import pymongo
 from datetime import datetime
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.chronic_conditions import chronic_label
+from common.condition_search import count_patients_with_condition
+from common.connections import get_mongo_db
+from common.cost_distribution import get_cost_distribution
+from common.patient_kpis import get_patient_kpis
+from common.rollups import department_pipeline
 
 def comprehensive_mongodb_analytics():
-    client = pymongo.MongoClient('mongodb://localhost:27017/')
-    db = client['hospital_platform']
+    db = get_mongo_db()
     patients = db['patient_summaries']
     
     print("🏥 COMPREHENSIVE MONGODB HOSPITAL ANALYTICS")
@@ -18,53 +26,32 @@ def comprehensive_mongodb_analytics():
     ]
     
     for condition in cardiovascular_conditions:
-        # Use regex for flexible matching
-        count = patients.count_documents({
-            "conditions.description": {"$regex": condition, "$options": "i"}
-        })
+        # Word match on the indexed condition tokens
+        count = count_patients_with_condition(patients, condition)
         print(f"   - {condition}: {count} patients ({count/990*100:.1f}%)")
     
     print()
     
     # 2. Cost analysis with detailed breakdown
     print("2. 💰 FINANCIAL ANALYSIS & COST DRIVERS")
-    cost_brackets = [
-        (0, 10000, "Low"),
-        (10000, 50000, "Medium"), 
-        (50000, 100000, "High"),
-        (100000, 1000000, "Very High"),
-        (1000000, 5000000, "Extreme")
-    ]
-    
-    for min_cost, max_cost, label in cost_brackets:
-        count = patients.count_documents({
-            "clinical_summary.healthcare_metrics.total_expenses": {
-                "$gte": min_cost, "$lt": max_cost
-            }
-        })
-        percentage = (count / 990) * 100
-        print(f"   - {label} Cost (${min_cost:,}-${max_cost:,}): {count} patients ({percentage:.1f}%)")
+    cost_distribution = get_cost_distribution(patients)
+    for bracket in cost_distribution['brackets']:
+        print(f"   - {bracket['name']} Cost (${bracket['min']:,}-${bracket['max']:,}): "
+              f"{bracket['count']} patients ({bracket['percentage']:.1f}%)")
     
     print()
     
     # 3. Department performance analysis
     print("3. 🏥 DEPARTMENT PERFORMANCE & EFFICIENCY")
-    dept_pipeline = [
-        {"$unwind": "$encounters"},
-        {"$group": {
-            "_id": "$encounters.providers.organization",
-            "total_encounters": {"$sum": 1},
-            "avg_claim_cost": {"$avg": "$encounters.financial.total_claim_cost"},
-            "total_revenue": {"$sum": "$encounters.financial.total_claim_cost"},
-            "unique_patients": {"$addToSet": "$_id"}
-        }},
+    # Unique patients come from a per-(department, patient) group, not $addToSet arrays
+    dept_pipeline = department_pipeline()[:-1] + [
         {"$project": {
             "department": "$_id",
-            "total_encounters": 1,
-            "avg_claim_cost": 1,
-            "total_revenue": 1,
-            "unique_patient_count": {"$size": "$unique_patients"},
-            "encounters_per_patient": {"$divide": ["$total_encounters", {"$size": "$unique_patients"}]}
+            "total_encounters": "$encounters",
+            "avg_claim_cost": {"$divide": ["$revenue", "$encounters"]},
+            "total_revenue": "$revenue",
+            "unique_patient_count": "$unique_patients",
+            "encounters_per_patient": {"$divide": ["$encounters", "$unique_patients"]}
         }},
         {"$sort": {"total_revenue": -1}},
         {"$limit": 10}
@@ -80,40 +67,27 @@ def comprehensive_mongodb_analytics():
     
     # 4. Chronic disease burden analysis
     print("4. 🩺 CHRONIC DISEASE BURDEN & COMORBIDITY ANALYSIS")
-    chronic_pipeline = [
-        {"$project": {
-            "name": {"$concat": ["$demographics.name.first", " ", "$demographics.name.last"]},
-            "chronic_conditions": {
-                "$size": {
-                    "$filter": {
-                        "input": "$conditions.description",
-                        "as": "condition",
-                        "cond": {
-                            "$or": [
-                                {"$regexMatch": {"input": "$$condition", "regex": "Hypertension", "options": "i"}},
-                                {"$regexMatch": {"input": "$$condition", "regex": "Diabetes", "options": "i"}},
-                                {"$regexMatch": {"input": "$$condition", "regex": "Heart Disease", "options": "i"}},
-                                {"$regexMatch": {"input": "$$condition", "regex": "COPD", "options": "i"}},
-                                {"$regexMatch": {"input": "$$condition", "regex": "Obesity", "options": "i"}}
-                            ]
-                        }
-                    }
-                }
-            },
-            "total_encounters": "$clinical_summary.total_encounters",
-            "total_costs": "$clinical_summary.healthcare_metrics.total_expenses"
-        }},
-        {"$match": {"chronic_conditions": {"$gte": 2}}},  # Patients with 2+ chronic conditions
-        {"$sort": {"chronic_conditions": -1, "total_costs": -1}},
-        {"$limit": 10}
-    ]
-    
-    chronic_patients = list(patients.aggregate(chronic_pipeline))
-    print(f"   Found {len(chronic_patients)} patients with multiple chronic conditions")
+    # Chronic categories are classified at migration; this is an indexed sort
+    multi_chronic = {"clinical_summary.chronic_count": {"$gte": 2}}  # Patients with 2+ chronic conditions
+    chronic_patients = list(patients.find(multi_chronic, {
+        "demographics.name": 1,
+        "clinical_summary.chronic_flags": 1,
+        "clinical_summary.chronic_count": 1,
+        "clinical_summary.total_encounters": 1,
+        "clinical_summary.healthcare_metrics.total_expenses": 1
+    }).sort([
+        ("clinical_summary.chronic_count", -1),
+        ("clinical_summary.healthcare_metrics.total_expenses", -1)
+    ]).limit(10))
+    
+    print(f"   Found {patients.count_documents(multi_chronic)} patients with multiple chronic conditions")
     print("   Top 10 patients with highest chronic disease burden:")
     for patient in chronic_patients[:5]:
-        print(f"   - {patient['name']}: {patient['chronic_conditions']} chronic conditions")
-        print(f"     Encounters: {patient['total_encounters']}, Costs: ${patient['total_costs']:,.2f}")
+        name = f"{patient['demographics']['name']['first']} {patient['demographics']['name']['last']}"
+        summary = patient['clinical_summary']
+        conditions = ', '.join(chronic_label(flag) for flag in summary['chronic_flags'])
+        print(f"   - {name}: {summary['chronic_count']} chronic conditions ({conditions})")
+        print(f"     Encounters: {summary['total_encounters']}, Costs: ${summary['healthcare_metrics']['total_expenses']:,.2f}")
     
     print()
     
@@ -145,16 +119,15 @@ def comprehensive_mongodb_analytics():
               f"${month_data['total_cost']:,.2f} total")
     
     # 6. Create summary document for dashboards
+    kpis = get_patient_kpis(patients)
     summary_doc = {
         "_id": "analytics_summary",
         "timestamp": datetime.now(),
         "key_metrics": {
-            "total_patients": 990,
-            "avg_encounters_per_patient": sum(p['clinical_summary']['total_encounters'] for p in patients.find()) / 990,
-            "total_healthcare_costs": sum(p['clinical_summary']['healthcare_metrics']['total_expenses'] for p in patients.find()),
-            "high_cost_patients_count": patients.count_documents({
-                "clinical_summary.healthcare_metrics.total_expenses": {"$gt": 50000}
-            })
+            "total_patients": kpis['total_patients'],
+            "avg_encounters_per_patient": kpis['avg_encounters_per_patient'],
+            "total_healthcare_costs": kpis['total_healthcare_costs'],
+            "high_cost_patients_count": kpis['high_cost_patients']
         },
         "top_conditions": cardiovascular_conditions,
         "generated_by": "comprehensive_analytics_script"
@@ -0,0 +1,140 @@
+import os
+import sys
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Indexes for patient_summaries, one per query shape the dashboards and
+# analytics scripts actually run. The migrator builds them on its staging
+# collection before the swap, so the live collection is always indexed.
+PATIENT_SUMMARY_INDEXES = [
+    # Keyset lookups and incremental upserts by MySQL id
+    IndexModel([("metadata.mysql_patient_id", ASCENDING)], name="mysql_patient_id", unique=True),
+    # High-cost counts, cost brackets and "top N by expenses"
+    IndexModel([("clinical_summary.healthcare_metrics.total_expenses", DESCENDING)], name="total_expenses"),
+    # Equality match on active conditions (mongodb_queries)
+    IndexModel([("clinical_summary.active_conditions", ASCENDING)], name="active_conditions"),
+    # Condition lookups on the embedded conditions array
+    IndexModel([("conditions.description", ASCENDING)], name="condition_description"),
+    # Word and prefix condition search (common/condition_search)
+    IndexModel([("conditions.tokens", ASCENDING)], name="condition_tokens"),
+    # Chronic burden ranking: most chronic categories first, then highest cost
+    IndexModel([
+        ("clinical_summary.chronic_count", DESCENDING),
+        ("clinical_summary.healthcare_metrics.total_expenses", DESCENDING)
+    ], name="chronic_burden"),
+    # Cohorts by chronic category
+    IndexModel([("clinical_summary.chronic_flags", ASCENDING)], name="chronic_flags"),
+    # Encounter-count filters and sorts (risk profiling)
+    IndexModel([("clinical_summary.total_encounters", DESCENDING)], name="total_encounters"),
+    # Top-N by stored risk score (common/risk_scoring)
+    IndexModel([("clinical_summary.risk_score", DESCENDING)], name="risk_score"),
+]
+
+# Hot query shapes as (label, filter, sort); verify_indexes() explains each one
+HOT_QUERIES = [
+    (
+        "high-cost patient count",
+        {"clinical_summary.healthcare_metrics.total_expenses": {"$gt": 50000}},
+        None
+    ),
+    (
+        "cost bracket count",
+        {"clinical_summary.healthcare_metrics.total_expenses": {"$gte": 10000, "$lt": 50000}},
+        None
+    ),
+    (
+        "top high-cost patients",
+        {"clinical_summary.healthcare_metrics.total_expenses": {"$gt": 1000000}},
+        [("clinical_summary.healthcare_metrics.total_expenses", DESCENDING)]
+    ),
+    (
+        "active condition match",
+        {"clinical_summary.active_conditions": "Hypertensive disorder"},
+        None
+    ),
+    (
+        "condition description match",
+        {"conditions.description": "Hypertension"},
+        None
+    ),
+    (
+        "condition word search",
+        {"conditions": {"$elemMatch": {"$and": [
+            {"tokens": {"$all": ["congestive", "heart"]}},
+            {"tokens": {"$regex": "^fail"}}
+        ]}}},
+        None
+    ),
+    (
+        "chronic burden ranking",
+        {"clinical_summary.chronic_count": {"$gte": 2}},
+        [("clinical_summary.chronic_count", DESCENDING),
+         ("clinical_summary.healthcare_metrics.total_expenses", DESCENDING)]
+    ),
+    (
+        "chronic category match",
+        {"clinical_summary.chronic_flags": "diabetes"},
+        None
+    ),
+    (
+        "frequent visitors",
+        {"clinical_summary.total_encounters": {"$gt": 5}},
+        [("clinical_summary.total_encounters", DESCENDING)]
+    ),
+    (
+        "highest risk patients",
+        {"clinical_summary.total_encounters": {"$gt": 5}},
+        [("clinical_summary.risk_score", DESCENDING)]
+    ),
+]
+
+def ensure_indexes(collection, indexes=None):
+    """Create the declared indexes (no-op for ones that already exist)"""
+    indexes = indexes or PATIENT_SUMMARY_INDEXES
+    for index in indexes:
+        # background is ignored by MongoDB 4.2+, which always builds without a collection lock
+        index.document.setdefault("background", True)
+    return collection.create_indexes(indexes)
+
+def plan_stages(plan):
+    """All stage names in an explain() plan tree"""
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages.extend(plan_stages(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+def verify_indexes(collection, queries=None):
+    """Explain every hot query and report whether its winning plan uses an index"""
+    results = []
+    for label, query_filter, sort in queries or HOT_QUERIES:
+        cursor = collection.find(query_filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.explain()
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        results.append({
+            "query": label,
+            "stages": stages,
+            "uses_index": "COLLSCAN" not in stages
+        })
+    return results
+
+def print_index_report(results):
+    for result in results:
+        icon = "✅" if result['uses_index'] else "❌"
+        print(f"   {icon} {result['query']}: {' <- '.join(s for s in result['stages'] if s)}")
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from common.connections import get_mongo_db
+
+    patients = get_mongo_db()['patient_summaries']
+
+    print("🗂️ PATIENT_SUMMARIES INDEXES")
+    print("=" * 60)
+    created = ensure_indexes(patients)
+    print(f"✅ Indexes in place: {', '.join(created)}")
+    print("\n🔍 Hot query plans:")
+    print_index_report(verify_indexes(patients))
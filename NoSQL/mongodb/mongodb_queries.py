@@ -1,9 +1,13 @@
-import pymongo
 from pprint import pprint
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.connections import get_mongo_db
+from common.risk_scoring import RISK_FIELD, score_population
 
 def run_mongodb_queries():
-    client = pymongo.MongoClient('mongodb://localhost:27017/')
-    db = client['hospital_platform']
+    db = get_mongo_db()
     patients = db['patient_summaries']
     
     print("🏥 MONGODB ANALYTICAL QUERIES")
@@ -84,31 +88,26 @@ def run_mongodb_queries():
     
     # 5. COMPLEX AGGREGATION: Patient risk profiling
     print("5. 📈 PATIENT RISK PROFILING")
-    risk_pipeline = [
-        {"$match": {"clinical_summary.total_encounters": {"$gt": 5}}},
-        {"$project": {
-            "name": {"$concat": ["$demographics.name.first", " ", "$demographics.name.last"]},
-            "encounter_count": "$clinical_summary.total_encounters",
-            "condition_count": "$clinical_summary.total_conditions",
-            "total_costs": "$clinical_summary.healthcare_metrics.total_expenses",
-            "risk_score": {
-                "$add": [
-                    {"$multiply": ["$clinical_summary.total_encounters", 2]},
-                    {"$multiply": ["$clinical_summary.total_conditions", 5]},
-                    {"$divide": ["$clinical_summary.healthcare_metrics.total_expenses", 1000]}
-                ]
-            }
-        }},
-        {"$sort": {"risk_score": -1}},
-        {"$limit": 5}
-    ]
-    risk_patients = list(patients.aggregate(risk_pipeline))
+    # Scores are stored by common.risk_scoring; score once if this data predates it
+    if patients.find_one({RISK_FIELD: {"$exists": True}}, {"_id": 1}) is None:
+        score_population(patients)
+    risk_patients = patients.find(
+        {"clinical_summary.total_encounters": {"$gt": 5}},
+        {
+            "demographics.name": 1,
+            "clinical_summary.total_encounters": 1,
+            "clinical_summary.total_conditions": 1,
+            "clinical_summary.healthcare_metrics.total_expenses": 1,
+            RISK_FIELD: 1
+        }
+    ).sort(RISK_FIELD, -1).limit(5)
     print("   Highest Risk Patients (based on encounters + conditions + costs):")
     for patient in risk_patients:
-        print(f"   - {patient['name']}:")
-        print(f"     Risk Score: {patient['risk_score']:.1f}")
-        print(f"     Encounters: {patient['encounter_count']}, Conditions: {patient['condition_count']}")
-        print(f"     Total Costs: ${patient['total_costs']:,.2f}")
+        summary = patient['clinical_summary']
+        print(f"   - {patient['demographics']['name']['first']} {patient['demographics']['name']['last']}:")
+        print(f"     Risk Score: {summary['risk_score']:.1f}")
+        print(f"     Encounters: {summary['total_encounters']}, Conditions: {summary['total_conditions']}")
+        print(f"     Total Costs: ${summary['healthcare_metrics']['total_expenses']:,.2f}")
         print()
 
 if __name__ == "__main__":
@@ -1,306 +1,679 @@
-import mysql.connector
-import pymongo
+import argparse
+import multiprocessing
+import os
+import sys
+from collections import defaultdict
 from datetime import datetime
-from decimal import Decimal
 
-def create_mongodb_documents():
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from bulk_writer import BulkDocumentWriter, DEFAULT_BATCH_SIZE, DEFAULT_BATCH_BYTES
+from mongodb_indexes import ensure_indexes, verify_indexes, print_index_report
+from row_mappers import (
+    PATIENT_COLUMNS, ENCOUNTER_COLUMNS, CONDITION_COLUMNS, PROCEDURE_COLUMNS, MEDICATION_COLUMNS,
+    select_list, build_patient_document
+)
+from common.connections import get_mongo_client, get_mongo_db, get_redis, mysql_connect, close_clients, MYSQL_CONFIG
+from common.rollups import refresh_rollups, ROLLUP_COLLECTION
+from common.response_cache import invalidate_dashboard_cache
+from common.live_aggregates import rebuild_live_aggregates
+from common.risk_scoring import score_population
+
+# All row queries select the explicit column lists declared in row_mappers and
+# are read through a tuple cursor, so patient_id is always row[0].
+
+# Patients are read in keyset pages on patient_id so only one page is ever
+# held in memory, whatever the size of the extract.
+PATIENTS_PAGE_QUERY = """
+    SELECT """ + select_list(PATIENT_COLUMNS) + """
+    FROM patients p
+    WHERE p.patient_id > %s AND p.patient_id <= %s
+    ORDER BY p.patient_id
+    LIMIT %s
+"""
+
+PATIENTS_BY_ID_QUERY = """
+    SELECT """ + select_list(PATIENT_COLUMNS) + """
+    FROM patients p
+    WHERE p.patient_id IN ({placeholders})
+    ORDER BY p.patient_id
+"""
+
+# Child table queries. {where} / {order} are filled in per migration mode:
+# per-patient mode filters on one patient_id, bulk mode scans the patient_id
+# range of one page ordered by patient_id so rows can be grouped in a single pass.
+ENCOUNTERS_QUERY = """
+    SELECT """ + select_list(ENCOUNTER_COLUMNS) + """
+    FROM encounters e
+    LEFT JOIN organizations o ON e.organization_id = o.org_id
+    LEFT JOIN providers pr ON e.provider_id = pr.provider_id
+    LEFT JOIN payers pay ON e.payer_id = pay.payer_id
+    {where}
+    ORDER BY {order}e.start DESC
+"""
+
+CONDITIONS_QUERY = """
+    SELECT """ + select_list(CONDITION_COLUMNS) + """
+    FROM conditions 
+    {where}
+    ORDER BY {order}start DESC
+"""
+
+PROCEDURES_QUERY = """
+    SELECT """ + select_list(PROCEDURE_COLUMNS) + """
+    FROM procedures 
+    {where}
+    ORDER BY {order}procedure_date DESC
+"""
+
+MEDICATIONS_QUERY = """
+    SELECT """ + select_list(MEDICATION_COLUMNS) + """
+    FROM medications 
+    {where}
+    ORDER BY {order}start DESC
+"""
+
+CHILD_QUERIES = {
+    "encounters": (ENCOUNTERS_QUERY, "e.patient_id"),
+    "conditions": (CONDITIONS_QUERY, "patient_id"),
+    "procedures": (PROCEDURES_QUERY, "patient_id"),
+    "medications": (MEDICATIONS_QUERY, "patient_id"),
+}
+
+MIGRATION_MODES = ("bulk", "per-patient")
+DEFAULT_PAGE_SIZE = 1000
+SCAN_FETCH_SIZE = 5000
+
+# High-water marks for --incremental: the largest id of each table already migrated.
+# Rows above a mark are new since the last run and identify the patients to rebuild.
+WATERMARK_TABLES = {
+    "patient_id": "patients",
+    "encounter_id": "encounters",
+    "condition_id": "conditions",
+    "procedure_id": "procedures",
+    "medication_id": "medications",
+}
+WATERMARKS_ID = "watermarks"
+
+# Full runs record their shard plan in a run document and a checkpoint per shard
+# (last flushed patient_id + batch id) so --resume can pick up where they died.
+RUN_STATE_ID = "run"
+CHECKPOINT_PREFIX = "checkpoint:"
+
+# Full runs build into a staging collection and rename it over the live one when
+# complete, so readers never see an empty or half-built patient_summaries.
+LIVE_COLLECTION = "patient_summaries"
+BUILD_COLLECTION_PREFIX = "patient_summaries__build_"
+
+CHANGED_PATIENTS_QUERY = " UNION ".join(
+    f"SELECT patient_id FROM {table} WHERE {column} > %s AND {column} <= %s"
+    for column, table in WATERMARK_TABLES.items()
+)
+
+# Balanced patient_id ranges for --workers; NTILE keeps shards even despite id gaps
+SHARD_RANGES_QUERY = """
+    SELECT shard, MIN(patient_id) as first_patient_id, MAX(patient_id) as last_patient_id
+    FROM (
+        SELECT patient_id, NTILE(%s) OVER (ORDER BY patient_id) as shard
+        FROM patients
+    ) t
+    GROUP BY shard
+    ORDER BY shard
+"""
+
+def iter_patient_pages(mysql_cursor, page_size=DEFAULT_PAGE_SIZE, after_patient_id=0, last_patient_id=None):
+    """Yield pages of patient rows using keyset pagination on patient_id"""
+    if last_patient_id is None:
+        mysql_cursor.execute("SELECT COALESCE(MAX(patient_id), 0) FROM patients")
+        last_patient_id = mysql_cursor.fetchone()[0]
+
+    while True:
+        mysql_cursor.execute(PATIENTS_PAGE_QUERY, (after_patient_id, last_patient_id, page_size))
+        page = mysql_cursor.fetchall()
+        if not page:
+            return
+        yield page
+        after_patient_id = page[-1][0]
+
+def iter_patient_pages_for_ids(mysql_cursor, patient_ids, page_size=DEFAULT_PAGE_SIZE):
+    """Yield pages of patient rows for an explicit list of patient_ids"""
+    patient_ids = sorted(patient_ids)
+    for offset in range(0, len(patient_ids), page_size):
+        chunk = patient_ids[offset:offset + page_size]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        mysql_cursor.execute(PATIENTS_BY_ID_QUERY.format(placeholders=placeholders), chunk)
+        page = mysql_cursor.fetchall()
+        if page:
+            yield page
+
+def fetch_patient_children(mysql_cursor, patient_id):
+    """Per-patient mode: one round trip per child table for a single patient"""
+    children = {}
+    for table, (query, patient_column) in CHILD_QUERIES.items():
+        mysql_cursor.execute(
+            query.format(where=f"WHERE {patient_column} = %s", order=""),
+            (patient_id,)
+        )
+        children[table] = mysql_cursor.fetchall()
+    return children
+
+def group_rows_by_patient(mysql_cursor):
+    rows_by_patient = defaultdict(list)
+    while True:
+        rows = mysql_cursor.fetchmany(SCAN_FETCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            rows_by_patient[row[0]].append(row)
+    return rows_by_patient
+
+def fetch_children_for_range(mysql_cursor, first_patient_id, last_patient_id):
+    """Bulk mode: one ordered range scan per child table, grouped by patient_id"""
+    grouped = {}
+    for table, (query, patient_column) in CHILD_QUERIES.items():
+        mysql_cursor.execute(
+            query.format(where=f"WHERE {patient_column} BETWEEN %s AND %s", order=f"{patient_column}, "),
+            (first_patient_id, last_patient_id)
+        )
+        grouped[table] = group_rows_by_patient(mysql_cursor)
+    return grouped
+
+def fetch_children_for_ids(mysql_cursor, patient_ids):
+    """Bulk mode for sparse patient sets: one IN-list scan per child table"""
+    placeholders = ", ".join(["%s"] * len(patient_ids))
+    grouped = {}
+    for table, (query, patient_column) in CHILD_QUERIES.items():
+        mysql_cursor.execute(
+            query.format(where=f"WHERE {patient_column} IN ({placeholders})", order=f"{patient_column}, "),
+            list(patient_ids)
+        )
+        grouped[table] = group_rows_by_patient(mysql_cursor)
+    return grouped
+
+def iter_patient_documents(mysql_cursor, mode="bulk", page_size=DEFAULT_PAGE_SIZE, stats=None,
+                           after_patient_id=0, last_patient_id=None, patient_ids=None):
+    """Stream patient_summaries documents page by page; build failures are counted in stats
+
+    mysql_cursor must be a plain (tuple) cursor - rows go straight to the row_mappers.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('build_errors', 0)
+
+    if patient_ids is not None:
+        pages = iter_patient_pages_for_ids(mysql_cursor, patient_ids, page_size)
+    else:
+        pages = iter_patient_pages(mysql_cursor, page_size, after_patient_id, last_patient_id)
+
+    for page in pages:
+        # In bulk mode each child table is read once per page instead of 4 queries per patient
+        if mode == "bulk" and patient_ids is not None:
+            grouped_children = fetch_children_for_ids(mysql_cursor, [patient[0] for patient in page])
+        elif mode == "bulk":
+            grouped_children = fetch_children_for_range(mysql_cursor, page[0][0], page[-1][0])
+
+        migrated_at = datetime.now()
+        for patient in page:
+            patient_id = patient[0]
+            try:
+                if mode == "bulk":
+                    children = {
+                        table: rows_by_patient.get(patient_id, [])
+                        for table, rows_by_patient in grouped_children.items()
+                    }
+                else:
+                    children = fetch_patient_children(mysql_cursor, patient_id)
+
+                yield build_patient_document(
+                    patient,
+                    children['encounters'],
+                    children['conditions'],
+                    children['procedures'],
+                    children['medications'],
+                    migrated_at
+                )
+            except Exception as e:
+                print(f"❌ Error migrating patient {patient_id}: {e}")
+                stats['build_errors'] += 1
+
+def connect_mysql():
+    mysql_conn = mysql_connect()
+    return mysql_conn, mysql_conn.cursor(dictionary=True)
+
+def connect_mongo():
+    # Shared per process, so a pool worker reuses it for every shard it runs
+    mongo_client = get_mongo_client()
+    # Test connection
+    mongo_client.admin.command('ismaster')
+    return mongo_client, get_mongo_db()
+
+def plan_shards(mysql_cursor, workers):
+    """Split the patient_id range into at most `workers` contiguous, evenly sized shards"""
+    mysql_cursor.execute(SHARD_RANGES_QUERY, (workers,))
+    return [
+        {
+            "index": row['shard'],
+            "first_patient_id": row['first_patient_id'],
+            "last_patient_id": row['last_patient_id']
+        } for row in mysql_cursor.fetchall()
+    ]
+
+def read_table_maxima(mysql_cursor):
+    """Current max id of every watermarked table"""
+    maxima = {}
+    for column, table in WATERMARK_TABLES.items():
+        mysql_cursor.execute(f"SELECT COALESCE(MAX({column}), 0) as max_id FROM {table}")
+        maxima[column] = mysql_cursor.fetchone()['max_id']
+    return maxima
+
+def find_changed_patient_ids(mysql_cursor, watermarks, maxima):
+    """Patients with rows added to any watermarked table since the last run"""
+    params = []
+    for column in WATERMARK_TABLES:
+        params.extend([watermarks.get(column, 0), maxima[column]])
+    mysql_cursor.execute(CHANGED_PATIENTS_QUERY, params)
+    return [row['patient_id'] for row in mysql_cursor.fetchall()]
+
+def checkpoint_id(shard_index):
+    return f"{CHECKPOINT_PREFIX}{shard_index}"
+
+def migrate_shard(shard):
+    """Migrate one patient_id range (or explicit patient_id list) with its own MySQL and MongoDB connections"""
+    label = f"[shard {shard['index']}]"
+    result = {
+        "shard": shard['index'],
+        "first_patient_id": shard['first_patient_id'],
+        "last_patient_id": shard['last_patient_id'],
+        "migrated": 0,
+        "errors": 0
+    }
+    try:
+        mysql_conn, mysql_cursor = connect_mysql()
+        mongo_client, mongo_db = connect_mongo()
+    except Exception as e:
+        print(f"❌ {label} Database connection failed: {e}")
+        result["errors"] = None
+        return result
+
+    # Resume from the shard's checkpoint if there is one
+    checkpoint = shard.get('checkpoint')
+    after_patient_id = shard['first_patient_id'] - 1
+    base_migrated = base_errors = batch_id = 0
+    if checkpoint:
+        after_patient_id = checkpoint['last_patient_id']
+        base_migrated = checkpoint['migrated']
+        base_errors = checkpoint['errors']
+        batch_id = checkpoint['batch_id']
+        print(f"↩️ {label} Resuming after patient_id {after_patient_id} (batch {batch_id})")
+
+    state_collection = mongo_db['migration_state']
+    stats = {'build_errors': 0}
+
+    def save_checkpoint(batch, done=False):
+        nonlocal batch_id
+        if not done:
+            batch_id += 1
+        state_collection.replace_one({"_id": checkpoint_id(shard['index'])}, {
+            "_id": checkpoint_id(shard['index']),
+            "last_patient_id": shard['last_patient_id'] if done else batch[-1]['metadata']['mysql_patient_id'],
+            "batch_id": batch_id,
+            "migrated": base_migrated + writer.migrated_count,
+            "errors": base_errors + stats['build_errors'] + writer.error_count,
+            "done": done,
+            "updated_at": datetime.now()
+        }, upsert=True)
+
+    checkpointing = shard.get('checkpointing', True)
+    writer = BulkDocumentWriter(
+        mongo_db[shard.get('collection', LIVE_COLLECTION)],
+        batch_size=shard['batch_size'],
+        max_batch_bytes=shard['batch_bytes'],
+        # A resumed shard may find patients past its checkpoint already written
+        upsert=shard.get('upsert', False) or shard.get('resumed', False),
+        on_flush=save_checkpoint if checkpointing else None
+    )
+    row_cursor = mysql_conn.cursor()
+    documents = iter_patient_documents(
+        row_cursor, shard['mode'], shard['page_size'], stats,
+        after_patient_id=after_patient_id,
+        last_patient_id=shard['last_patient_id'],
+        patient_ids=shard.get('patient_ids')
+    )
+    try:
+        for patient_doc in documents:
+            # Buffer for batched insert into MongoDB
+            batches_before = writer.batches_flushed
+            writer.add(patient_doc)
+            if writer.batches_flushed != batches_before:
+                print(f"✅ {label} Migrated {writer.migrated_count} patients...")
+
+        writer.close()
+    except Exception as e:
+        # The checkpoint still names the last committed patient; --resume continues from it
+        print(f"❌ {label} Stopped after {writer.migrated_count} patients: {e}")
+        result["migrated"] = base_migrated + writer.migrated_count
+        result["errors"] = None
+        row_cursor.close()
+        mysql_cursor.close()
+        mysql_conn.close()
+        return result
+    result["migrated"] = base_migrated + writer.migrated_count
+    result["errors"] = base_errors + stats['build_errors'] + writer.error_count
+    if checkpointing:
+        save_checkpoint(None, done=True)
+
+    row_cursor.close()
+    mysql_cursor.close()
+    mysql_conn.close()
+    return result
+
+def publish_build_collection(mongo_db, build_collection):
+    """Index the staging collection, then atomically rename it over the live one"""
+    staging = mongo_db[build_collection]
+    ensure_indexes(staging)
+    print(f"🗂️ Indexes built on {build_collection}, checking hot query plans:")
+    print_index_report(verify_indexes(staging))
+    # renameCollection with dropTarget replaces the live collection in one step
+    mongo_db[build_collection].rename(LIVE_COLLECTION, dropTarget=True)
+
+def write_operational_metrics(mysql_cursor, metrics_collection, migration_summary):
+    # Get department utilization
+    mysql_cursor.execute("""
+        SELECT o.name as department, 
+               COUNT(*) as encounter_count,
+               AVG(TIMESTAMPDIFF(HOUR, e.start, e.stop)) as avg_stay_hours
+        FROM encounters e
+        JOIN organizations o ON e.organization_id = o.org_id
+        WHERE e.stop IS NOT NULL
+        GROUP BY o.name
+        ORDER BY encounter_count DESC
+    """)
+    department_metrics = mysql_cursor.fetchall()
+
+    # Get top conditions
+    mysql_cursor.execute("""
+        SELECT description, COUNT(*) as patient_count
+        FROM conditions
+        GROUP BY description
+        ORDER BY patient_count DESC
+        LIMIT 10
+    """)
+    top_conditions = mysql_cursor.fetchall()
+
+    metrics_doc = {
+        "_id": "operational_dashboard",
+        "migration_summary": migration_summary,
+        "department_utilization": [
+            {
+                "department": dept['department'],
+                "encounter_count": dept['encounter_count'],
+                "average_stay_hours": float(dept['avg_stay_hours']) if dept['avg_stay_hours'] else 0
+            } for dept in department_metrics
+        ],
+        "clinical_insights": {
+            "top_conditions": [
+                {
+                    "condition": cond['description'],
+                    "patient_count": cond['patient_count']
+                } for cond in top_conditions
+            ]
+        }
+    }
+
+    metrics_collection.replace_one({"_id": "operational_dashboard"}, metrics_doc, upsert=True)
+
+def create_mongodb_documents(mode="bulk", batch_size=DEFAULT_BATCH_SIZE, batch_bytes=DEFAULT_BATCH_BYTES,
+                             page_size=DEFAULT_PAGE_SIZE, workers=1, incremental=False, resume=False):
     print("🏥 Starting Professional MySQL to MongoDB Migration")
     print("=" * 60)
     
     # 1. Database Connections
     try:
         # Connect to MySQL (your teammate's cleaned database)
-        mysql_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',           # Your MySQL username
-            password='',   # Your MySQL password
-            database='hospital_operations',
-            charset='utf8mb4'
-        )
-        mysql_cursor = mysql_conn.cursor(dictionary=True)
-        print("✅ Connected to MySQL: hospital_operations")
+        mysql_conn, mysql_cursor = connect_mysql()
+        print("✅ Connected to MySQL: " + MYSQL_CONFIG['database'])
         
         # Connect to MongoDB
-        mongo_client = pymongo.MongoClient(
-            'mongodb://localhost:27017/',
-            serverSelectionTimeoutMS=5000
-        )
-        # Test connection
-        mongo_client.admin.command('ismaster')
-        mongo_db = mongo_client['hospital_platform']
-        
-        # Drop existing collections for clean migration
-        mongo_db.drop_collection('patient_summaries')
-        mongo_db.drop_collection('operational_metrics')
-        
-        patients_collection = mongo_db['patient_summaries']
+        mongo_client, mongo_db = connect_mongo()
         metrics_collection = mongo_db['operational_metrics']
-        print("✅ Connected to MongoDB: hospital_platform")
+        state_collection = mongo_db['migration_state']
+
+        watermarks = None
+        if incremental:
+            watermarks = state_collection.find_one({"_id": WATERMARKS_ID})
+            if watermarks is None:
+                print("⚠️ No watermarks found - running a full migration instead")
+                incremental = False
+
+        run_state = None
+        if resume:
+            run_state = state_collection.find_one({"_id": RUN_STATE_ID})
+            if run_state is None or run_state['status'] == "completed":
+                print("✅ No interrupted migration to resume")
+                return
+
+        if not incremental and not resume:
+            # Start clean: discard staging collections and checkpoints of abandoned runs.
+            # The live collection is left alone until the new build replaces it.
+            for name in mongo_db.list_collection_names():
+                if name.startswith(BUILD_COLLECTION_PREFIX):
+                    mongo_db.drop_collection(name)
+            state_collection.delete_many({"_id": {"$regex": f"^{CHECKPOINT_PREFIX}"}})
+        
+        print(f"✅ Connected to MongoDB: {mongo_db.name}")
         
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
         return
 
     # 2. Get total counts for progress tracking
+    # Maxima are captured before reading so rows added mid-run are picked up next time
+    maxima = run_state['maxima'] if resume else read_table_maxima(mysql_cursor)
     mysql_cursor.execute("SELECT COUNT(*) as total FROM patients")
     total_patients = mysql_cursor.fetchone()['total']
-    print(f"📊 Migrating {total_patients} patients...")
 
-    # 3. Get all patients with their data
-    mysql_cursor.execute("""
-        SELECT p.*, 
-               TIMESTAMPDIFF(YEAR, p.birthdate, CURDATE()) as age
-        FROM patients p
-    """)
-    patients = mysql_cursor.fetchall()
+    options = dict(mode=mode, batch_size=batch_size, batch_bytes=batch_bytes, page_size=page_size)
+    finished_results = []
+    build_collection = None
+    if incremental:
+        changed_ids = find_changed_patient_ids(mysql_cursor, watermarks, maxima)
+        print(f"📊 Incremental run: {len(changed_ids)} of {total_patients} patients changed since "
+              f"{watermarks['updated_at']}...")
+        shards = []
+        if changed_ids:
+            # Changed patients are upserted in place; everyone else is left untouched
+            shards = [dict(
+                options, index=1, first_patient_id=min(changed_ids), last_patient_id=max(changed_ids),
+                patient_ids=changed_ids, upsert=True, checkpointing=False
+            )]
+    elif resume:
+        print(f"↩️ Resuming migration started {run_state['started_at']}...")
+        build_collection = run_state['build_collection']
+        shards = []
+        for shard in run_state['shards']:
+            checkpoint = state_collection.find_one({"_id": checkpoint_id(shard['index'])})
+            if checkpoint and checkpoint['done']:
+                finished_results.append({
+                    "shard": shard['index'],
+                    "first_patient_id": shard['first_patient_id'],
+                    "last_patient_id": shard['last_patient_id'],
+                    "migrated": checkpoint['migrated'],
+                    "errors": checkpoint['errors']
+                })
+            else:
+                shards.append(dict(shard, checkpoint=checkpoint, resumed=True, collection=build_collection, **options))
+    else:
+        print(f"📊 Migrating {total_patients} patients...")
+        shards = plan_shards(mysql_cursor, max(workers, 1))
+        build_collection = f"{BUILD_COLLECTION_PREFIX}{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        state_collection.replace_one({"_id": RUN_STATE_ID}, {
+            "_id": RUN_STATE_ID,
+            "status": "running",
+            "started_at": datetime.now(),
+            "maxima": maxima,
+            "build_collection": build_collection,
+            "shards": shards
+        }, upsert=True)
+        for shard in shards:
+            shard.update(options, collection=build_collection)
 
-    migrated_count = 0
-    error_count = 0
+    # 3. Stream each patient_id shard into rich MongoDB documents
+    if workers > 1 and len(shards) > 1:
+        print(f"⚙️ Running {len(shards)} shards across {workers} worker processes...")
+        # spawn gives every worker a clean interpreter with no inherited sockets
+        with multiprocessing.get_context("spawn").Pool(min(workers, len(shards))) as pool:
+            shard_results = pool.map(migrate_shard, shards)
+    else:
+        shard_results = [migrate_shard(shard) for shard in shards]
+    shard_results = sorted(finished_results + shard_results, key=lambda r: r['shard'])
 
-    # 4. Process each patient into rich MongoDB documents
-    for patient in patients:
-        try:
-            patient_id = patient['patient_id']
-            
-            # Get patient's encounters with organization and provider info
-            mysql_cursor.execute("""
-                SELECT e.*, 
-                       o.name as organization_name,
-                       pr.name as provider_name,
-                       pr.specialty as provider_specialty,
-                       pay.name as payer_name
-                FROM encounters e
-                LEFT JOIN organizations o ON e.organization_id = o.org_id
-                LEFT JOIN providers pr ON e.provider_id = pr.provider_id
-                LEFT JOIN payers pay ON e.payer_id = pay.payer_id
-                WHERE e.patient_id = %s
-                ORDER BY e.start DESC
-            """, (patient_id,))
-            encounters = mysql_cursor.fetchall()
-
-            # Get patient's conditions
-            mysql_cursor.execute("""
-                SELECT description, start, stop, code
-                FROM conditions 
-                WHERE patient_id = %s
-                ORDER BY start DESC
-            """, (patient_id,))
-            conditions = mysql_cursor.fetchall()
-
-            # Get patient's procedures
-            mysql_cursor.execute("""
-                SELECT description, procedure_date, base_cost, code
-                FROM procedures 
-                WHERE patient_id = %s
-                ORDER BY procedure_date DESC
-            """, (patient_id,))
-            procedures = mysql_cursor.fetchall()
-
-            # Get patient's medications
-            mysql_cursor.execute("""
-                SELECT description, start, stop, base_cost, total_cost
-                FROM medications 
-                WHERE patient_id = %s
-                ORDER BY start DESC
-            """, (patient_id,))
-            medications = mysql_cursor.fetchall()
-
-            # Calculate financial metrics
-            total_healthcare_cost = sum(
-                enc['total_claim_cost'] or 0 
-                for enc in encounters
+    migrated_count = sum(r['migrated'] for r in shard_results)
+    unfinished_shards = [r['shard'] for r in shard_results if r['errors'] is None]
+    error_count = 0
+    for r in shard_results:
+        if r['errors'] is None and incremental:
+            # Only the changed patients were pending; the ones upserted before it stopped are live
+            r['errors'] = len(changed_ids) - r['migrated']
+        elif r['errors'] is None:
+            # The shard never connected or stopped early; count its whole range as not migrated
+            mysql_cursor.execute(
+                "SELECT COUNT(*) as total FROM patients WHERE patient_id BETWEEN %s AND %s",
+                (r['first_patient_id'], r['last_patient_id'])
             )
-            encounter_count = len(encounters)
-            active_conditions = [
-                cond['description'] for cond in conditions 
-                if cond['stop'] is None
-            ]
+            r['errors'] = mysql_cursor.fetchone()['total']
+        error_count += r['errors']
 
-            # Build comprehensive MongoDB document
-            patient_doc = {
-                "_id": patient['patient_source_id'],
-                "metadata": {
-                    "mysql_patient_id": patient_id,
-                    "migration_timestamp": datetime.now(),
-                    "data_version": "1.0"
-                },
-                "demographics": {
-                    "name": {
-                        "first": patient['first'],
-                        "last": patient['last'],
-                        "prefix": patient['prefix'],
-                        "suffix": patient['suffix']
-                    },
-                    "birthdate": patient['birthdate'].isoformat() if patient['birthdate'] else None,
-                    "age": patient['age'],
-                    "gender": patient['gender'],
-                    "race": patient['race'],
-                    "ethnicity": patient['ethnicity'],
-                    "marital_status": patient['marital'],
-                    "location": {
-                        "address": patient['address'],
-                        "city": patient['city'],
-                        "state": patient['state'],
-                        "zip": patient['zip'],
-                        "coordinates": {
-                            "lat": float(patient['lat']) if patient['lat'] else None,
-                            "lon": float(patient['lon']) if patient['lon'] else None
-                        }
-                    }
-                },
-                "clinical_summary": {
-                    "total_encounters": encounter_count,
-                    "active_conditions": active_conditions,
-                    "total_conditions": len(conditions),
-                    "total_procedures": len(procedures),
-                    "total_medications": len(medications),
-                    "healthcare_metrics": {
-                        "total_expenses": float(patient['healthcare_expenses']) if patient['healthcare_expenses'] else 0,
-                        "total_coverage": float(patient['healthcare_coverage']) if patient['healthcare_coverage'] else 0,
-                        "calculated_costs": float(total_healthcare_cost)
-                    }
-                },
-                "encounters": [
-                    {
-                        "encounter_id": enc['encounter_source_id'],
-                        "date": {
-                            "start": enc['start'].isoformat() if enc['start'] else None,
-                            "end": enc['stop'].isoformat() if enc['stop'] else None
-                        },
-                        "type": enc['description'],
-                        "class": enc['class'],
-                        "clinical": {
-                            "reason_code": enc['reason_code'],
-                            "reason_description": enc['reason_description']
-                        },
-                        "providers": {
-                            "organization": enc['organization_name'],
-                            "provider": enc['provider_name'],
-                            "specialty": enc['provider_specialty']
-                        },
-                        "financial": {
-                            "base_cost": float(enc['base_encounter_cost']) if enc['base_encounter_cost'] else 0,
-                            "total_claim_cost": float(enc['total_claim_cost']) if enc['total_claim_cost'] else 0,
-                            "payer_coverage": float(enc['payer_coverage']) if enc['payer_coverage'] else 0,
-                            "payer": enc['payer_name']
-                        }
-                    } for enc in encounters
-                ],
-                "conditions": [
-                    {
-                        "description": cond['description'],
-                        "code": cond['code'],
-                        "timeline": {
-                            "start": cond['start'].isoformat() if cond['start'] else None,
-                            "end": cond['stop'].isoformat() if cond['stop'] else None,
-                            "is_active": cond['stop'] is None
-                        }
-                    } for cond in conditions
-                ],
-                "procedures": [
-                    {
-                        "description": proc['description'],
-                        "code": proc['code'],
-                        "date": proc['procedure_date'].isoformat() if proc['procedure_date'] else None,
-                        "cost": float(proc['base_cost']) if proc['base_cost'] else 0
-                    } for proc in procedures
-                ],
-                "medications": [
-                    {
-                        "description": med['description'],
-                        "timeline": {
-                            "start": med['start'].isoformat() if med['start'] else None,
-                            "end": med['stop'].isoformat() if med['stop'] else None
-                        },
-                        "cost": {
-                            "base": float(med['base_cost']) if med['base_cost'] else 0,
-                            "total": float(med['total_cost']) if med['total_cost'] else 0
-                        }
-                    } for med in medications
-                ]
-            }
-
-            # Insert into MongoDB
-            patients_collection.insert_one(patient_doc)
-            migrated_count += 1
-            
-            if migrated_count % 100 == 0:
-                print(f"✅ Migrated {migrated_count}/{total_patients} patients...")
+    # 4. Index the finished build and swap it in over the live collection
+    if not incremental:
+        if unfinished_shards:
+            print(f"⚠️ Shards {unfinished_shards} did not finish - live collection left unchanged, rerun with --resume")
+        elif build_collection:
+            try:
+                publish_build_collection(mongo_db, build_collection)
+                print(f"✅ {build_collection} swapped in as {LIVE_COLLECTION}")
+            except Exception as e:
+                print(f"❌ Error swapping in {build_collection}: {e}")
+                unfinished_shards.append("swap")
 
+    # Dashboards read their aggregates from dashboard_rollups, so bring them in
+    # line with whatever patient_summaries now holds. Incremental runs only
+    # re-score the patients they rewrote.
+    if migrated_count:
+        score_query = {"metadata.mysql_patient_id": {"$in": changed_ids}} if incremental else None
+        try:
+            scored, rescored = score_population(mongo_db[LIVE_COLLECTION], query=score_query)
+            print(f"✅ Risk scores computed for {scored} patients ({rescored} changed)")
+        except Exception as e:
+            print(f"❌ Error computing risk scores: {e}")
+        try:
+            refresh_rollups(mongo_db, LIVE_COLLECTION)
+            print(f"✅ Dashboard rollups refreshed in {ROLLUP_COLLECTION}")
         except Exception as e:
-            print(f"❌ Error migrating patient {patient_id}: {e}")
-            error_count += 1
+            print(f"❌ Error refreshing dashboard rollups: {e}")
+        try:
+            rebuild_live_aggregates(get_redis(), mongo_db[LIVE_COLLECTION])
+            print("✅ Live condition counts and department patient sketches rebuilt")
+        except Exception as e:
+            print(f"❌ Error rebuilding live aggregates: {e}")
+        try:
+            invalidate_dashboard_cache(get_redis())
+            print("✅ Dashboard response caches invalidated")
+        except Exception as e:
+            print(f"⚠️ Could not invalidate dashboard caches - cached responses and ETags stay stale for up to 5 minutes: {e}")
 
     # 5. Create operational metrics collection
     try:
-        # Get department utilization
-        mysql_cursor.execute("""
-            SELECT o.name as department, 
-                   COUNT(*) as encounter_count,
-                   AVG(TIMESTAMPDIFF(HOUR, e.start, e.stop)) as avg_stay_hours
-            FROM encounters e
-            JOIN organizations o ON e.organization_id = o.org_id
-            WHERE e.stop IS NOT NULL
-            GROUP BY o.name
-            ORDER BY encounter_count DESC
-        """)
-        department_metrics = mysql_cursor.fetchall()
-
-        # Get top conditions
-        mysql_cursor.execute("""
-            SELECT description, COUNT(*) as patient_count
-            FROM conditions
-            GROUP BY description
-            ORDER BY patient_count DESC
-            LIMIT 10
-        """)
-        top_conditions = mysql_cursor.fetchall()
-
-        metrics_doc = {
-            "_id": "operational_dashboard",
-            "migration_summary": {
-                "total_patients_migrated": migrated_count,
-                "total_errors": error_count,
-                "migration_date": datetime.now(),
-                "data_timeframe": "2017-2018"
-            },
-            "department_utilization": [
-                {
-                    "department": dept['department'],
-                    "encounter_count": dept['encounter_count'],
-                    "average_stay_hours": float(dept['avg_stay_hours']) if dept['avg_stay_hours'] else 0
-                } for dept in department_metrics
-            ],
-            "clinical_insights": {
-                "top_conditions": [
-                    {
-                        "condition": cond['description'],
-                        "patient_count": cond['patient_count']
-                    } for cond in top_conditions
-                ]
-            }
-        }
-        
-        metrics_collection.insert_one(metrics_doc)
+        write_operational_metrics(mysql_cursor, metrics_collection, {
+            "total_patients_migrated": mongo_db[LIVE_COLLECTION].count_documents({}),
+            "patients_written_this_run": migrated_count,
+            "total_errors": error_count,
+            "migration_date": datetime.now(),
+            "migration_type": "incremental" if incremental else "resumed" if resume else "full",
+            "data_timeframe": "2017-2018",
+            "workers": workers,
+            "shards": shard_results
+        })
         print("✅ Operational metrics created")
 
     except Exception as e:
         print(f"❌ Error creating metrics: {e}")
 
-    # 6. Cleanup and summary
+    # 6. Close out the run; a run with unreachable shards stays resumable
+    if not incremental and not unfinished_shards:
+        state_collection.update_one(
+            {"_id": RUN_STATE_ID},
+            {"$set": {"status": "completed", "completed_at": datetime.now()}}
+        )
+
+    # Advance the watermarks only when every changed patient made it into MongoDB
+    if error_count == 0 and not unfinished_shards:
+        state_collection.replace_one(
+            {"_id": WATERMARKS_ID},
+            dict(maxima, _id=WATERMARKS_ID, updated_at=datetime.now()),
+            upsert=True
+        )
+        print("✅ Migration watermarks updated")
+    else:
+        print("⚠️ Watermarks not advanced because of errors - the next incremental run will retry")
+
+    # 7. Cleanup and summary
     mysql_cursor.close()
     mysql_conn.close()
-    mongo_client.close()
+    close_clients()
 
     print("=" * 60)
     print(f"🎉 MIGRATION COMPLETED!")
-    print(f"📊 Patients migrated: {migrated_count}/{total_patients}")
+    if incremental:
+        print(f"📊 Patients refreshed: {migrated_count}")
+    else:
+        print(f"📊 Patients migrated: {migrated_count}/{total_patients}")
     print(f"❌ Errors: {error_count}")
-    print(f"💾 MongoDB collections created:")
-    print(f"   - patient_summaries ({migrated_count} documents)")
-    print(f"   - operational_metrics (1 document)")
+    if not incremental:
+        print(f"💾 MongoDB collections created:")
+        print(f"   - patient_summaries ({migrated_count} documents)")
+        print(f"   - operational_metrics (1 document)")
+        print(f"   - {ROLLUP_COLLECTION} (precomputed dashboard aggregates)")
     print("🔍 Open MongoDB Compass to view your data!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate hospital_operations (MySQL) into MongoDB")
+    parser.add_argument(
+        "--mode", choices=MIGRATION_MODES, default="bulk",
+        help="bulk: one ordered scan per child table (default); per-patient: 4 queries per patient"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help="maximum documents per insert_many batch"
+    )
+    parser.add_argument(
+        "--batch-bytes", type=int, default=DEFAULT_BATCH_BYTES,
+        help="maximum BSON bytes per insert_many batch"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+        help="patients read per keyset page"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of worker processes, each migrating its own patient_id shard"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only rebuild patients with rows added since the last run's watermarks"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue an interrupted full migration from its per-shard checkpoints"
+    )
+    args = parser.parse_args()
+    if args.resume and args.incremental:
+        parser.error("--resume and --incremental cannot be combined")
 
-    create_mongodb_documents()
+    create_mongodb_documents(
+        mode=args.mode,
+        batch_size=args.batch_size,
+        batch_bytes=args.batch_bytes,
+        page_size=args.page_size,
+        workers=args.workers,
+        incremental=args.incremental,
+        resume=args.resume
+    )
@@ -0,0 +1,259 @@
+from datetime import datetime
+
+from common.chronic_conditions import chronic_flags
+from common.condition_search import condition_tokens
+
+# Positional row -> document conversion for the MySQL to MongoDB migration.
+#
+# Each table declares the columns it SELECTs (in order) and a nested spec of the
+# document fragment it produces. compile_mapper() turns the spec into a single
+# generated function that unpacks the tuple row into locals once and builds the
+# fragment as one dict literal, so there is no per-row column-name lookup, no
+# intermediate dict from a dictionary=True cursor and no helper calls per field.
+#
+# Leaf specs are (converter, column). Converters keep the exact semantics of the
+# original hand-written document code:
+#   raw            value as-is
+#   iso            x.isoformat() if x else None
+#   money          float(x) if x else 0
+#   float_or_none  float(x) if x else None
+#   is_null        x is None
+#   tokens         condition_tokens(x), the indexed words condition search matches
+
+CONVERTERS = {
+    "raw": "{v}",
+    "iso": "({v}.isoformat() if {v} else None)",
+    "money": "(float({v}) if {v} else 0)",
+    "float_or_none": "(float({v}) if {v} else None)",
+    "is_null": "({v} is None)",
+    "tokens": "condition_tokens({v})",
+}
+
+# Every child table selects patient_id first so rows can be grouped on row[0]
+PATIENT_COLUMNS = [
+    ("patient_id", "p.patient_id"),
+    ("patient_source_id", "p.patient_source_id"),
+    ("first", "p.first"),
+    ("last", "p.last"),
+    ("prefix", "p.prefix"),
+    ("suffix", "p.suffix"),
+    ("birthdate", "p.birthdate"),
+    ("age", "TIMESTAMPDIFF(YEAR, p.birthdate, CURDATE())"),
+    ("gender", "p.gender"),
+    ("race", "p.race"),
+    ("ethnicity", "p.ethnicity"),
+    ("marital", "p.marital"),
+    ("address", "p.address"),
+    ("city", "p.city"),
+    ("state", "p.state"),
+    ("zip", "p.zip"),
+    ("lat", "p.lat"),
+    ("lon", "p.lon"),
+    ("healthcare_expenses", "p.healthcare_expenses"),
+    ("healthcare_coverage", "p.healthcare_coverage"),
+]
+
+ENCOUNTER_COLUMNS = [
+    ("patient_id", "e.patient_id"),
+    ("encounter_source_id", "e.encounter_source_id"),
+    ("start", "e.start"),
+    ("stop", "e.stop"),
+    ("description", "e.description"),
+    ("class", "e.class"),
+    ("reason_code", "e.reason_code"),
+    ("reason_description", "e.reason_description"),
+    ("organization_name", "o.name"),
+    ("provider_name", "pr.name"),
+    ("provider_specialty", "pr.specialty"),
+    ("base_encounter_cost", "e.base_encounter_cost"),
+    ("total_claim_cost", "e.total_claim_cost"),
+    ("payer_coverage", "e.payer_coverage"),
+    ("payer_name", "pay.name"),
+]
+
+CONDITION_COLUMNS = [
+    ("patient_id", "patient_id"),
+    ("description", "description"),
+    ("code", "code"),
+    ("start", "start"),
+    ("stop", "stop"),
+]
+
+PROCEDURE_COLUMNS = [
+    ("patient_id", "patient_id"),
+    ("description", "description"),
+    ("code", "code"),
+    ("procedure_date", "procedure_date"),
+    ("base_cost", "base_cost"),
+]
+
+MEDICATION_COLUMNS = [
+    ("patient_id", "patient_id"),
+    ("description", "description"),
+    ("start", "start"),
+    ("stop", "stop"),
+    ("base_cost", "base_cost"),
+    ("total_cost", "total_cost"),
+]
+
+DEMOGRAPHICS_SPEC = {
+    "name": {
+        "first": ("raw", "first"),
+        "last": ("raw", "last"),
+        "prefix": ("raw", "prefix"),
+        "suffix": ("raw", "suffix")
+    },
+    "birthdate": ("iso", "birthdate"),
+    "age": ("raw", "age"),
+    "gender": ("raw", "gender"),
+    "race": ("raw", "race"),
+    "ethnicity": ("raw", "ethnicity"),
+    "marital_status": ("raw", "marital"),
+    "location": {
+        "address": ("raw", "address"),
+        "city": ("raw", "city"),
+        "state": ("raw", "state"),
+        "zip": ("raw", "zip"),
+        "coordinates": {
+            "lat": ("float_or_none", "lat"),
+            "lon": ("float_or_none", "lon")
+        }
+    }
+}
+
+ENCOUNTER_SPEC = {
+    "encounter_id": ("raw", "encounter_source_id"),
+    "date": {
+        "start": ("iso", "start"),
+        "end": ("iso", "stop")
+    },
+    "type": ("raw", "description"),
+    "class": ("raw", "class"),
+    "clinical": {
+        "reason_code": ("raw", "reason_code"),
+        "reason_description": ("raw", "reason_description")
+    },
+    "providers": {
+        "organization": ("raw", "organization_name"),
+        "provider": ("raw", "provider_name"),
+        "specialty": ("raw", "provider_specialty")
+    },
+    "financial": {
+        "base_cost": ("money", "base_encounter_cost"),
+        "total_claim_cost": ("money", "total_claim_cost"),
+        "payer_coverage": ("money", "payer_coverage"),
+        "payer": ("raw", "payer_name")
+    }
+}
+
+CONDITION_SPEC = {
+    "description": ("raw", "description"),
+    "code": ("raw", "code"),
+    "timeline": {
+        "start": ("iso", "start"),
+        "end": ("iso", "stop"),
+        "is_active": ("is_null", "stop")
+    },
+    "tokens": ("tokens", "description")
+}
+
+PROCEDURE_SPEC = {
+    "description": ("raw", "description"),
+    "code": ("raw", "code"),
+    "date": ("iso", "procedure_date"),
+    "cost": ("money", "base_cost")
+}
+
+MEDICATION_SPEC = {
+    "description": ("raw", "description"),
+    "timeline": {
+        "start": ("iso", "start"),
+        "end": ("iso", "stop")
+    },
+    "cost": {
+        "base": ("money", "base_cost"),
+        "total": ("money", "total_cost")
+    }
+}
+
+def select_list(columns):
+    """SQL select list matching a column declaration, in order"""
+    return ",\n           ".join(f"{expr} as `{name}`" for name, expr in columns)
+
+def column_index(columns):
+    return {name: i for i, (name, _) in enumerate(columns)}
+
+def compile_mapper(name, columns, spec):
+    """Generate a function that maps one tuple row to the document fragment in spec"""
+    positions = column_index(columns)
+
+    def render(node):
+        if isinstance(node, dict):
+            items = ", ".join(f"{key!r}: {render(value)}" for key, value in node.items())
+            return "{" + items + "}"
+        converter, column = node
+        return CONVERTERS[converter].format(v=f"c{positions[column]}")
+
+    unpack = ", ".join(f"c{i}" for i in range(len(columns)))
+    source = (
+        f"def {name}(r, float=float, condition_tokens=condition_tokens):\n"
+        f"    {unpack}, = r\n"
+        f"    return {render(spec)}\n"
+    )
+    namespace = {"condition_tokens": condition_tokens}
+    exec(compile(source, f"<row_mapper {name}>", "exec"), namespace)
+    mapper = namespace[name]
+    mapper.source = source
+    return mapper
+
+map_demographics = compile_mapper("map_demographics", PATIENT_COLUMNS, DEMOGRAPHICS_SPEC)
+map_encounter = compile_mapper("map_encounter", ENCOUNTER_COLUMNS, ENCOUNTER_SPEC)
+map_condition = compile_mapper("map_condition", CONDITION_COLUMNS, CONDITION_SPEC)
+map_procedure = compile_mapper("map_procedure", PROCEDURE_COLUMNS, PROCEDURE_SPEC)
+map_medication = compile_mapper("map_medication", MEDICATION_COLUMNS, MEDICATION_SPEC)
+
+PATIENT = column_index(PATIENT_COLUMNS)
+ENCOUNTER = column_index(ENCOUNTER_COLUMNS)
+CONDITION = column_index(CONDITION_COLUMNS)
+
+def build_patient_document(patient, encounters, conditions, procedures, medications, migrated_at=None):
+    """Build the patient_summaries document from tuple rows of one patient"""
+    total_claim = ENCOUNTER['total_claim_cost']
+    cond_stop = CONDITION['stop']
+    cond_description = CONDITION['description']
+    cond_code = CONDITION['code']
+
+    # Calculate financial metrics
+    total_healthcare_cost = sum(enc[total_claim] or 0 for enc in encounters)
+    active_conditions = [cond[cond_description] for cond in conditions if cond[cond_stop] is None]
+    chronic = chronic_flags(cond[cond_code] for cond in conditions)
+    expenses = patient[PATIENT['healthcare_expenses']]
+    coverage = patient[PATIENT['healthcare_coverage']]
+
+    return {
+        "_id": patient[PATIENT['patient_source_id']],
+        "metadata": {
+            "mysql_patient_id": patient[PATIENT['patient_id']],
+            "migration_timestamp": migrated_at or datetime.now(),
+            "data_version": "1.0"
+        },
+        "demographics": map_demographics(patient),
+        "clinical_summary": {
+            "total_encounters": len(encounters),
+            "active_conditions": active_conditions,
+            "total_conditions": len(conditions),
+            "total_procedures": len(procedures),
+            "total_medications": len(medications),
+            "chronic_flags": chronic,
+            "chronic_count": len(chronic),
+            "healthcare_metrics": {
+                "total_expenses": float(expenses) if expenses else 0,
+                "total_coverage": float(coverage) if coverage else 0,
+                "calculated_costs": float(total_healthcare_cost)
+            }
+        },
+        "encounters": list(map(map_encounter, encounters)),
+        "conditions": list(map(map_condition, conditions)),
+        "procedures": list(map(map_procedure, procedures)),
+        "medications": list(map(map_medication, medications))
+    }
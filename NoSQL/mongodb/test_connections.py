@@ -1,16 +1,14 @@
-import mysql.connector
-import pymongo
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.connections import get_mongo_client, mysql_connect, close_clients
 
 print("🔍 Testing Database Connections...")
 
 # Test MySQL Connection
 try:
-    mysql_conn = mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='',    # First try empty password
-        database='hospital_operations'
-    )
+    mysql_conn = mysql_connect()    # Set HOSPITAL_MYSQL_PASSWORD to try another password
     print("✅ MySQL Connection: SUCCESS")
     mysql_conn.close()
 except Exception as e:
@@ -18,10 +16,10 @@ except Exception as e:
 
 # Test MongoDB Connection  
 try:
-    mongo_client = pymongo.MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=3000)
+    mongo_client = get_mongo_client(serverSelectionTimeoutMS=3000)
     mongo_client.admin.command('ismaster')
     print("✅ MongoDB Connection: SUCCESS")
-    mongo_client.close()
+    close_clients()
 except Exception as e:
     print(f"❌ MongoDB Connection: FAILED - {e}")
 
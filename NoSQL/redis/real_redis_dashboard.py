@@ -1,32 +1,31 @@
-import redis
-import pymongo
 from datetime import datetime
 import time
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.connections import get_mongo_db, get_redis
+from common.cost_distribution import get_cost_distribution
+from common.dashboard_snapshot import publish_dashboard_snapshot, dashboard_keys
+from common.live_aggregates import rebuild_live_aggregates, top_conditions
+from common.encounter_events import get_event_bus, make_event, read_live_counters
 
 def setup_redis_dashboard():
     print("🚀 SETTING UP REAL REDIS DASHBOARD")
     print("=" * 60)
     
     # Connect to Redis
-    r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+    r = get_redis()
     
     # Connect to MongoDB
-    mongo_client = pymongo.MongoClient('mongodb://localhost:27017/')
-    db = mongo_client['hospital_platform']
+    db = get_mongo_db()
     patients = db['patient_summaries']
     
-    # Clear previous data
-    r.flushdb()
-    print("✅ Redis database cleared")
-    
     # 1. Basic counters
     total_patients = patients.count_documents({})
-    r.set("dashboard:total_patients", total_patients)
-    
     high_cost_count = patients.count_documents({
         "clinical_summary.healthcare_metrics.total_expenses": {"$gt": 50000}
     })
-    r.set("dashboard:high_cost_patients", high_cost_count)
     
     # 2. Department encounter counts (Hash)
     dept_pipeline = [
@@ -39,123 +38,120 @@ def setup_redis_dashboard():
     ]
     
     departments = list(patients.aggregate(dept_pipeline))
-    for dept in departments[:15]:  # Top 15 departments
-        r.hset("dashboard:departments", dept['_id'], dept['count'])
+    department_counts = {dept['_id']: dept['count'] for dept in departments[:15]}  # Top 15 departments
     
     # 3. Top conditions (Sorted Set - for rankings)
-    condition_pipeline = [
-        {"$unwind": "$conditions"},
-        {"$group": {
-            "_id": "$conditions.description",
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"count": -1}},
-        {"$limit": 20}
-    ]
-    
-    top_conditions = list(patients.aggregate(condition_pipeline))
-    for condition in top_conditions:
-        r.zadd("dashboard:top_conditions", {condition['_id']: condition['count']})
-    
-    # 4. Cost distribution
-    cost_brackets = [
-        (0, 10000, "low"),
-        (10000, 50000, "medium"), 
-        (50000, 100000, "high"),
-        (100000, 1000000, "very_high"),
-        (1000000, 5000000, "extreme")
-    ]
-    
-    for min_cost, max_cost, label in cost_brackets:
-        count = patients.count_documents({
-            "clinical_summary.healthcare_metrics.total_expenses": {
-                "$gte": min_cost, "$lt": max_cost
-            }
-        })
-        r.hset("dashboard:cost_distribution", label, count)
-    
-    # 5. Timestamps and metadata
-    r.set("dashboard:last_updated", datetime.now().isoformat())
-    r.set("dashboard:data_version", "1.0")
-    
-    print("✅ Redis dashboard populated!")
-    print(f"   - Total patients: {r.get('dashboard:total_patients')}")
-    print(f"   - High-cost patients: {r.get('dashboard:high_cost_patients')}")
-    print(f"   - Departments tracked: {r.hlen('dashboard:departments')}")
-    print(f"   - Top conditions: {r.zcard('dashboard:top_conditions')}")
-    print(f"   - Last updated: {r.get('dashboard:last_updated')}")
+    # The live sorted set (kept current by encounter events) is rebuilt first
+    rebuild_live_aggregates(r, patients)
+    condition_scores = {condition['name']: condition['count'] for condition in top_conditions(r, 20)}
+    
+    # 4. Cost distribution (all brackets in one aggregation)
+    cost_distribution = get_cost_distribution(patients)
+    bracket_counts = {bracket['key']: bracket['count'] for bracket in cost_distribution['brackets']}
+    
+    # 5. Write everything, with timestamps and metadata, as a new version and
+    # switch readers over to it; the previous version stays live until then
+    last_updated = datetime.now().isoformat()
+    version = publish_dashboard_snapshot(
+        r,
+        strings={
+            "total_patients": total_patients,
+            "high_cost_patients": high_cost_count,
+            "last_updated": last_updated,
+            "data_version": "1.0"
+        },
+        hashes={
+            "departments": department_counts,
+            "cost_distribution": bracket_counts
+        },
+        sorted_sets={"top_conditions": condition_scores}
+    )
+    
+    print(f"✅ Redis dashboard populated! (version {version})")
+    print(f"   - Total patients: {total_patients}")
+    print(f"   - High-cost patients: {high_cost_count}")
+    print(f"   - Departments tracked: {len(department_counts)}")
+    print(f"   - Top conditions: {len(condition_scores)}")
+    print(f"   - Last updated: {last_updated}")
+
+def demonstrate_redis_features(publish_sample_events=False):
+    """Show Redis in action with live updates
 
-def demonstrate_redis_features():
-    """Show Redis in action with live updates"""
-    r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+    Sample events are real encounters as far as the live counters are
+    concerned, so they are only published when asked for (--demo).
+    """
+    r = get_redis()
+    keys = dashboard_keys(r, "total_patients", "high_cost_patients", "departments", "top_conditions", "last_updated")
+    if keys is None:
+        print("⚠️ No dashboard snapshot published yet - run setup_redis_dashboard() first")
+        return
+    total_key, high_cost_key, departments_key, conditions_key, updated_key = keys
     
     print("\n🎯 REDIS REAL-TIME FEATURES DEMONSTRATION")
     print("=" * 50)
     
     # Show current state
     print("1. 📊 CURRENT DASHBOARD STATE:")
-    print(f"   Total Patients: {r.get('dashboard:total_patients')}")
-    print(f"   High-Cost %: {int(r.get('dashboard:high_cost_patients')) / int(r.get('dashboard:total_patients')) * 100:.1f}%")
+    print(f"   Total Patients: {r.get(total_key)}")
+    print(f"   High-Cost %: {int(r.get(high_cost_key)) / int(r.get(total_key)) * 100:.1f}%")
     
     print("\n2. 🏥 TOP 5 DEPARTMENTS:")
-    departments = r.hgetall("dashboard:departments")
+    departments = r.hgetall(departments_key)
     top_depts = sorted(departments.items(), key=lambda x: int(x[1]), reverse=True)[:5]
     for dept, count in top_depts:
         print(f"   {dept}: {count} encounters")
     
     print("\n3. 🩺 TOP 5 CONDITIONS:")
-    top_conditions = r.zrevrange("dashboard:top_conditions", 0, 4, withscores=True)
-    for condition, score in top_conditions:
+    leaders = r.zrevrange(conditions_key, 0, 4, withscores=True)
+    for condition, score in leaders:
         print(f"   {condition}: {int(score)} patients")
     
-    print("\n4. 🔄 SIMULATING REAL-TIME HOSPITAL ACTIVITY...")
-    print("   (This demonstrates Redis's speed for live updates)")
-    
-    # Simulate live hospital activity
-    for i in range(5):
-        time.sleep(2)
-        
-        # Simulate new patient registration
-        r.incr("dashboard:total_patients")
-        new_total = r.get("dashboard:total_patients")
+    dept_names = [dept for dept, _ in top_depts]
+    if publish_sample_events and not dept_names:
+        print("\n4. 🔄 NO DEPARTMENTS PUBLISHED - skipping sample encounter events")
+    elif publish_sample_events:
+        print("\n4. 🔄 PUBLISHING SAMPLE ENCOUNTER EVENTS...")
+        print("   (They are counted as real encounters by the live counters)")
         
-        # Simulate new encounters
-        r.incr("dashboard:today_encounters")
-        today_encounters = r.get("dashboard:today_encounters")
-        
-        # Update timestamp
-        r.set("dashboard:last_updated", datetime.now().strftime("%H:%M:%S"))
-        
-        print(f"   ⏰ {datetime.now().strftime('%H:%M:%S')}")
-        print(f"   📈 New patient! Total: {new_total}")
-        print(f"   🏥 New encounter! Today: {today_encounters}")
-        
-        # Simulate department activity
-        if i % 2 == 0:
-            r.hincrby("dashboard:departments", "Emergency Department", 1)
-            print("   🚑 Emergency Department: +1 encounter")
+        # Sample encounters for the busiest departments, applied by the event bus
+        bus = get_event_bus(r)
+        events = [make_event(dept_names[i % len(dept_names)], encounter_class="ambulatory") for i in range(10)]
+        bus.publish(events)
+        bus.drain()
+        r.set(updated_key, datetime.now().strftime("%H:%M:%S"))
+    else:
+        print("\n4. 🔄 LIVE ENCOUNTER COUNTERS:")
+        print("   (Fed by the encounter event stream; run with --demo to publish sample events)")
+    
+    counters = read_live_counters(r, dept_names)
+    print(f"   ⏰ {datetime.now().strftime('%H:%M:%S')}")
+    print(f"   🏥 Encounters today: {counters['today_encounters']} (last hour: {counters['window_encounters']})")
+    for dept, activity in counters['departments'].items():
+        print(f"   {dept}: {activity['today_encounters']} today, {activity['per_hour']}/hour")
     
     print("\n✅ REAL-TIME DEMONSTRATION COMPLETE!")
     print("   Redis enables sub-second dashboard updates")
 
 def show_redis_performance():
     """Demonstrate Redis speed advantages"""
-    r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+    r = get_redis()
+    keys = dashboard_keys(r, "total_patients")
+    if keys is None:
+        print("⚠️ No dashboard snapshot published yet - run setup_redis_dashboard() first")
+        return
+    total_key, = keys
     
     print("\n⚡ REDIS PERFORMANCE DEMONSTRATION")
     print("=" * 50)
     
-    import time
-    
     # Test Redis speed
     start_time = time.time()
     for i in range(1000):
-        r.get("dashboard:total_patients")
+        r.get(total_key)
     redis_time = time.time() - start_time
     
     # Test MongoDB speed (for comparison)
-    mongo_client = pymongo.MongoClient('mongodb://localhost:27017/')
-    db = mongo_client['hospital_platform']
+    db = get_mongo_db()
     patients = db['patient_summaries']
     
     start_time = time.time()
@@ -170,12 +166,12 @@ def show_redis_performance():
 if __name__ == "__main__":
     # Test connection first
     try:
-        r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+        r = get_redis()
         r.ping()
         
         # Run the dashboard setup
         setup_redis_dashboard()
-        demonstrate_redis_features()
+        demonstrate_redis_features(publish_sample_events="--demo" in sys.argv)
         show_redis_performance()
         
         print("\n🎉 REDIS DASHBOARD COMPLETE!")
@@ -1,15 +1,19 @@
-import redis
-import pymongo
 from datetime import datetime
-import time
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.connections import get_mongo_db, get_redis
+from common.dashboard_snapshot import publish_dashboard_snapshot, dashboard_keys
+from common.live_aggregates import rebuild_live_aggregates, top_conditions
+from common.encounter_events import get_event_bus, make_event, read_live_counters
 
 def setup_redis_dashboard():
     # Connect to Redis
-    r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+    r = get_redis()
     
     # Connect to MongoDB
-    mongo_client = pymongo.MongoClient('mongodb://localhost:27017/')
-    db = mongo_client['hospital_platform']
+    db = get_mongo_db()
     patients = db['patient_summaries']
     
     print("🚀 SETTING UP REDIS REAL-TIME DASHBOARD")
@@ -17,13 +21,11 @@ def setup_redis_dashboard():
     
     # 1. Basic counters
     total_patients = patients.count_documents({})
-    r.set("dashboard:total_patients", total_patients)
     
     # 2. High-cost patient counter
     high_cost_count = patients.count_documents({
         "clinical_summary.healthcare_metrics.total_expenses": {"$gt": 50000}
     })
-    r.set("dashboard:high_cost_patients", high_cost_count)
     
     # 3. Department encounter counts
     pipeline = [
@@ -35,56 +37,62 @@ def setup_redis_dashboard():
     ]
     
     departments = list(patients.aggregate(pipeline))
-    for dept in departments[:10]:  # Top 10 departments
-        r.hset("dashboard:departments", dept['_id'], dept['count'])
+    department_counts = {dept['_id']: dept['count'] for dept in departments[:10]}  # Top 10 departments
     
     # 4. Condition prevalence
-    condition_pipeline = [
-        {"$unwind": "$conditions"},
-        {"$group": {
-            "_id": "$conditions.description",
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"count": -1}},
-        {"$limit": 15}
-    ]
-    
-    top_conditions = list(patients.aggregate(condition_pipeline))
-    for condition in top_conditions:
-        r.zadd("dashboard:top_conditions", {condition['_id']: condition['count']})
+    # The live sorted set (kept current by encounter events) is rebuilt first
+    rebuild_live_aggregates(r, patients)
+    condition_scores = {condition['name']: condition['count'] for condition in top_conditions(r, 15)}
     
-    # 5. Real-time metrics with timestamps
-    r.set("dashboard:last_updated", datetime.now().isoformat())
-    r.set("dashboard:data_freshness", "live")
+    # 5. Real-time metrics with timestamps, published as a new dashboard version
+    last_updated = datetime.now().isoformat()
+    version = publish_dashboard_snapshot(
+        r,
+        strings={
+            "total_patients": total_patients,
+            "high_cost_patients": high_cost_count,
+            "last_updated": last_updated,
+            "data_freshness": "live"
+        },
+        hashes={"departments": department_counts},
+        sorted_sets={"top_conditions": condition_scores}
+    )
     
-    print("✅ Redis dashboard populated with real-time metrics:")
-    print(f"   - Total patients: {r.get('dashboard:total_patients')}")
-    print(f"   - High-cost patients: {r.get('dashboard:high_cost_patients')}")
-    print(f"   - Departments tracked: {r.hlen('dashboard:departments')}")
-    print(f"   - Top conditions: {r.zcard('dashboard:top_conditions')}")
-    print(f"   - Last updated: {r.get('dashboard:last_updated')}")
+    print(f"✅ Redis dashboard populated with real-time metrics (version {version}):")
+    print(f"   - Total patients: {total_patients}")
+    print(f"   - High-cost patients: {high_cost_count}")
+    print(f"   - Departments tracked: {len(department_counts)}")
+    print(f"   - Top conditions: {len(condition_scores)}")
+    print(f"   - Last updated: {last_updated}")
+
+def simulate_live_updates(publish_sample_events=False):
+    """Show the live encounter counters, optionally after publishing sample events (--demo)
 
-def simulate_live_updates():
-    """Simulate real-time updates to the dashboard"""
-    r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+    Sample events are counted as real encounters, so by default nothing is written.
+    """
+    r = get_redis()
+    keys = dashboard_keys(r, "departments")
+    if keys is None:
+        print("⚠️ No dashboard snapshot published yet - run setup_redis_dashboard() first")
+        return
+    departments_key, = keys
+    departments = list(r.hkeys(departments_key))[:3]
     
-    print("\n🔄 SIMULATING LIVE HOSPITAL UPDATES")
+    print("\n🔄 LIVE HOSPITAL UPDATES")
     print("=" * 50)
     
-    # Simulate new patient registrations
-    for i in range(5):
-        time.sleep(2)
-        current_count = int(r.get("dashboard:total_patients"))
-        r.incr("dashboard:total_patients")
-        r.set("dashboard:last_updated", datetime.now().isoformat())
-        print(f"📈 New patient registered! Total: {current_count + 1}")
+    if publish_sample_events:
+        # New encounters go through the event bus that feeds the live counters
+        bus = get_event_bus(r)
+        bus.publish([make_event(dept) for dept in departments])
+        bus.drain()
+        print(f"🧪 Published {len(departments)} sample encounter events")
     
-    # Simulate new encounters
-    for i in range(3):
-        time.sleep(1)
-        r.incr("dashboard:today_encounters")
-        print(f"🏥 New encounter recorded! Today: {r.get('dashboard:today_encounters')}")
+    counters = read_live_counters(r, departments)
+    for dept in departments:
+        print(f"🏥 {dept}: {counters['departments'][dept]['today_encounters']} encounters today")
+    print(f"🏥 Encounters today, all departments: {counters['today_encounters']}")
 
 if __name__ == "__main__":
     setup_redis_dashboard()
-    simulate_live_updates()
\ No newline at end of file
+    simulate_live_updates(publish_sample_events="--demo" in sys.argv)
\ No newline at end of file
@@ -1,9 +1,13 @@
-import redis
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.connections import get_redis
 
 def test_redis_connection():
     print("🔍 Testing Redis Connection...")
     try:
-        r = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+        r = get_redis()
         
         # Test basic connection
         response = r.ping()
@@ -0,0 +1,4 @@
+# Shared building blocks used by the NoSQL scripts and the Flask dashboards.
+#
+# Scripts run from their own directories, so they put the repository root on
+# sys.path before importing from here.
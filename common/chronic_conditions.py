@@ -0,0 +1,115 @@
+# Chronic-condition classification by SNOMED code, applied at migration time.
+#
+# Chronic burden used to be recomputed per query: five $regexMatch expressions
+# over every condition description in MongoDB, or a keyword scan in Python.
+# Instead each condition code maps to a chronic category here, the migrator
+# stores the categories a patient has on the document,
+#
+#   clinical_summary.chronic_flags   ["diabetes", "hypertension"]
+#   clinical_summary.chronic_count   2
+#
+# and "patients with the highest chronic burden" is an indexed sort on
+# chronic_count. Categories are matched on codes, so "Prediabetes" no longer
+# counts as diabetes just because its description contains the word.
+#
+# The categories can be replaced without code changes by pointing
+# HOSPITAL_CHRONIC_CONDITIONS_FILE at a JSON object of the same shape
+# ({"flag": {"label": ..., "codes": [...]}}). Documents migrated before the
+# flags existed, or after the categories change, are reclassified in place
+# from the repository root with:  python -m common.chronic_conditions
+import json
+import os
+
+from pymongo import UpdateOne
+
+CHRONIC_CONDITIONS_FILE_ENV = "HOSPITAL_CHRONIC_CONDITIONS_FILE"
+FLAGS_FIELD = "clinical_summary.chronic_flags"
+COUNT_FIELD = "clinical_summary.chronic_count"
+BACKFILL_BATCH_SIZE = 500
+
+DEFAULT_CHRONIC_CONDITIONS = {
+    "hypertension": {
+        "label": "Hypertension",
+        "codes": ["59621000"]
+    },
+    "diabetes": {
+        "label": "Diabetes",
+        "codes": ["44054006", "127013003"]
+    },
+    "heart_disease": {
+        "label": "Heart Disease",
+        "codes": ["53741008", "88805009", "49436004", "22298006"]
+    },
+    "copd": {
+        "label": "COPD",
+        "codes": ["185086009", "87433001"]
+    },
+    "obesity": {
+        "label": "Obesity",
+        "codes": ["162864005", "408512008"]
+    },
+    "hyperlipidemia": {
+        "label": "Hyperlipidemia",
+        "codes": ["55822004"]
+    },
+    "chronic_kidney_disease": {
+        "label": "Chronic Kidney Disease",
+        "codes": ["431855005", "431856006", "127013003"]
+    },
+    "chronic_pain": {
+        "label": "Chronic Pain",
+        "codes": ["82423001"]
+    }
+}
+
+def load_chronic_conditions():
+    """Category definitions from HOSPITAL_CHRONIC_CONDITIONS_FILE, or the defaults"""
+    path = os.environ.get(CHRONIC_CONDITIONS_FILE_ENV)
+    if not path:
+        return DEFAULT_CHRONIC_CONDITIONS
+    with open(path, encoding="utf-8") as definitions:
+        return json.load(definitions)
+
+def code_flags(definitions):
+    """code -> flags lookup table (a code may belong to several categories)"""
+    flags_by_code = {}
+    for flag, definition in definitions.items():
+        for code in definition["codes"]:
+            flags_by_code.setdefault(str(code), []).append(flag)
+    return flags_by_code
+
+CHRONIC_CONDITIONS = load_chronic_conditions()
+CHRONIC_FLAGS_BY_CODE = code_flags(CHRONIC_CONDITIONS)
+
+def chronic_flags(codes, flags_by_code=CHRONIC_FLAGS_BY_CODE):
+    """Sorted chronic categories for an iterable of condition codes"""
+    flags = set()
+    for code in codes:
+        flags.update(flags_by_code.get(str(code), ()))
+    return sorted(flags)
+
+def chronic_label(flag):
+    return CHRONIC_CONDITIONS.get(flag, {}).get("label", flag)
+
+def backfill_chronic_flags(collection, batch_size=BACKFILL_BATCH_SIZE):
+    """Reclassify every patient from its condition codes; returns the number of documents changed"""
+    updated = 0
+    batch = []
+    for patient in collection.find({}, {"conditions.code": 1}, batch_size=batch_size):
+        flags = chronic_flags(condition.get("code") for condition in patient.get("conditions", []))
+        batch.append(UpdateOne({"_id": patient["_id"]}, {"$set": {FLAGS_FIELD: flags, COUNT_FIELD: len(flags)}}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+if __name__ == "__main__":
+    from common.connections import get_mongo_db, get_redis
+    from common.response_cache import invalidate_dashboard_cache
+
+    updated = backfill_chronic_flags(get_mongo_db()["patient_summaries"])
+    invalidate_dashboard_cache(get_redis())
+    print(f"✅ Chronic flags updated on {updated} patients")
+    print("   Create the chronic_count index with: python NoSQL/mongodb/mongodb_indexes.py")
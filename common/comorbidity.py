@@ -0,0 +1,102 @@
+# Condition co-occurrence (comorbidity) analysis over patient condition sets.
+#
+# Patients and conditions form a sparse 0/1 incidence matrix X (patients x
+# condition codes). One sparse product C = X^T X gives every pairwise
+# co-occurrence count at once, with each condition's prevalence on the
+# diagonal. Pairs are scored as association rules A -> B:
+#
+#   support     C[A,B] / N                  share of all patients with both
+#   confidence  C[A,B] / C[A,A]             share of A patients who also have B
+#   lift        C[A,B] * N / (C[A,A] C[B,B])  how much likelier B is given A
+#
+# The result is stored as the "comorbidity" dashboard rollup, so it is
+# recomputed when the migrator refreshes rollups and served with a find_one().
+import numpy as np
+from scipy import sparse
+
+DEFAULT_PRIMARY_CONDITIONS = 10
+DEFAULT_CO_CONDITIONS = 5
+# Pairs seen in fewer patients than this are too noisy to rank by lift
+DEFAULT_MIN_PATIENTS = 5
+
+def incidence_matrix(patients):
+    """(CSR patients x conditions 0/1 matrix, column codes, code -> description)"""
+    columns = {}
+    descriptions = {}
+    rows = []
+    cols = []
+    n_patients = 0
+    for patient in patients:
+        codes = set()
+        for condition in patient.get("conditions", []):
+            code = condition.get("code")
+            if code:
+                codes.add(code)
+                descriptions.setdefault(code, condition.get("description"))
+        for code in codes:
+            rows.append(n_patients)
+            cols.append(columns.setdefault(code, len(columns)))
+        n_patients += 1
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+        shape=(n_patients, len(columns))
+    )
+    return matrix, list(columns), descriptions
+
+def cooccurrence_matrix(incidence):
+    """Condition x condition patient counts; the diagonal is each condition's prevalence"""
+    return (incidence.T @ incidence).tocsr()
+
+def co_conditions(cooccurrence, prevalence, total_patients, primary, limit=DEFAULT_CO_CONDITIONS,
+                  min_patients=DEFAULT_MIN_PATIENTS):
+    """Column indices and scores of the highest-lift partners of column primary"""
+    row = cooccurrence.getrow(primary)
+    partners, counts = row.indices, row.data
+    keep = (partners != primary) & (counts >= min_patients)
+    partners, counts = partners[keep], counts[keep]
+    lift = counts * total_patients / (prevalence[primary] * prevalence[partners])
+    # Highest lift first, more shared patients breaking ties
+    order = np.lexsort((-counts, -lift))[:limit]
+    return [
+        {
+            "column": int(partners[i]),
+            "patients": int(counts[i]),
+            "support": round(float(counts[i] / total_patients), 4),
+            "confidence": round(float(counts[i] / prevalence[primary]), 4),
+            "lift": round(float(lift[i]), 2)
+        } for i in order
+    ]
+
+def comorbidity_patterns(incidence, codes, descriptions, primaries=DEFAULT_PRIMARY_CONDITIONS,
+                         limit=DEFAULT_CO_CONDITIONS, min_patients=DEFAULT_MIN_PATIENTS):
+    """Top co-conditions for each of the most prevalent conditions"""
+    total_patients = incidence.shape[0]
+    if not total_patients or not codes:
+        return []
+    cooccurrence = cooccurrence_matrix(incidence)
+    prevalence = cooccurrence.diagonal()
+    patterns = []
+    for primary in np.argsort(-prevalence, kind="stable")[:primaries]:
+        partners = co_conditions(cooccurrence, prevalence, total_patients, primary, limit, min_patients)
+        for partner in partners:
+            code = codes[partner.pop("column")]
+            partner["code"] = code
+            partner["name"] = descriptions.get(code)
+        patterns.append({
+            "code": codes[primary],
+            "primary": descriptions.get(codes[primary]),
+            "patient_count": int(prevalence[primary]),
+            "co_conditions": partners
+        })
+    return patterns
+
+def compute_comorbidity(collection, primaries=DEFAULT_PRIMARY_CONDITIONS, limit=DEFAULT_CO_CONDITIONS,
+                        min_patients=DEFAULT_MIN_PATIENTS):
+    """Comorbidity rollup document computed from patient_summaries"""
+    patients = collection.find({}, {"conditions.code": 1, "conditions.description": 1})
+    incidence, codes, descriptions = incidence_matrix(patients)
+    return {
+        "total_patients": incidence.shape[0],
+        "min_patients": min_patients,
+        "patterns": comorbidity_patterns(incidence, codes, descriptions, primaries, limit, min_patients)
+    }
@@ -0,0 +1,231 @@
+# In-process inverted index: condition code -> sorted patient ids.
+#
+# "How many patients have X", "who has X and Y but not Z" and top-condition
+# counts otherwise unwind conditions in MongoDB on every request. The index
+# keeps one posting list per SNOMED code: the MySQL patient ids that have the
+# condition, sorted and packed in an array('I') (4 bytes per patient, no
+# per-element objects). Cohort questions are then set algebra on those lists:
+#
+#   intersection  walk the shortest list, binary-search each id in the others
+#   union         merge into one sorted list
+#   difference    drop ids found (by binary search) in the excluded lists
+#
+# The index loads from patient_summaries (metadata.mysql_patient_id and the
+# conditions array) or straight from the MySQL conditions table, then
+# refresh() picks up patients the migrator has (re)written since the last
+# load by metadata.migration_timestamp, so only changed patients are re-read,
+# and drops patients whose ids are no longer in the collection.
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime
+from heapq import merge
+
+from common.condition_search import condition_tokens
+
+PATIENT_ID_FIELD = "metadata.mysql_patient_id"
+MIGRATED_AT_FIELD = "metadata.migration_timestamp"
+INDEX_PROJECTION = {PATIENT_ID_FIELD: 1, MIGRATED_AT_FIELD: 1, "conditions.code": 1, "conditions.description": 1}
+LOAD_BATCH_SIZE = 1000
+DEFAULT_REFRESH_SECONDS = 60
+
+MYSQL_CONDITIONS_QUERY = """
+    SELECT DISTINCT patient_id, code, description
+    FROM conditions
+    ORDER BY code, patient_id
+"""
+
+def contains(postings, patient_id):
+    i = bisect_left(postings, patient_id)
+    return i < len(postings) and postings[i] == patient_id
+
+def intersect_postings(lists):
+    """Ids present in every list, as a sorted array"""
+    if not lists:
+        return array("I")
+    shortest, *others = sorted(lists, key=len)
+    return array("I", (pid for pid in shortest if all(contains(other, pid) for other in others)))
+
+def union_postings(lists):
+    """Ids present in any list, as a sorted array"""
+    result = array("I")
+    last = None
+    for pid in merge(*lists):
+        if pid != last:
+            result.append(pid)
+            last = pid
+    return result
+
+def subtract_postings(postings, excluded):
+    """Ids of postings that appear in none of the excluded lists"""
+    if not excluded:
+        return postings
+    return array("I", (pid for pid in postings if not any(contains(other, pid) for other in excluded)))
+
+class ConditionIndex:
+    """Condition code -> sorted patient-id posting lists, with cohort queries"""
+
+    def __init__(self):
+        self.postings = {}
+        self.descriptions = {}
+        # Reverse map so a re-migrated patient can be removed from old postings
+        self.patient_codes = {}
+        self.loaded_through = None
+        self.refreshed_at = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.patient_codes)
+
+    def _replace(self, codes_by_patient, descriptions):
+        """Swap in freshly built postings from {patient_id: set(codes)}"""
+        postings = {}
+        for patient_id, codes in codes_by_patient.items():
+            for code in codes:
+                postings.setdefault(code, []).append(patient_id)
+        with self.lock:
+            self.postings = {code: array("I", sorted(ids)) for code, ids in postings.items()}
+            self.descriptions = descriptions
+            self.patient_codes = {pid: frozenset(codes) for pid, codes in codes_by_patient.items()}
+
+    def load_from_collection(self, collection):
+        """Build the whole index from patient_summaries"""
+        codes_by_patient = {}
+        descriptions = {}
+        newest = None
+        for patient in collection.find({}, INDEX_PROJECTION, batch_size=LOAD_BATCH_SIZE):
+            patient_id, codes, migrated_at = self._read_patient(patient, descriptions)
+            if patient_id is None:
+                continue
+            codes_by_patient[patient_id] = codes
+            if migrated_at and (newest is None or migrated_at > newest):
+                newest = migrated_at
+        self._replace(codes_by_patient, descriptions)
+        self.loaded_through = newest
+        return len(codes_by_patient)
+
+    def load_from_mysql(self, mysql_cursor):
+        """Build the whole index from the MySQL conditions table"""
+        codes_by_patient = {}
+        descriptions = {}
+        mysql_cursor.execute(MYSQL_CONDITIONS_QUERY)
+        for patient_id, code, description in mysql_cursor:
+            codes_by_patient.setdefault(patient_id, set()).add(code)
+            descriptions.setdefault(code, description)
+        self._replace(codes_by_patient, descriptions)
+        # Later refresh() calls re-read everything the migrator writes from now on
+        self.loaded_through = datetime.now()
+        return len(codes_by_patient)
+
+    def refresh(self, collection):
+        """Re-index patients migrated since the last load and drop deleted ones; returns how many changed"""
+        if self.loaded_through is None:
+            return self.load_from_collection(collection)
+        # $gte, not $gt: the migrator stamps a whole page at once but writes it
+        # in several flushes, so more patients with the newest stamp may follow
+        query = {MIGRATED_AT_FIELD: {"$gte": self.loaded_through}}
+        changed = 0
+        for patient in collection.find(query, INDEX_PROJECTION, batch_size=LOAD_BATCH_SIZE):
+            with self.lock:
+                patient_id, codes, migrated_at = self._read_patient(patient, self.descriptions)
+                if patient_id is not None and codes != self.patient_codes.get(patient_id):
+                    self._update_patient(patient_id, codes)
+                    changed += 1
+                if migrated_at and migrated_at > self.loaded_through:
+                    self.loaded_through = migrated_at
+        return changed + self.drop_deleted(collection)
+
+    def drop_deleted(self, collection):
+        """Remove indexed patients missing from the collection; returns how many were removed
+
+        Compares the full id sets (an id-only read of the collection), since
+        a full migration can swap in a collection that drops some patients
+        and adds others.
+        """
+        present = {
+            patient.get("metadata", {}).get("mysql_patient_id")
+            for patient in collection.find({}, {PATIENT_ID_FIELD: 1, "_id": 0}, batch_size=LOAD_BATCH_SIZE)
+        }
+        with self.lock:
+            deleted = [patient_id for patient_id in self.patient_codes if patient_id not in present]
+            for patient_id in deleted:
+                self._update_patient(patient_id, frozenset())
+                del self.patient_codes[patient_id]
+        return len(deleted)
+
+    def refresh_if_stale(self, collection, max_age=DEFAULT_REFRESH_SECONDS):
+        """refresh() at most once per max_age seconds, for use on the request path"""
+        now = time.monotonic()
+        if self.refreshed_at is not None and now - self.refreshed_at < max_age:
+            return 0
+        self.refreshed_at = now
+        return self.refresh(collection)
+
+    @staticmethod
+    def _read_patient(patient, descriptions):
+        codes = set()
+        for condition in patient.get("conditions", []):
+            code = condition.get("code")
+            if code:
+                codes.add(code)
+                descriptions.setdefault(code, condition.get("description"))
+        metadata = patient.get("metadata", {})
+        return metadata.get("mysql_patient_id"), codes, metadata.get("migration_timestamp")
+
+    def _update_patient(self, patient_id, codes):
+        old_codes = self.patient_codes.get(patient_id, frozenset())
+        for code in old_codes - codes:
+            postings = self.postings[code]
+            del postings[bisect_left(postings, patient_id)]
+            if not postings:
+                del self.postings[code]
+        for code in codes - old_codes:
+            insort(self.postings.setdefault(code, array("I")), patient_id)
+        self.patient_codes[patient_id] = frozenset(codes)
+
+    def patients_with(self, code):
+        return self.postings.get(code, array("I"))
+
+    def count(self, code):
+        return len(self.postings.get(code, ()))
+
+    def cohort(self, all_of=(), any_of=(), none_of=()):
+        """Patient ids having every all_of code, at least one any_of code and no none_of code"""
+        with self.lock:
+            candidates = []
+            if all_of:
+                candidates.append(intersect_postings([self.patients_with(code) for code in all_of]))
+            if any_of:
+                candidates.append(union_postings([self.patients_with(code) for code in any_of]))
+            if not candidates:
+                candidates.append(array("I", sorted(self.patient_codes)))
+            result = intersect_postings(candidates)
+            return subtract_postings(result, [self.patients_with(code) for code in none_of])
+
+    def codes_matching(self, text):
+        """Codes whose description contains every word of text (last word as a prefix)"""
+        *words, prefix = condition_tokens(text) or [""]
+        matches = []
+        for code, description in self.descriptions.items():
+            tokens = condition_tokens(description)
+            if all(word in tokens for word in words) and any(token.startswith(prefix) for token in tokens):
+                matches.append(code)
+        return matches
+
+    def top_conditions(self, limit=10):
+        """(code, description, patient count) for the most common conditions"""
+        with self.lock:
+            ranked = sorted(self.postings.items(), key=lambda item: len(item[1]), reverse=True)[:limit]
+            return [(code, self.descriptions.get(code), len(postings)) for code, postings in ranked]
+
+if __name__ == "__main__":
+    from common.connections import get_mongo_db
+
+    index = ConditionIndex()
+    start_time = time.perf_counter()
+    patients = index.load_from_collection(get_mongo_db()["patient_summaries"])
+    print(f"✅ Indexed {len(index.postings)} conditions over {patients} patients "
+          f"in {time.perf_counter() - start_time:.2f}s")
+    for code, description, count in index.top_conditions(5):
+        print(f"   {code} {description}: {count} patients")
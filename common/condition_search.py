@@ -0,0 +1,89 @@
+# Indexed condition search over patient_summaries.
+#
+# Searching with {"conditions.description": {"$regex": text, "$options": "i"}}
+# cannot use an index: every description of every patient is scanned, and
+# api_search did that twice (count, then sample). Instead the migrator stores
+# each condition's description as normalized lowercase tokens,
+#
+#   conditions: [{"description": "Chronic congestive heart failure (disorder)",
+#                 "tokens": ["chronic", "congestive", "heart", "failure", "disorder"], ...}]
+#
+# with a multikey index on conditions.tokens. A search matches conditions that
+# contain every word of the query, the last word as a prefix so partial input
+# works ("congestive heart fail"). Prefix matches use an anchored,
+# case-sensitive regex, which MongoDB turns into an index range scan. Count
+# and sample come back from one aggregation through $facet.
+#
+# Documents migrated before tokens existed can be updated in place from the
+# repository root with:  python -m common.condition_search
+import re
+
+from pymongo import UpdateOne
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+TOKENS_FIELD = "conditions.tokens"
+DEFAULT_SAMPLE_SIZE = 5
+BACKFILL_BATCH_SIZE = 500
+
+def condition_tokens(text):
+    """Unique lowercase alphanumeric words of text, in order"""
+    return list(dict.fromkeys(TOKEN_PATTERN.findall(text.lower()))) if text else []
+
+def condition_search_filter(text):
+    """Query filter for patients with a condition matching every word of text
+
+    Whole words must match a token exactly and the last word is a prefix.
+    An empty query matches every patient.
+    """
+    tokens = condition_tokens(text)
+    if not tokens:
+        return {}
+    *words, prefix = tokens
+    prefix_match = {"tokens": {"$regex": f"^{re.escape(prefix)}"}}
+    if not words:
+        return {"conditions": {"$elemMatch": prefix_match}}
+    return {"conditions": {"$elemMatch": {"$and": [{"tokens": {"$all": words}}, prefix_match]}}}
+
+def count_patients_with_condition(collection, text):
+    return collection.count_documents(condition_search_filter(text))
+
+def search_conditions(collection, text, projection, sample_size=DEFAULT_SAMPLE_SIZE):
+    """(matching patient count, first sample_size matches) in one aggregation"""
+    pipeline = [
+        {"$match": condition_search_filter(text)},
+        {"$project": projection},
+        {"$facet": {
+            "count": [{"$count": "patients"}],
+            "sample": [{"$limit": sample_size}]
+        }}
+    ]
+    result = next(collection.aggregate(pipeline), {"count": [], "sample": []})
+    count = result["count"][0]["patients"] if result["count"] else 0
+    return count, result["sample"]
+
+def backfill_condition_tokens(collection, batch_size=BACKFILL_BATCH_SIZE):
+    """Add tokens to every condition that lacks them; returns the number of patients updated"""
+    updated = 0
+    batch = []
+    query = {"conditions": {"$elemMatch": {"tokens": {"$exists": False}}}}
+    for patient in collection.find(query, {"conditions.description": 1}, batch_size=batch_size):
+        changes = {
+            f"conditions.{i}.tokens": condition_tokens(condition.get("description"))
+            for i, condition in enumerate(patient.get("conditions", []))
+        }
+        batch.append(UpdateOne({"_id": patient["_id"]}, {"$set": changes}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+if __name__ == "__main__":
+    from common.connections import get_mongo_db, get_redis
+    from common.response_cache import invalidate_dashboard_cache
+
+    updated = backfill_condition_tokens(get_mongo_db()["patient_summaries"])
+    invalidate_dashboard_cache(get_redis())
+    print(f"✅ Condition tokens added to {updated} patients")
+    print("   Create the conditions.tokens index with: python NoSQL/mongodb/mongodb_indexes.py")
@@ -0,0 +1,88 @@
+# ETag / conditional GET support for the dashboard JSON APIs.
+#
+# The dashboard JavaScript polls every /api/* endpoint. Responses only change
+# when the data behind them does, which Redis already records: the migrator
+# bumps dashboard:cache_generation, the Redis dashboard loaders publish a new
+# dashboard:current_version, live updates stamp that version's last_updated,
+# and applied encounter events bump live:aggregates:applied. Apps can add a
+# stamp of the MongoDB data they serve (e.g. when the rollups were generated),
+# and the current max_age time bucket is mixed in as a backstop, so a writer
+# that forgets to bump the generation only causes stale 304s until it rolls.
+# The ETag is a hash of those stamps plus the request path and query string,
+# so it is known before the view runs. A matching If-None-Match is answered
+# with an empty 304 without touching MongoDB or serializing anything. Larger
+# bodies that do get sent are gzipped when the client accepts it.
+import gzip
+import hashlib
+import time
+
+from flask import request
+
+from common.dashboard_snapshot import CURRENT_VERSION_KEY, versioned_key
+from common.live_aggregates import APPLIED_COUNTER_KEY
+from common.response_cache import CACHE_GENERATION_KEY
+
+DEFAULT_GZIP_MIN_BYTES = 1024
+DEFAULT_ETAG_MAX_AGE = 300
+
+def data_version_stamp(redis_client, mongo_stamp=None, max_age=DEFAULT_ETAG_MAX_AGE):
+    """Current data version as one string, or None while Redis or MongoDB is unreachable"""
+    try:
+        generation, version, applied = redis_client.mget(CACHE_GENERATION_KEY, CURRENT_VERSION_KEY, APPLIED_COUNTER_KEY)
+        last_updated = redis_client.get(versioned_key(version, "last_updated")) if version else None
+        mongo_version = mongo_stamp() if mongo_stamp is not None else None
+    except Exception:
+        return None
+    bucket = int(time.time() // max_age)
+    return f"{generation}|{version}|{last_updated}|{applied}|{mongo_version}|{bucket}"
+
+def compute_etag(stamp, path, query_string):
+    digest = hashlib.sha1(f"{stamp}|{path}?{query_string}".encode()).hexdigest()
+    return digest[:20]
+
+def install_conditional_get(app, redis_client, prefix="/api/", exempt=(), gzip_min_bytes=DEFAULT_GZIP_MIN_BYTES,
+                            mongo_stamp=None, max_age=DEFAULT_ETAG_MAX_AGE):
+    """Add ETag/304 handling and gzip to every GET under prefix except exempt paths
+
+    mongo_stamp, if given, is called per request and must return a value that
+    changes whenever the MongoDB data behind the views does. ETags also change
+    at least every max_age seconds.
+    """
+
+    def etag_for_request():
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if not request.path.startswith(prefix) or request.path in exempt:
+            return None
+        stamp = data_version_stamp(redis_client, mongo_stamp, max_age)
+        if stamp is None:
+            return None
+        return compute_etag(stamp, request.path, request.query_string.decode())
+
+    @app.before_request
+    def answer_not_modified():
+        etag = etag_for_request()
+        request.environ["dashboard.etag"] = etag
+        # Weak comparison: the same data is the same entity gzipped or not
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+    @app.after_request
+    def add_etag_and_gzip(response):
+        etag = request.environ.get("dashboard.etag")
+        if etag is None or response.status_code != 200:
+            return response
+        response.set_etag(etag, weak=True)
+        # Clients may keep the body but must revalidate it on every poll
+        response.headers["Cache-Control"] = "no-cache"
+
+        response.vary.add("Accept-Encoding")
+        if ("gzip" in request.accept_encodings and not response.direct_passthrough
+                and "Content-Encoding" not in response.headers):
+            body = response.get_data()
+            if len(body) >= gzip_min_bytes:
+                response.set_data(gzip.compress(body))
+                response.headers["Content-Encoding"] = "gzip"
+        return response
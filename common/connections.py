@@ -0,0 +1,117 @@
+# One place to configure and create database clients.
+#
+# Every script and dashboard gets its MongoDB, Redis and MySQL connections
+# from here instead of constructing its own with hard-coded localhost URLs.
+# Settings come from environment variables (defaults match a local install):
+#
+#   HOSPITAL_MONGO_URI                 mongodb://localhost:27017/
+#   HOSPITAL_MONGO_DB                  hospital_platform
+#   HOSPITAL_MONGO_MAX_POOL_SIZE       50
+#   HOSPITAL_MONGO_MIN_POOL_SIZE       0
+#   HOSPITAL_MONGO_TIMEOUT_MS          5000   (server selection and connect)
+#   HOSPITAL_REDIS_URL                 redis://localhost:6379/0
+#   HOSPITAL_REDIS_MAX_CONNECTIONS     50
+#   HOSPITAL_REDIS_TIMEOUT_S           5      (socket and connect)
+#   HOSPITAL_MYSQL_HOST / _PORT / _USER / _PASSWORD / _DATABASE
+#   HOSPITAL_MYSQL_TIMEOUT_S           10
+#
+# MongoClient and the Redis connection pool are thread-safe and meant to be
+# long-lived, so get_mongo_client() and get_redis() hand out one shared
+# instance per process (per set of overrides). Clients are never shared
+# across a fork: a child process gets its own on first use.
+import os
+import threading
+
+import pymongo
+import redis
+
+MONGO_URI = os.environ.get("HOSPITAL_MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.environ.get("HOSPITAL_MONGO_DB", "hospital_platform")
+MONGO_MAX_POOL_SIZE = int(os.environ.get("HOSPITAL_MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("HOSPITAL_MONGO_MIN_POOL_SIZE", 0))
+MONGO_TIMEOUT_MS = int(os.environ.get("HOSPITAL_MONGO_TIMEOUT_MS", 5000))
+
+REDIS_URL = os.environ.get("HOSPITAL_REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.environ.get("HOSPITAL_REDIS_MAX_CONNECTIONS", 50))
+REDIS_TIMEOUT_S = float(os.environ.get("HOSPITAL_REDIS_TIMEOUT_S", 5))
+
+MYSQL_CONFIG = {
+    'host': os.environ.get("HOSPITAL_MYSQL_HOST", "localhost"),
+    'port': int(os.environ.get("HOSPITAL_MYSQL_PORT", 3306)),
+    'user': os.environ.get("HOSPITAL_MYSQL_USER", "root"),
+    'password': os.environ.get("HOSPITAL_MYSQL_PASSWORD", ""),
+    'database': os.environ.get("HOSPITAL_MYSQL_DATABASE", "hospital_operations"),
+    'charset': 'utf8mb4',
+    'connect_timeout': int(os.environ.get("HOSPITAL_MYSQL_TIMEOUT_S", 10))
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _shared(kind, options, factory):
+    """The process-wide client for (kind, options), created on first use"""
+    key = (os.getpid(), kind, tuple(sorted(options.items())))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = factory()
+        return client
+
+def mongo_options(**overrides):
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_TIMEOUT_MS,
+    }
+    options.update(overrides)
+    return options
+
+def redis_options(decode_responses=True, **overrides):
+    options = {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "socket_timeout": REDIS_TIMEOUT_S,
+        "socket_connect_timeout": REDIS_TIMEOUT_S,
+        "decode_responses": decode_responses,
+    }
+    options.update(overrides)
+    return options
+
+def get_mongo_client(**overrides):
+    """Shared pymongo.MongoClient; keyword overrides (e.g. serverSelectionTimeoutMS) get their own client"""
+    options = mongo_options(**overrides)
+    return _shared("mongo", options, lambda: pymongo.MongoClient(MONGO_URI, **options))
+
+def get_mongo_db(name=MONGO_DB, **overrides):
+    return get_mongo_client(**overrides)[name]
+
+def get_redis(decode_responses=True, **overrides):
+    """Shared redis.Redis backed by one connection pool per process"""
+    options = redis_options(decode_responses, **overrides)
+    return _shared("redis", options, lambda: redis.Redis.from_url(REDIS_URL, **options))
+
+def get_async_mongo_client(**overrides):
+    """New Motor client; create it once per event loop (e.g. in a startup hook)"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(MONGO_URI, **mongo_options(**overrides))
+
+def get_async_redis(decode_responses=True, **overrides):
+    """New redis.asyncio client; create it once per event loop"""
+    import redis.asyncio as aioredis
+
+    return aioredis.Redis.from_url(REDIS_URL, **redis_options(decode_responses, **overrides))
+
+def mysql_connect(**overrides):
+    """New MySQL connection using MYSQL_CONFIG plus any overrides"""
+    import mysql.connector
+
+    return mysql.connector.connect(**dict(MYSQL_CONFIG, **overrides))
+
+def close_clients():
+    """Close every shared client this process opened (call once, at exit)"""
+    pid = os.getpid()
+    with _clients_lock:
+        for key in [key for key in _clients if key[0] == pid]:
+            client = _clients.pop(key)
+            client.close()
@@ -0,0 +1,60 @@
+# Patient cost distribution, computed in one aggregation.
+#
+# The brackets used to be counted with one count_documents() scan each plus a
+# total count. Here a single $facet runs a $bucket over total_expenses next to
+# a $count, so every caller gets all brackets and the total from one pass.
+
+COST_FIELD = "$clinical_summary.healthcare_metrics.total_expenses"
+
+DEFAULT_COST_BRACKETS = [
+    {"key": "low", "name": "Low", "range": "Under $10K", "min": 0, "max": 10000},
+    {"key": "medium", "name": "Medium", "range": "$10K-$50K", "min": 10000, "max": 50000},
+    {"key": "high", "name": "High", "range": "$50K-$100K", "min": 50000, "max": 100000},
+    {"key": "very_high", "name": "Very High", "range": "$100K-$1M", "min": 100000, "max": 1000000},
+    {"key": "extreme", "name": "Extreme", "range": "Over $1M", "min": 1000000, "max": 5000000},
+]
+
+def bucket_boundaries(brackets):
+    """$bucket boundaries for contiguous brackets: every min plus the last max"""
+    for lower, upper in zip(brackets, brackets[1:]):
+        if lower["max"] != upper["min"]:
+            raise ValueError(f"Cost brackets must be contiguous: {lower['key']} ends at "
+                             f"{lower['max']} but {upper['key']} starts at {upper['min']}")
+    return [bracket["min"] for bracket in brackets] + [brackets[-1]["max"]]
+
+def cost_distribution_pipeline(brackets=DEFAULT_COST_BRACKETS):
+    return [
+        {"$facet": {
+            "buckets": [
+                {"$bucket": {
+                    "groupBy": COST_FIELD,
+                    "boundaries": bucket_boundaries(brackets),
+                    # Missing expenses and values outside the brackets land here
+                    "default": "other",
+                    "output": {"count": {"$sum": 1}}
+                }}
+            ],
+            "total": [{"$count": "count"}]
+        }}
+    ]
+
+def summarize_cost_distribution(result, brackets=DEFAULT_COST_BRACKETS):
+    """Turn the $facet output into bracket counts and percentages of all patients"""
+    facets = result[0] if result else {"buckets": [], "total": []}
+    total_patients = facets["total"][0]["count"] if facets["total"] else 0
+    counts = {bucket["_id"]: bucket["count"] for bucket in facets["buckets"]}
+
+    distribution = []
+    for bracket in brackets:
+        count = counts.get(bracket["min"], 0)
+        distribution.append(dict(
+            bracket,
+            count=count,
+            percentage=round((count / total_patients) * 100, 1) if total_patients else 0
+        ))
+    return {"total_patients": total_patients, "brackets": distribution}
+
+def get_cost_distribution(collection, brackets=DEFAULT_COST_BRACKETS):
+    """All cost brackets plus the patient total from a single aggregation"""
+    result = list(collection.aggregate(cost_distribution_pipeline(brackets)))
+    return summarize_cost_distribution(result, brackets)
@@ -0,0 +1,121 @@
+# Atomic, constant-round-trip population of the Redis dashboard keys.
+#
+# The loaders used to issue one SET/HSET/ZADD per counter, department,
+# condition and cost bracket, then read every key back to print it. Here the
+# whole snapshot goes out as a single MULTI/EXEC pipeline with multi-field
+# HSET and ZADD, so readers never see a half-written dashboard and the write
+# costs one round trip however many departments or conditions there are.
+#
+# Snapshots are published into versioned namespaces (dashboard:v{n}:*). A
+# new version is written in full next to the live one, then the
+# dashboard:current_version pointer is flipped with a single SET and the old
+# namespace is left to EXPIRE after a short grace period. A reader resolves the
+# pointer and reads the keys in separate round trips, so one that saw the old
+# version just before the flip still finds all of its keys. A refresh never
+# blocks Redis or shows readers an empty dashboard, and other keys in the
+# database are left alone. Readers resolve names through the pointer with
+# dashboard_keys().
+
+from common.response_cache import invalidate_dashboard_cache
+
+def write_dashboard_snapshot(redis_client, strings, hashes=None, sorted_sets=None):
+    """Replace the given dashboard keys in one transaction
+
+    strings maps key -> value, hashes maps key -> {field: value} and
+    sorted_sets maps key -> {member: score}. Hash and sorted-set keys are
+    deleted first, so members missing from the new snapshot do not linger.
+    """
+    pipe = redis_client.pipeline(transaction=True)
+    for key, mapping in (hashes or {}).items():
+        pipe.delete(key)
+        if mapping:
+            pipe.hset(key, mapping=mapping)
+    for key, scores in (sorted_sets or {}).items():
+        pipe.delete(key)
+        if scores:
+            pipe.zadd(key, scores)
+    if strings:
+        pipe.mset(strings)
+    return pipe.execute()
+
+CURRENT_VERSION_KEY = "dashboard:current_version"
+VERSION_COUNTER_KEY = "dashboard:version_counter"
+# How long a replaced version stays readable after the pointer moves on
+RETIRED_VERSION_TTL_SECONDS = 60
+
+def versioned_key(version, name):
+    return f"dashboard:v{int(version)}:{name}"
+
+def current_version(redis_client):
+    """Version readers should use, or None before the first snapshot is published"""
+    version = redis_client.get(CURRENT_VERSION_KEY)
+    return int(version) if version is not None else None
+
+def dashboard_keys(redis_client, *names):
+    """Keys of the live snapshot for each name, or None before the first publish"""
+    version = current_version(redis_client)
+    if version is None:
+        return None
+    return [versioned_key(version, name) for name in names]
+
+def retire_version(redis_client, version, ttl=RETIRED_VERSION_TTL_SECONDS, scan_count=500):
+    """Let a replaced version's keys expire once readers that resolved it are done"""
+    keys = list(redis_client.scan_iter(match=versioned_key(version, "*"), count=scan_count))
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.expire(key, ttl)
+    pipe.execute()
+    return len(keys)
+
+def publish_dashboard_snapshot(redis_client, strings, hashes=None, sorted_sets=None):
+    """Write a snapshot under a new version, flip the pointer to it, then retire the old one
+
+    Takes the same arguments as write_dashboard_snapshot() but with bare names
+    ("total_patients") instead of keys. Returns the new version number.
+    """
+    version = redis_client.incr(VERSION_COUNTER_KEY)
+
+    def namespaced(mapping):
+        return {versioned_key(version, name): value for name, value in (mapping or {}).items()}
+
+    write_dashboard_snapshot(redis_client, namespaced(strings), namespaced(hashes), namespaced(sorted_sets))
+    previous = redis_client.set(CURRENT_VERSION_KEY, version, get=True)
+    # Cached dashboard responses were rendered from the old version
+    invalidate_dashboard_cache(redis_client)
+    if previous is not None and int(previous) != version:
+        retire_version(redis_client, previous)
+    return version
+
+def _resolve_reads(version, strings, hashes):
+    names = [*strings, *hashes]
+    empty = {**{name: None for name in strings}, **{name: {} for name in hashes}}
+    if version is None:
+        return names, None, empty
+    return names, [versioned_key(int(version), name) for name in names], empty
+
+def read_live_dashboard(redis_client, strings=(), hashes=()):
+    """Values of the live snapshot by name: one pointer lookup plus one pipelined read
+
+    Before the first publish, strings read as None and hashes as {}.
+    """
+    names, keys, empty = _resolve_reads(redis_client.get(CURRENT_VERSION_KEY), strings, hashes)
+    if keys is None:
+        return empty
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys[:len(strings)]:
+        pipe.get(key)
+    for key in keys[len(strings):]:
+        pipe.hgetall(key)
+    return dict(zip(names, pipe.execute()))
+
+async def read_live_dashboard_async(redis_client, strings=(), hashes=()):
+    """read_live_dashboard() for a redis.asyncio client"""
+    names, keys, empty = _resolve_reads(await redis_client.get(CURRENT_VERSION_KEY), strings, hashes)
+    if keys is None:
+        return empty
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys[:len(strings)]:
+        pipe.get(key)
+    for key in keys[len(strings):]:
+        pipe.hgetall(key)
+    return dict(zip(names, await pipe.execute()))
@@ -0,0 +1,324 @@
+# Encounter event ingestion and live, time-bucketed counters.
+#
+# Encounter events (organization, patient, class, timestamp) are published to
+# a Redis Stream and applied by a consumer group, so the web process only does
+# an XADD and any number of consumers can share the work. For development
+# without a consumer process, HOSPITAL_EVENT_BUS=local swaps in an in-process
+# queue drained by a background thread.
+#
+# Applying an event is one pipelined HINCRBY per counter on a hash per day:
+#
+#   live:encounters:{YYYYMMDD}   h{HH}:{organization}   encounters in that hour
+#                                h{HH}:*                all organizations
+#                                day:{organization}     encounters that day
+#                                day:*
+#
+# Day hashes expire after BUCKET_TTL_SECONDS, so old buckets clean themselves
+# up. Reads are a fixed number of HMGETs whatever the traffic volume. The
+# sliding window weights the oldest hour bucket by how much of it is still
+# inside the window. The same round trip also feeds the condition leaderboard
+# and per-department unique patients (see common/live_aggregates.py).
+#
+# Entries a consumer read but could not apply (or never acknowledged because
+# it crashed) stay in the group's pending list. Consumers XAUTOCLAIM entries
+# idle for RECLAIM_IDLE_MS at startup and every RECLAIM_INTERVAL_SECONDS and
+# apply them again; an entry still failing after MAX_DELIVERIES attempts is
+# moved to the encounters:events:dead stream so it cannot block the group.
+#
+# Run a consumer from the repository root with:  python -m common.encounter_events
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from common.live_aggregates import add_event_aggregates
+
+STREAM_KEY = "encounters:events"
+CONSUMER_GROUP = "live-counters"
+STREAM_MAXLEN = 100000
+DEAD_LETTER_STREAM = "encounters:events:dead"
+RECLAIM_IDLE_MS = 60000
+RECLAIM_INTERVAL_SECONDS = 60
+MAX_DELIVERIES = 5
+BUCKET_PREFIX = "live:encounters:"
+BUCKET_TTL_SECONDS = 3 * 24 * 3600
+ALL_ORGANIZATIONS = "*"
+DEFAULT_WINDOW_HOURS = 1
+# Windows cannot reach back past the buckets that have already expired
+MAX_WINDOW_HOURS = BUCKET_TTL_SECONDS // 3600
+
+def bucket_key(moment):
+    return f"{BUCKET_PREFIX}{moment.strftime('%Y%m%d')}"
+
+def hour_field(moment, organization):
+    return f"h{moment.hour:02d}:{organization}"
+
+def day_field(organization):
+    return f"day:{organization}"
+
+def parse_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value) if value else datetime.now()
+
+def patient_key(patient_id):
+    """Patients are identified by their MySQL patient_id (metadata.mysql_patient_id) in every live structure"""
+    if patient_id is None or patient_id == "":
+        return ""
+    if isinstance(patient_id, bool) or not str(patient_id).strip().isdigit():
+        raise ValueError(f"patient_id must be a MySQL patient id, got {patient_id!r}")
+    return str(int(patient_id))
+
+def make_event(organization, patient_id=None, encounter_class=None, timestamp=None, conditions=None):
+    if not organization:
+        raise ValueError("Encounter events need an organization")
+    if isinstance(conditions, str):
+        conditions = [conditions]
+    return {
+        "organization": organization,
+        "patient_id": patient_key(patient_id),
+        "class": encounter_class or "",
+        "timestamp": parse_timestamp(timestamp).isoformat(),
+        # Diagnoses newly recorded at this encounter, not the patient's ongoing
+        # conditions (see common/live_aggregates.py). Stream fields are flat
+        # strings, so they travel as JSON
+        "conditions": json.dumps(list(dict.fromkeys(conditions or [])))
+    }
+
+def record_encounters(redis_client, events):
+    """Apply events to the counters and live aggregates in one pipelined round trip"""
+    pipe = redis_client.pipeline(transaction=False)
+    touched = set()
+    for event in events:
+        moment = parse_timestamp(event["timestamp"])
+        key = bucket_key(moment)
+        for organization in (event["organization"], ALL_ORGANIZATIONS):
+            pipe.hincrby(key, hour_field(moment, organization), 1)
+            pipe.hincrby(key, day_field(organization), 1)
+        touched.add(key)
+    for key in touched:
+        pipe.expire(key, BUCKET_TTL_SECONDS)
+    add_event_aggregates(pipe, events)
+    pipe.execute()
+    return len(events)
+
+class StreamEventBus:
+    """Events go to a Redis Stream and are applied by consumer-group members"""
+
+    def __init__(self, redis_client, stream=STREAM_KEY, group=CONSUMER_GROUP):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.group_ready = False
+
+    def publish(self, events):
+        pipe = self.redis.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(self.stream, event, maxlen=STREAM_MAXLEN, approximate=True)
+        return len(pipe.execute())
+
+    def ensure_group(self):
+        if self.group_ready:
+            return
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self.group_ready = True
+
+    def consume(self, count=500, block_ms=None):
+        """Read up to count new events for this consumer, apply and acknowledge them"""
+        self.ensure_group()
+        response = self.redis.xreadgroup(self.group, self.consumer, {self.stream: ">"}, count=count, block=block_ms)
+        if not response:
+            return 0
+        entries = response[0][1]
+        self.apply(entries)
+        return len(entries)
+
+    def apply(self, entries):
+        """Apply and acknowledge entries; returns the ones that failed, which stay pending"""
+        try:
+            record_encounters(self.redis, [fields for _, fields in entries])
+            failed = []
+        except Exception:
+            # One malformed event should not hold back the rest of the batch
+            failed = []
+            for entry_id, fields in entries:
+                try:
+                    record_encounters(self.redis, [fields])
+                except Exception as e:
+                    print(f"❌ Could not apply encounter event {entry_id}: {e}")
+                    failed.append((entry_id, fields))
+        failed_ids = {entry_id for entry_id, _ in failed}
+        applied = [entry_id for entry_id, _ in entries if entry_id not in failed_ids]
+        if applied:
+            self.redis.xack(self.stream, self.group, *applied)
+        return failed
+
+    def reclaim(self, min_idle_ms=RECLAIM_IDLE_MS, count=500):
+        """Claim and apply entries left pending by failed or crashed consumers; returns how many"""
+        self.ensure_group()
+        reclaimed = 0
+        start = "0-0"
+        while True:
+            start, entries, *_ = self.redis.xautoclaim(
+                self.stream, self.group, self.consumer, min_idle_ms, start, count=count
+            )
+            # Entries trimmed from the stream since they were read come back without fields
+            trimmed = [entry_id for entry_id, fields in entries if not fields]
+            if trimmed:
+                self.redis.xack(self.stream, self.group, *trimmed)
+            entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+            if entries:
+                reclaimed += len(entries)
+                for entry in self.apply(entries):
+                    self.dead_letter_if_exhausted(entry)
+            if start in ("0-0", b"0-0"):
+                return reclaimed
+
+    def dead_letter_if_exhausted(self, entry):
+        """Move an entry that has failed MAX_DELIVERIES times to the dead-letter stream"""
+        entry_id, fields = entry
+        pending = self.redis.xpending_range(self.stream, self.group, min=entry_id, max=entry_id, count=1)
+        if pending and pending[0]["times_delivered"] >= MAX_DELIVERIES:
+            self.redis.xadd(DEAD_LETTER_STREAM, fields, maxlen=STREAM_MAXLEN, approximate=True)
+            self.redis.xack(self.stream, self.group, entry_id)
+            print(f"⚠️ Encounter event {entry_id} moved to {DEAD_LETTER_STREAM} after {MAX_DELIVERIES} attempts")
+
+    def drain(self):
+        """Apply everything published so far (for scripts that publish and then read)"""
+        total = 0
+        while True:
+            applied = self.consume()
+            total += applied
+            if not applied:
+                return total
+
+    def run_forever(self, block_ms=5000, reclaim_interval=RECLAIM_INTERVAL_SECONDS):
+        last_reclaim = None
+        while True:
+            if last_reclaim is None or time.monotonic() - last_reclaim >= reclaim_interval:
+                self.reclaim()
+                last_reclaim = time.monotonic()
+            self.consume(block_ms=block_ms)
+
+class LocalEventBus:
+    """In-process stand-in: events are applied by a background thread, no consumer needed"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.queue = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def _worker(self):
+        while True:
+            events = self.queue.get()
+            try:
+                record_encounters(self.redis, events)
+            except Exception as e:
+                print(f"❌ Error applying {len(events)} encounter events: {e}")
+            finally:
+                self.queue.task_done()
+
+    def publish(self, events):
+        events = list(events)
+        self.queue.put(events)
+        return len(events)
+
+    def drain(self):
+        self.queue.join()
+        return 0
+
+def get_event_bus(redis_client, kind=None):
+    kind = kind or os.environ.get("HOSPITAL_EVENT_BUS", "stream")
+    if kind == "local":
+        return LocalEventBus(redis_client)
+    return StreamEventBus(redis_client)
+
+def clamp_window_hours(window_hours):
+    return min(max(int(window_hours), 1), MAX_WINDOW_HOURS)
+
+def window_reads(now, departments, window_hours):
+    """(bucket key, fields, weights) to HMGET for the sliding window and today's totals"""
+    organizations = [ALL_ORGANIZATIONS, *departments]
+    elapsed = (now.minute * 60 + now.second) / 3600
+    reads = []
+    # The oldest bucket only partly overlaps the window ending now
+    for hours_back in range(window_hours + 1):
+        moment = now - timedelta(hours=hours_back)
+        weight = (1 - elapsed) if hours_back == window_hours else 1
+        reads.append((bucket_key(moment), [hour_field(moment, org) for org in organizations], weight))
+    reads.append((bucket_key(now), [day_field(org) for org in organizations], None))
+    return organizations, reads
+
+def summarize_window(organizations, reads, results, window_hours):
+    window = dict.fromkeys(organizations, 0.0)
+    today = dict.fromkeys(organizations, 0)
+    for (_, _, weight), values in zip(reads, results):
+        counts = [int(value or 0) for value in values]
+        for organization, count in zip(organizations, counts):
+            if weight is None:
+                today[organization] = count
+            else:
+                window[organization] += count * weight
+    return {
+        "window_hours": window_hours,
+        "today_encounters": today[ALL_ORGANIZATIONS],
+        "window_encounters": round(window[ALL_ORGANIZATIONS]),
+        "departments": {
+            organization: {
+                "today_encounters": today[organization],
+                "window_encounters": round(window[organization]),
+                "per_hour": round(window[organization] / window_hours, 1)
+            } for organization in organizations[1:]
+        }
+    }
+
+def read_live_counters(redis_client, departments=(), window_hours=DEFAULT_WINDOW_HOURS, now=None):
+    """Today's and sliding-window encounter counts, overall and per department"""
+    window_hours = clamp_window_hours(window_hours)
+    organizations, reads = window_reads(now or datetime.now(), list(departments), window_hours)
+    pipe = redis_client.pipeline(transaction=False)
+    for key, fields, _ in reads:
+        pipe.hmget(key, fields)
+    return summarize_window(organizations, reads, pipe.execute(), window_hours)
+
+async def read_live_counters_async(redis_client, departments=(), window_hours=DEFAULT_WINDOW_HOURS, now=None):
+    """read_live_counters() for a redis.asyncio client"""
+    window_hours = clamp_window_hours(window_hours)
+    organizations, reads = window_reads(now or datetime.now(), list(departments), window_hours)
+    pipe = redis_client.pipeline(transaction=False)
+    for key, fields, _ in reads:
+        pipe.hmget(key, fields)
+    return summarize_window(organizations, reads, await pipe.execute(), window_hours)
+
+async def publish_events_async(redis_client, events, stream=STREAM_KEY):
+    """StreamEventBus.publish() for a redis.asyncio client; a stream consumer applies the events"""
+    pipe = redis_client.pipeline(transaction=False)
+    for event in events:
+        pipe.xadd(stream, event, maxlen=STREAM_MAXLEN, approximate=True)
+    return len(await pipe.execute())
+
+def parse_event_payload(payload):
+    """Events from a POST body: one event object or a list of them"""
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    items = payload if isinstance(payload, list) else [payload]
+    return [
+        make_event(item.get("organization"), item.get("patient_id"), item.get("class"), item.get("timestamp"),
+                   item.get("conditions"))
+        for item in items
+    ]
+
+if __name__ == "__main__":
+    from common.connections import get_redis
+
+    bus = StreamEventBus(get_redis())
+    print(f"📥 Consuming {STREAM_KEY} as {bus.group}/{bus.consumer} (Ctrl+C to stop)")
+    bus.run_forever()
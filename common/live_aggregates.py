@@ -0,0 +1,154 @@
+# Condition leaderboard and unique patients per department, maintained in Redis.
+#
+# Both used to be recomputed from patient_summaries with $unwind pipelines,
+# and unique patients with an $addToSet array per department. Here they are
+# kept incrementally as encounter events are applied:
+#
+#   live:condition_counts                   sorted set   condition -> recorded diagnoses
+#   live:department_patients:{organization} HyperLogLog  MySQL patient ids seen
+#   live:aggregates:applied                 string       events applied so far
+#
+# Condition counts are recorded diagnoses (MySQL condition rows), the same
+# measure as the top_conditions rollup: the rebuild counts every condition
+# row on the patient documents once, and an event's "conditions" are the
+# diagnoses newly recorded at that encounter, each counted once per event.
+# Ongoing conditions must not be repeated on later events, or they would be
+# counted again here but not by the next rebuild.
+#
+# A HyperLogLog answers PFCOUNT in constant time from at most 12 KB per
+# department, with a standard error of about 0.8%, however many patients it
+# has seen. rebuild_live_aggregates() backfills everything from
+# patient_summaries in one streaming pass (the migrator runs it after each
+# load); events keep it current from then on.
+#
+# Rebuild by hand from the repository root with:  python -m common.live_aggregates
+import json
+from collections import Counter
+
+CONDITION_COUNTS_KEY = "live:condition_counts"
+DEPARTMENT_PATIENTS_PREFIX = "live:department_patients:"
+# Bumped once per applied batch so ETags of views reading these keys change
+APPLIED_COUNTER_KEY = "live:aggregates:applied"
+REBUILD_PREFIX = "live:rebuild:"
+REBUILD_BATCH_SIZE = 500
+
+def department_patients_key(organization):
+    return f"{DEPARTMENT_PATIENTS_PREFIX}{organization}"
+
+def event_conditions(event):
+    """Distinct diagnoses newly recorded by an event (a JSON list on the stream)"""
+    conditions = event.get("conditions") or []
+    if isinstance(conditions, (str, bytes)):
+        conditions = json.loads(conditions)
+    return list(dict.fromkeys(conditions))
+
+def add_event_aggregates(pipe, events):
+    """Queue the sorted-set and HyperLogLog updates for events on pipe"""
+    for event in events:
+        if event.get("patient_id"):
+            pipe.pfadd(department_patients_key(event["organization"]), event["patient_id"])
+        for condition in event_conditions(event):
+            pipe.zincrby(CONDITION_COUNTS_KEY, 1, condition)
+    pipe.incrby(APPLIED_COUNTER_KEY, len(events))
+
+def top_conditions(redis_client, limit=10, total_patients=None):
+    """Leaderboard from the sorted set, with percentages when total_patients is known"""
+    return [
+        {
+            "name": name,
+            "count": int(count),
+            "percentage": round((count / total_patients) * 100, 1) if total_patients else 0
+        } for name, count in redis_client.zrevrange(CONDITION_COUNTS_KEY, 0, limit - 1, withscores=True)
+    ]
+
+async def top_conditions_async(redis_client, limit=10, total_patients=None):
+    """top_conditions() for a redis.asyncio client"""
+    leaders = await redis_client.zrevrange(CONDITION_COUNTS_KEY, 0, limit - 1, withscores=True)
+    return [
+        {
+            "name": name,
+            "count": int(count),
+            "percentage": round((count / total_patients) * 100, 1) if total_patients else 0
+        } for name, count in leaders
+    ]
+
+def unique_patients(redis_client, departments):
+    """Approximate distinct patients per department; 0 where nothing has been recorded"""
+    pipe = redis_client.pipeline(transaction=False)
+    for organization in departments:
+        pipe.pfcount(department_patients_key(organization))
+    return dict(zip(departments, pipe.execute()))
+
+async def unique_patients_async(redis_client, departments):
+    """unique_patients() for a redis.asyncio client"""
+    pipe = redis_client.pipeline(transaction=False)
+    for organization in departments:
+        pipe.pfcount(department_patients_key(organization))
+    return dict(zip(departments, await pipe.execute()))
+
+def apply_unique_patients(departments, counts):
+    """Overlay live distinct-patient counts on department rollup entries"""
+    for dept in departments:
+        count = counts.get(dept['name'])
+        if count:
+            dept['unique_patients'] = count
+            dept['encounters_per_patient'] = dept['encounters'] / count
+    return departments
+
+def rebuild_live_aggregates(redis_client, collection, batch_size=REBUILD_BATCH_SIZE):
+    """Backfill the live structures from patient_summaries and swap them in atomically
+
+    Patients are streamed with a projection, so MongoDB does no $unwind or
+    $addToSet; condition counts are tallied here and MySQL patient ids (the
+    ids encounter events carry) are PFADDed to staging keys in pipelined
+    batches.
+    """
+    # Staging keys left by a rebuild that died before its swap would be merged into this one
+    leftovers = list(redis_client.scan_iter(match=REBUILD_PREFIX + "*", count=1000))
+    if leftovers:
+        redis_client.unlink(*leftovers)
+
+    condition_counts = Counter()
+    organizations = set()
+    pipe = redis_client.pipeline(transaction=False)
+    pending = 0
+    projection = {
+        "metadata.mysql_patient_id": 1, "conditions.description": 1, "encounters.providers.organization": 1
+    }
+    for patient in collection.find({}, projection, batch_size=batch_size):
+        patient_id = patient.get("metadata", {}).get("mysql_patient_id")
+        condition_counts.update(c["description"] for c in patient.get("conditions", []) if c.get("description"))
+        for organization in {e.get("providers", {}).get("organization") for e in patient.get("encounters", [])}:
+            if organization:
+                organizations.add(organization)
+                if patient_id is not None:
+                    pipe.pfadd(REBUILD_PREFIX + department_patients_key(organization), str(patient_id))
+        pending += 1
+        if pending >= batch_size:
+            pipe.execute()
+            pending = 0
+    if condition_counts:
+        pipe.zadd(REBUILD_PREFIX + CONDITION_COUNTS_KEY, dict(condition_counts))
+    pipe.execute()
+
+    stale = {key for key in redis_client.scan_iter(match=DEPARTMENT_PATIENTS_PREFIX + "*", count=1000)}
+    swap = redis_client.pipeline(transaction=True)
+    for organization in organizations:
+        key = department_patients_key(organization)
+        swap.rename(REBUILD_PREFIX + key, key)
+        stale.discard(key)
+    if condition_counts:
+        swap.rename(REBUILD_PREFIX + CONDITION_COUNTS_KEY, CONDITION_COUNTS_KEY)
+    else:
+        stale.add(CONDITION_COUNTS_KEY)
+    if stale:
+        swap.unlink(*stale)
+    swap.incr(APPLIED_COUNTER_KEY)
+    swap.execute()
+    return {"conditions": len(condition_counts), "departments": len(organizations)}
+
+if __name__ == "__main__":
+    from common.connections import get_mongo_db, get_redis
+
+    stats = rebuild_live_aggregates(get_redis(), get_mongo_db()["patient_summaries"])
+    print(f"✅ Live aggregates rebuilt: {stats['conditions']} conditions, {stats['departments']} departments")
@@ -0,0 +1,51 @@
+# Headline patient KPIs, computed inside MongoDB.
+#
+# Dashboards used to iterate find() over patient_summaries and sum fields in
+# Python, pulling every document (with its full encounter history) over the
+# wire. One $group over the two numeric fields returns the same totals and
+# only ever ships a single small document back.
+
+TOTAL_ENCOUNTERS_FIELD = "$clinical_summary.total_encounters"
+TOTAL_EXPENSES_FIELD = "$clinical_summary.healthcare_metrics.total_expenses"
+HIGH_COST_THRESHOLD = 50000
+
+def patient_kpis_pipeline(high_cost_threshold=HIGH_COST_THRESHOLD):
+    return [
+        # Keep the $group input to the two fields it needs
+        {"$project": {
+            "_id": 0,
+            "encounters": TOTAL_ENCOUNTERS_FIELD,
+            "expenses": TOTAL_EXPENSES_FIELD
+        }},
+        {"$group": {
+            "_id": None,
+            "total_patients": {"$sum": 1},
+            "total_encounters": {"$sum": "$encounters"},
+            "total_healthcare_costs": {"$sum": "$expenses"},
+            "high_cost_patients": {
+                "$sum": {"$cond": [{"$gt": ["$expenses", high_cost_threshold]}, 1, 0]}
+            }
+        }}
+    ]
+
+def summarize_patient_kpis(result):
+    """Fill in derived averages; an empty collection yields all-zero KPIs"""
+    kpis = result[0] if result else {}
+    total_patients = kpis.get("total_patients", 0)
+    total_encounters = kpis.get("total_encounters", 0)
+    total_costs = kpis.get("total_healthcare_costs", 0)
+    high_cost = kpis.get("high_cost_patients", 0)
+    return {
+        "total_patients": total_patients,
+        "total_encounters": total_encounters,
+        "total_healthcare_costs": total_costs,
+        "high_cost_patients": high_cost,
+        "high_cost_percentage": round((high_cost / total_patients) * 100, 1) if total_patients else 0,
+        "avg_encounters_per_patient": total_encounters / total_patients if total_patients else 0,
+        "avg_cost_per_patient": round(total_costs / total_patients, 2) if total_patients else 0
+    }
+
+def get_patient_kpis(collection, high_cost_threshold=HIGH_COST_THRESHOLD):
+    """Patient, encounter and cost totals from a single $group aggregation"""
+    result = list(collection.aggregate(patient_kpis_pipeline(high_cost_threshold)))
+    return summarize_patient_kpis(result)
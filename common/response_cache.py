@@ -0,0 +1,157 @@
+# Read-through response cache for the Flask dashboards.
+#
+# Dashboard data only changes when a migration runs, yet every poll used to go
+# to MongoDB. cached_response() stores each rendered API response keyed on the
+# route and its query args, either in this process (LRUCacheBackend) or in
+# Redis so every dashboard process shares it (RedisCacheBackend).
+#
+# Invalidation is by generation: cache keys embed the value of the Redis
+# counter dashboard:cache_generation, and invalidate_dashboard_cache() bumps it
+# once the migrator has published new data, so every old entry stops matching
+# at once and simply ages out. Concurrent misses on the same key are collapsed
+# so only one request recomputes it (single flight); the rest wait for it.
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+CACHE_GENERATION_KEY = "dashboard:cache_generation"
+DEFAULT_TTL = 300
+DEFAULT_LOCK_TIMEOUT = 30
+
+def invalidate_dashboard_cache(redis_client):
+    """Drop every cached dashboard response by moving to a new generation"""
+    return redis_client.incr(CACHE_GENERATION_KEY)
+
+class LRUCacheBackend:
+    """In-process cache holding at most max_entries responses"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.entries_lock = threading.Lock()
+        self.key_locks = {}
+
+    def get(self, key):
+        with self.entries_lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.entries_lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def single_flight(self, key, compute, ttl, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+        with self.entries_lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Whoever held the lock before us may already have filled the entry
+            value = self.get(key)
+            if value is None:
+                value = compute()
+                self.set(key, value, ttl)
+        with self.entries_lock:
+            self.key_locks.pop(key, None)
+        return value
+
+class RedisCacheBackend:
+    """Cache shared by every dashboard process through Redis"""
+
+    def __init__(self, redis_client, prefix="dashboard:cache:", poll_interval=0.05):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+
+    def get(self, key):
+        raw = self.redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.redis.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def single_flight(self, key, compute, ttl, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+        lock_key = f"{self.prefix}lock:{key}"
+        if self.redis.set(lock_key, 1, nx=True, ex=lock_timeout):
+            try:
+                value = compute()
+                self.set(key, value, ttl)
+                return value
+            finally:
+                self.redis.delete(lock_key)
+
+        # Another process is recomputing: wait for its result, but never past the
+        # lock timeout in case that process died holding the lock
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.get(key)
+            if value is not None:
+                return value
+            if not self.redis.exists(lock_key):
+                break
+        return compute()
+
+class ResponseCache:
+    """Cache backend plus the generation source used to build keys
+
+    redis_client is only needed for the generation counter; without one (or
+    while Redis is unreachable) entries live until their TTL runs out.
+    """
+
+    def __init__(self, backend, redis_client=None, ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def generation(self):
+        if self.redis is None:
+            return 0
+        try:
+            return int(self.redis.get(CACHE_GENERATION_KEY) or 0)
+        except Exception:
+            return 0
+
+    def get_or_compute(self, key, compute, ttl=None):
+        key = f"{self.generation()}:{key}"
+        value = self.backend.get(key)
+        if value is None:
+            value = self.backend.single_flight(key, compute, ttl or self.ttl)
+        return value
+
+def request_cache_key():
+    """Route plus sorted query args, so ?a=1&b=2 and ?b=2&a=1 share an entry"""
+    from flask import request
+
+    args = "&".join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+    return f"{request.path}?{args}"
+
+def cached_response(cache, ttl=None):
+    """Decorator for Flask views: serve the stored response body while it is fresh"""
+    from flask import Response, make_response
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            def render():
+                response = make_response(view(*args, **kwargs))
+                return {
+                    "body": response.get_data(as_text=True),
+                    "status": response.status_code,
+                    "mimetype": response.mimetype
+                }
+
+            cached = cache.get_or_compute(request_cache_key(), render, ttl)
+            return Response(cached["body"], status=cached["status"], mimetype=cached["mimetype"])
+        return wrapper
+    return decorator
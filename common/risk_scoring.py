@@ -0,0 +1,109 @@
+# Patient risk scores, computed in one vectorized pass and stored on the documents.
+#
+# The risk profile query used to compute a score in an aggregation $project
+# and sort the whole filtered collection on it every time. Here each patient's
+# features are loaded once into NumPy arrays, a scoring formula turns them
+# into a score array in a single expression, and the scores are written back
+# to clinical_summary.risk_score with unordered bulk_write (only for patients
+# whose score changed). With the risk_score index, "top N by risk" is an index
+# scan that stops after N documents.
+#
+# A formula is any function from {feature name: float64 array} to a score
+# array; RISK_FORMULAS holds the named ones and HOSPITAL_RISK_FORMULA picks the
+# default. The migrator re-scores after every load (incremental runs only the
+# patients they rewrote); re-score everyone by hand from the repository root
+# with:  python -m common.risk_scoring [formula]
+import os
+
+import numpy as np
+from pymongo import UpdateOne
+
+RISK_FIELD = "clinical_summary.risk_score"
+WRITE_BATCH_SIZE = 1000
+
+# Feature name -> document path (missing values count as 0)
+FEATURES = {
+    "encounters": "clinical_summary.total_encounters",
+    "conditions": "clinical_summary.total_conditions",
+    "chronic_conditions": "clinical_summary.chronic_count",
+    "medications": "clinical_summary.total_medications",
+    "expenses": "clinical_summary.healthcare_metrics.total_expenses",
+}
+
+def linear_formula(weights):
+    """Formula scoring sum(weight * feature)"""
+    def score(features):
+        return sum(weight * features[name] for name, weight in weights.items())
+    return score
+
+def chronic_burden(features):
+    # Chronic categories compound: each extra one weighs more than the last
+    return (
+        10 * features["chronic_conditions"] ** 1.5
+        + 2 * features["encounters"]
+        + np.log1p(features["expenses"])
+    )
+
+RISK_FORMULAS = {
+    # The original profile: 2 x encounters + 5 x conditions + expenses / 1000
+    "utilization": linear_formula({"encounters": 2, "conditions": 5, "expenses": 0.001}),
+    "chronic_burden": chronic_burden,
+}
+DEFAULT_RISK_FORMULA = os.environ.get("HOSPITAL_RISK_FORMULA", "utilization")
+
+def field_value(document, path):
+    for key in path.split("."):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(key)
+    return document
+
+def load_features(collection, query=None):
+    """(patient ids, {feature: float64 array}, current scores) for every matching patient"""
+    projection = {path: 1 for path in FEATURES.values()}
+    projection[RISK_FIELD] = 1
+    ids = []
+    columns = {name: [] for name in FEATURES}
+    current = []
+    for patient in collection.find(query or {}, projection):
+        ids.append(patient["_id"])
+        for name, path in FEATURES.items():
+            columns[name].append(field_value(patient, path) or 0)
+        score = field_value(patient, RISK_FIELD)
+        current.append(np.nan if score is None else score)
+    features = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+    return ids, features, np.asarray(current, dtype=np.float64)
+
+def compute_scores(features, formula=None):
+    formula = RISK_FORMULAS[formula or DEFAULT_RISK_FORMULA] if not callable(formula) else formula
+    return np.round(np.asarray(formula(features), dtype=np.float64), 2)
+
+def score_population(collection, formula=None, query=None, batch_size=WRITE_BATCH_SIZE):
+    """Score every matching patient and store the changed scores; returns (scored, written)"""
+    ids, features, current = load_features(collection, query)
+    if not ids:
+        return 0, 0
+    scores = compute_scores(features, formula)
+    changed = np.flatnonzero(~np.isclose(scores, current))
+    written = 0
+    for start in range(0, len(changed), batch_size):
+        batch = [
+            UpdateOne({"_id": ids[i]}, {"$set": {RISK_FIELD: float(scores[i])}})
+            for i in changed[start:start + batch_size]
+        ]
+        written += collection.bulk_write(batch, ordered=False).modified_count
+    return len(ids), written
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from common.connections import get_mongo_db, get_redis
+    from common.response_cache import invalidate_dashboard_cache
+
+    formula = sys.argv[1] if len(sys.argv) > 1 else None
+    start_time = time.perf_counter()
+    scored, written = score_population(get_mongo_db()["patient_summaries"], formula)
+    invalidate_dashboard_cache(get_redis())
+    print(f"✅ Scored {scored} patients with '{formula or DEFAULT_RISK_FORMULA}' "
+          f"({written} scores changed) in {time.perf_counter() - start_time:.2f}s")
@@ -0,0 +1,148 @@
+# Precomputed dashboard aggregates in the dashboard_rollups collection.
+#
+# The department, condition, demographic, cost and comorbidity aggregates only
+# change when patient_summaries is reloaded, so the migrator refreshes them once
+# after each run and the dashboards serve them with a single find_one() by _id
+# instead of re-running $unwind pipelines over every patient on each request.
+#
+# Refresh by hand from the repository root with:  python -m common.rollups
+from datetime import datetime
+
+from common.comorbidity import compute_comorbidity
+from common.cost_distribution import get_cost_distribution
+from common.patient_kpis import get_patient_kpis
+
+ROLLUP_COLLECTION = "dashboard_rollups"
+DEPARTMENTS_ROLLUP = "departments"
+TOP_CONDITIONS_ROLLUP = "top_conditions"
+DEMOGRAPHICS_ROLLUP = "demographics"
+COST_DISTRIBUTION_ROLLUP = "cost_distribution"
+KPIS_ROLLUP = "kpis"
+COMORBIDITY_ROLLUP = "comorbidity"
+
+TOP_CONDITIONS_LIMIT = 20
+
+def department_pipeline():
+    return [
+        {"$unwind": "$encounters"},
+        # One row per (organization, patient) so unique patients are a plain count
+        # rather than an $addToSet array that grows with the patient population
+        {"$group": {
+            "_id": {"organization": "$encounters.providers.organization", "patient": "$_id"},
+            "encounters": {"$sum": 1},
+            "revenue": {"$sum": "$encounters.financial.total_claim_cost"}
+        }},
+        {"$group": {
+            "_id": "$_id.organization",
+            "encounters": {"$sum": "$encounters"},
+            "revenue": {"$sum": "$revenue"},
+            "unique_patients": {"$sum": 1}
+        }},
+        {"$sort": {"encounters": -1}}
+    ]
+
+def top_conditions_pipeline(limit=TOP_CONDITIONS_LIMIT):
+    return [
+        {"$unwind": "$conditions"},
+        {"$group": {
+            "_id": "$conditions.description",
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+
+def demographics_pipeline():
+    return [
+        {"$group": {
+            "_id": "$demographics.gender",
+            "count": {"$sum": 1},
+            "avg_age": {"$avg": "$demographics.age"}
+        }}
+    ]
+
+def compute_departments(collection):
+    return [
+        {
+            "name": dept['_id'],
+            "encounters": dept['encounters'],
+            "unique_patients": dept['unique_patients'],
+            "encounters_per_patient": dept['encounters'] / dept['unique_patients'],
+            "revenue": dept['revenue']
+        } for dept in collection.aggregate(department_pipeline())
+    ]
+
+def compute_top_conditions(collection, total_patients=None, limit=TOP_CONDITIONS_LIMIT):
+    if total_patients is None:
+        total_patients = collection.count_documents({})
+    return [
+        {
+            "name": condition['_id'],
+            "count": condition['count'],
+            "percentage": round((condition['count'] / total_patients) * 100, 1) if total_patients else 0
+        } for condition in collection.aggregate(top_conditions_pipeline(limit))
+    ]
+
+def compute_demographics(collection):
+    gender_distribution = {}
+    total_age = 0
+    total_count = 0
+    for stat in collection.aggregate(demographics_pipeline()):
+        gender_distribution[stat['_id']] = stat['count']
+        total_age += (stat['avg_age'] or 0) * stat['count']
+        total_count += stat['count']
+    return {
+        "avg_age": round(total_age / total_count, 1) if total_count > 0 else 0,
+        "gender_distribution": gender_distribution
+    }
+
+# How each rollup document is computed from patient_summaries
+ROLLUP_BUILDERS = {
+    KPIS_ROLLUP: get_patient_kpis,
+    DEPARTMENTS_ROLLUP: lambda collection: {"departments": compute_departments(collection)},
+    TOP_CONDITIONS_ROLLUP: lambda collection: {"conditions": compute_top_conditions(collection)},
+    DEMOGRAPHICS_ROLLUP: compute_demographics,
+    COST_DISTRIBUTION_ROLLUP: get_cost_distribution,
+    COMORBIDITY_ROLLUP: compute_comorbidity,
+}
+
+def compute_rollups(collection):
+    """Every rollup document, keyed by _id, computed from patient_summaries"""
+    return {rollup_id: build(collection) for rollup_id, build in ROLLUP_BUILDERS.items()}
+
+def refresh_rollups(db, source_collection="patient_summaries"):
+    """Recompute all rollups from source_collection and store them in dashboard_rollups"""
+    rollups = db[ROLLUP_COLLECTION]
+    generated_at = datetime.now()
+    computed = compute_rollups(db[source_collection])
+    for rollup_id, data in computed.items():
+        rollups.replace_one(
+            {"_id": rollup_id},
+            dict(data, _id=rollup_id, generated_at=generated_at),
+            upsert=True
+        )
+    return list(computed)
+
+def rollups_generated_at(db):
+    """When the rollups were last refreshed (None if never), e.g. for ETags"""
+    rollup = db[ROLLUP_COLLECTION].find_one({"_id": KPIS_ROLLUP}, {"generated_at": 1})
+    return rollup and rollup.get("generated_at")
+
+def get_rollup(db, rollup_id, source_collection="patient_summaries"):
+    """One rollup document by _id
+
+    Falls back to computing it live from source_collection when the rollups
+    have never been refreshed, so a fresh install still renders.
+    """
+    rollup = db[ROLLUP_COLLECTION].find_one({"_id": rollup_id})
+    if rollup is None:
+        rollup = ROLLUP_BUILDERS[rollup_id](db[source_collection])
+    return rollup
+
+if __name__ == "__main__":
+    from common.connections import get_mongo_db, get_redis
+    from common.response_cache import invalidate_dashboard_cache
+
+    refreshed = refresh_rollups(get_mongo_db())
+    invalidate_dashboard_cache(get_redis())
+    print(f"✅ Dashboard rollups refreshed: {', '.join(refreshed)}")